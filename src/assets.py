@@ -0,0 +1,73 @@
+# Images packed into one file by tools/pack_assets.py, decoded into a displayio.Bitmap when they're needed.
+#
+# Layout (little-endian):
+#   header  MAGIC, image count (H)
+#   index   one INDEX_FORMAT entry per image: name, width, height, colours, offset and size of its data
+#   data    per image: the palette (colours x r, g, b), then each row as runs. A control byte c below 128 is followed
+#           by one palette index repeated c + 1 times; c of 128 or more is followed by c - 127 literal indexes.
+#
+# The images are mostly black, so most rows are a few runs and decode with one bitmaptools.fill_region call each.
+# Runs never cross a row. A decoded image costs RAM for its Bitmap, unlike an OnDiskBitmap, so load what's on screen
+# and let the rest go.
+
+import struct
+
+import bitmaptools
+import displayio
+
+PATH = '/assets.bin'
+MAGIC = b'AST1'
+HEADER_FORMAT = '<4sH'
+INDEX_FORMAT = '<24sHHHII'  # name, width, height, colours, offset, size
+
+
+class Assets:
+    def __init__(self, path=PATH):
+        self.path = path
+        self.index = {}     # name -> (width, height, colours, offset, size)
+        try:
+            with open(path, 'rb') as f:
+                magic, count = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+                if magic != MAGIC:
+                    raise OSError('bad magic')
+                entry = struct.calcsize(INDEX_FORMAT)
+                for _ in range(count):
+                    name, width, height, colors, offset, size = struct.unpack(INDEX_FORMAT, f.read(entry))
+                    self.index[name.rstrip(b'\0').decode()] = (width, height, colors, offset, size)
+        except OSError as e:
+            print('No asset bundle at {}: {}'.format(path, e))
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def load(self, name):
+        """Decode an image into a new (displayio.Bitmap, displayio.Palette)"""
+        width, height, colors, offset, size = self.index[name]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            rgb = f.read(colors * 3)
+            data = f.read(size)
+        palette = displayio.Palette(colors)
+        for i in range(colors):
+            palette[i] = (rgb[3 * i] << 16) | (rgb[3 * i + 1] << 8) | rgb[3 * i + 2]
+        rgb = None
+        bitmap = displayio.Bitmap(width, height, colors)
+        decode(data, bitmap, width, height)
+        return bitmap, palette
+
+
+def decode(data, bitmap, width, height):
+    i = 0
+    for y in range(height):
+        x = 0
+        while x < width:
+            c = data[i]
+            if c < 128:
+                bitmaptools.fill_region(bitmap, x, y, x + c + 1, y + 1, data[i + 1])
+                x += c + 1
+                i += 2
+            else:
+                for j in range(i + 1, i + c - 126):
+                    bitmap[x, y] = data[j]
+                    x += 1
+                i += c - 126
@@ -1,5 +1,7 @@
 import gc
+from supervisor import ticks_ms
 
+IMPORTS_STARTED = ticks_ms()
 VERSION = '1.8.1.5'
 print("\nMoon Clock: Version {0} ({1:,} RAM free)".format(VERSION, gc.mem_free()))
 
@@ -10,41 +12,56 @@ import time
 import board
 import busio
 import displayio
-from microcontroller import watchdog
-from watchdog import WatchDogMode
-
-from microcontroller import nvm
+from microcontroller import cpu, nvm, ResetReason
 from rtc import RTC
 from supervisor import reload
 
 import color
+import gcpolicy
+import guard
+import journal
+import memstat
+import store
+from ticker import ClockText, PhasePulse, ticks_diff
+from assets import Assets
+from days import Days
+from ephemera import SolarEphemera, USNO_URL, date_string
+from esp_net import EspNet
+from moonphase import Phase
+from moonrender import MoonRenderer, orient
+from providers import Aggregator, Computed, MetNo, MET_NO_URL, Providers, Usno
+from scheduler import Scheduler
+from viewmodel import ALL, ClockView, DATE, PHASE
+from session import Session
+from timeutil import hh_mm, offset_seconds, strftime
 
 from adafruit_bitmap_font import bitmap_font
 from adafruit_display_text.label import Label
 from adafruit_esp32spi import adafruit_esp32spi
 from adafruit_lis3dh import LIS3DH_I2C
 from adafruit_matrixportal.matrix import Matrix
-from adafruit_matrixportal.network import Network
 from digitalio import DigitalInOut, Pull
 
 from secrets import secrets
 
-print('Imports loaded - ({0:,} RAM free)'.format(gc.mem_free()))
+print('Imports loaded in {0:,} ms - ({1:,} RAM free)'.format(ticks_diff(ticks_ms(), IMPORTS_STARTED), gc.mem_free()))
 
 ########################################################################################################################
 
 # NOTE: Do _not_ call watchdog.feed() too quickly or the board will crash 🤦‍♂️
 WATCHDOG_TIMEOUT = 12   # This is close to the maximum allowed value
-REFRESH_DELAY = 3
+HTTP_TIMEOUT = 5        # Seconds per request. Providers fail over rather than wait, so one short timeout is enough
 BIT_DEPTH = 6
 TODAY = 0
 TOMORROW = 1
-NUM_EVENTS = 8
-
-TODAY_RISE = '\u2191'   # ↑
-TODAY_SET = '\u2193'    # ↓
-TOMORROW_RISE = '\u219F'# ↟
-TOMORROW_SET = '\u21A1' # ↡
+DAYS = 2                # Days of ephemera kept, starting with today
+GEOLOCATION_URL = 'http://ip-api.com/json/?fields=status,lat,lon,offset,query'
+LOCATION_KEYS = ('latitude', 'longitude', 'utc_offset')
+TICK_MS = 100           # Scheduler periods (src/scheduler.py): display tick, buttons and watchdog
+ORIENT_MS = 1000        # Accelerometer check
+REFRESH_MS = 3000       # Full redraw, day rollover and location checks
+TIME_SYNC_MS = 60000    # RTC resync from the ESP32
+SUMMARY_MS = 60000      # Memory, scheduler lateness and GC summaries
 
 COLOR_BRIGHTNESS = 0.5
 MOON_PHEN_COLOR = color.adjust_brightness(0xB8BFC9, COLOR_BRIGHTNESS) # (grey blue)
@@ -72,32 +89,26 @@ CLOCK_EVENT = 9
 CLOCK_DATE = 10
 CLOCK_PHASE = 11
 
-current_event = NUM_EVENTS
+# Layout for each orientation: MOON_Y, CENTER_X, TIME_Y, DATE_Y, EVENT_Y, CLOCK_GLYPH_X
+LANDSCAPE_LAYOUT = (0, 48, 6, 16, 27, 30)
+PORTRAIT_LAYOUT = (0, 16, 37, 47, 57, 0)
+
 asleep = False
 latitude = None
 longitude = None
 utc_offset = None
+location = None
 esp32_wifi_sync = None
 last_update_sec = None
-brightness = 0.0
-dwell = 10
+moon = Phase()      # Moon age, frame, glyph and percentage, updated as time passes
+moon_image = MoonRenderer()     # Redrawn in place as the moon's age changes
+moon_grid = displayio.TileGrid(moon_image.bitmap, pixel_shader=moon_image.palette)
+layout_shown = None # Layout currently drawn, None while the splash screen is up
+clock_text = ClockText()
+phase_pulse = PhasePulse(0xBB9946)
 
 ########################################################################################################################
 
-def parse_utc_offset(offset_str):
-    """
-    Convert a UTC offset string like '-700' or '-07:00' into (hours, minutes)
-    """
-    offset_str = offset_str.strip()
-    if ':' in offset_str:
-        hours_str, minutes_str = offset_str.split(':')
-    else:
-        # e.g., -700 → -7 hours, 0 minutes
-        val = int(offset_str)
-        hours_str = str(val // 100)
-        minutes_str = str(abs(val) % 100)
-    return int(hours_str), int(minutes_str)
-
 def get_timestamp_from_esp32_wifi():
     global esp32_wifi_sync
 
@@ -106,20 +117,18 @@ def get_timestamp_from_esp32_wifi():
     if esp32_wifi_sync is None:
         print('Syncing WiFi with ESP32...', end='')
     while retries > 0 and not esp_time:
-        try:
-            esp_time = esp.get_time() # In UTC
-            if not esp_time:
-                raise Exception('No time returned')
-            else:
-                if esp32_wifi_sync is None: print()
-        except Exception:
+        esp_time = net.utc_time()
+        if esp_time:
+            if esp32_wifi_sync is None: print()
+        else:
             print('.', end='')
             time.sleep(1)
             retries -= 1
+            guard.feed()
 
     if esp_time:
         esp32_wifi_sync = True
-        adjusted = esp_time[0] + (int(utc_offset) // 100) * 3600
+        adjusted = esp_time + offset_seconds(utc_offset)
         return time.localtime(adjusted)
     else:
         print('Failed to Sync WiFi with ESP32!')
@@ -163,103 +172,41 @@ def sleep_or_wake():
         wake()
 
 def check_buttons():
+    memstat.begin(memstat.BUTTONS)
     if not pin_down.value: # negating to indicate button pressed because Pull.UP 😵
-        while not pin_down.value: pass
+        guard.begin(guard.BUTTONS)
+        while not pin_down.value: guard.feed()
         sleep(forced = True)
+        guard.end(guard.BUTTONS)
     if not pin_up.value:
-        while not pin_up.value: pass
+        guard.begin(guard.BUTTONS)
+        while not pin_up.value: guard.feed()
         wake(forced = True)
-
-def parse_time(timestring):
-    if timestring == None:
-        return None
-
-    try:
-        date_time = timestring.split('T')
-        year_month_day = date_time[0].split('-')
-        hour_minute = date_time[1].split('+')[0].split('-')[0].split(':')
-    except Exception as e:
-        print('Exception parsing timestring: {0} - {1}'.format(timestring, e))
-        return None
-
-    return time.struct_time(( # Note: Extra parenthesis are needed because struct_time() now takes a tuple
-        int(year_month_day[0]),
-        int(year_month_day[1]),
-        int(year_month_day[2]),
-        int(hour_minute[0]),
-        int(hour_minute[1]),
-        0,  # second not provided by API
-        -1, # day of week
-        -1, # day of year
-        -1  # 1 = Yes, 0 = No, -1 = Unknown
-    ))
+        guard.end(guard.BUTTONS)
+    memstat.end(memstat.BUTTONS)
 
 def update_time():
     """Sync with ESP32 WiFi and return UTC struct_time"""
+    memstat.begin(memstat.TIME)
+    guard.begin(guard.TIME)
     time_struct = get_timestamp_from_esp32_wifi()
     if time_struct is not None:
         esp32_wifi_sync = True
         RTC().datetime = time_struct
-        return time_struct  # Return struct_time, not mktime
     else:
-        return RTC().datetime  # Already struct_time
+        time_struct = RTC().datetime  # Already struct_time
+    guard.end(guard.TIME)
+    memstat.end(memstat.TIME)
+    return time_struct  # Return struct_time, not mktime
 
-def hh_mm(time_struct):
-    """
-    Return a 12-hour formatted string with alternating colon separator
-    Example: 2:35 ... 2 35 ... 2:35 ... 2 35 ...
-    """
-
-    hour = (time_struct.tm_hour) % 24
-    minute = (time_struct.tm_min) % 60
-
-    # Adjust hour if minutes overflow
-    if time_struct.tm_min >= 60:
-        hour = (hour + 1) % 24
-
-    # Format as 12-hour clock
-    hour12 = 12 if hour % 12 == 0 else hour % 12
-    # Flash colon time separator
-    separator = ':' if time_struct.tm_sec % 2 == 0 else ' '
-    return "{0}{1}{2:02d}".format(hour12, separator, minute)
-
-def strftime(time_struct):
-    """
-    Return a date/time string
-    Format: MM/DD/YYYY HH:MM:SS ±HHMM
-    """
-    hour = (time_struct.tm_hour) % 24
-    minute = (time_struct.tm_min) % 60
-
-    return "{0:0>2}/{1:0>2}/{2:0>4} {3:0>2}:{4:0>2}:{5:0>2} {6}".format(
-        time_struct.tm_mon,
-        time_struct.tm_mday,
-        time_struct.tm_year,
-        hour,
-        minute,
-        time_struct.tm_sec,
-        utc_offset
-    )
-
-def display_event(name, event, icon, event_y, glyph_x, center_x, phase_glyph):
+def display_event(icon, text, event_color, event_y, glyph_x, center_x):
     """
     Display a sun/moon event on the clock.
     event_y: vertical position of the event
     glyph_x: horizontal position of the icon
     center_x: horizontal center of the text
     """
-    if event is not None:
-        time_struct = time.localtime(event)
-
-    if name.startswith('Sun'):
-        event_color = SUN_PHEN_COLOR
-        if event is not None:
-            hour = 12 if time_struct.tm_hour == 0 else time_struct.tm_hour
-            event_time_str = '{0}:{1:0>2}'.format(hour, time_struct.tm_min)
-    else:
-        event_color = MOON_PHEN_COLOR
-        if event is not None:
-            event_time_str = '{0}:{1:0>2}'.format(time_struct.tm_hour, time_struct.tm_min)
+    memstat.begin(memstat.EVENT)
 
     # Update glyph
     clock_face[CLOCK_GLYPH].color = event_color
@@ -267,281 +214,141 @@ def display_event(name, event, icon, event_y, glyph_x, center_x, phase_glyph):
     clock_face[CLOCK_GLYPH].x = glyph_x
     clock_face[CLOCK_GLYPH].y = event_y
 
-    # If no event, display placeholder
-    if event is None:
-        event_time_str = '--:--'
-
     # Update event label
-    clock_face[CLOCK_EVENT] = Label(SMALL_FONT, color=event_color, text=event_time_str)
+    clock_face[CLOCK_EVENT].color = event_color
+    clock_face[CLOCK_EVENT].text = text
     clock_face[CLOCK_EVENT].x = max(glyph_x + 6, center_x - clock_face[CLOCK_EVENT].bounding_box[2] // 2)
     clock_face[CLOCK_EVENT].y = event_y
+    memstat.end(memstat.EVENT)
 
 def log_exception_and_restart(e):
     """
-    Logs an exception to a file, then restarts the board.
+    Records an exception in the journal, then restarts the board.
     """
-    msg = "{0}: [VERSION {1}] (RAM {2:,}) - {3}\n".format(
-        strftime(time.localtime()), VERSION, gc.mem_free(), e
-    )
-    try:
-        log = open('exceptions.log', 'a')   # Can fail if filesystem is read-only or full
-        log.write(msg)
-        log.flush()
-        log.close()
-    except Exception as e:
-        print(msg)
-        print(str(e))
-        reload() # Reboot / restart
-
-# Try to read the latitude/longitude from the secrets. If not present, then use IP geolocation
-def get_lat_long():
-    global latitude, longitude
-    try:
-        latitude = secrets['latitude']
-        longitude = secrets['longitude']
+    crash_log.log(journal.EXCEPTION, '{}: {}'.format(type(e).__name__, e))
+    crash_log.flush()   # Buffered records would be lost in the reload
+    reload() # Reboot / restart
+
+# Location and UTC offset come from secrets when present, otherwise from the record saved in nvm. IP geolocation only
+# blocks boot when neither is available (see below, after the RTC is set); after that the saved record is refreshed in
+# the background.
+def get_location():
+    global location
+    location = store.load_location(nvm)
+    apply_location()
+
+def apply_location():
+    global latitude, longitude, utc_offset
+    if 'latitude' in secrets and 'longitude' in secrets:
+        latitude, longitude = secrets['latitude'], secrets['longitude']
         print('Lat/lon determined from secrets: {0}, {1}'.format(latitude, longitude))
-    except KeyError:
-        latitude, longitude = wifi.fetch_data('http://www.geoplugin.net/json.gp', json_path = [['geoplugin_latitude'], ['geoplugin_longitude']])
+    elif location is not None:
+        latitude, longitude = location.latitude, location.longitude
         print('Lat/lon determined from IP geolocation: {0}, {1}'.format(latitude, longitude))
+    orient(moon_grid, latitude)
 
-# Try to read the UTC offset from the secrets. If not present, it will be set below via API call
-def get_utc_offset():
-    global utc_offset
-    try:
+    if 'utc_offset' in secrets:
         utc_offset = secrets['utc_offset']
         print('UTC offset determined from secrets: ' + utc_offset)
-    except: utc_offset = "-800"   # Default/fallback (-700 is PDT and -800 PST)
-    return
+    elif location is not None:
+        utc_offset = location.utc_offset()
+        print('UTC offset determined from IP geolocation: ' + utc_offset)
+    else: utc_offset = "-800"   # Default/fallback (-700 is PDT and -800 PST)
+    moon.set_utc_offset(offset_seconds(utc_offset))
 
-def format_utc_offset(offset_str):
-    """
-    Convert an offset like '-700', '-07:00', '+530', '+05:30' into standard ±HH:MM
-    """
-    offset_str = offset_str.strip()
-    if ':' in offset_str:
-        if offset_str[0] in '+-':
-            sign = offset_str[0]
-            hours, minutes = offset_str[1:].split(':')
-        else:
-            sign = '+'
-            hours, minutes = offset_str.split(':')
-        return "{}{:02d}:{:02d}".format(sign, int(hours), int(minutes))
-    else:
-        val = int(offset_str)
-        sign = '-' if val < 0 else '+'
-        val = abs(val)
-        hours = val // 100
-        minutes = val % 100
-        return '{}{:02d}:{:02d}'.format(sign, hours, minutes)
-
-def fetch_url_with_retry(url, max_retries=3, delay=3):
+def refresh_location():
     """
-    Fetch a URL via ESP32, retrying up to max_retries times on failure.
+    Look up location, UTC offset and public IP address by IP geolocation, saving them to nvm if anything changed or
+    the saved record is stale. Returns True if the location or UTC offset changed.
     """
-    attempt = 1
-    while attempt <= max_retries:
-        print('[Attempt {}/{}] Fetching: {}'.format(attempt, max_retries, url))
-        try:
-            data = wifi.fetch_data(url)
-            print('Success!')
-            return data
-        except Exception as e:
-            print('Request failed: {}'.format(e))
-            if attempt < max_retries:
-                print('Retrying in {}s...'.format(delay))
-                time.sleep(delay)
-            else:
-                print('All retries failed.')
-                return None
-        attempt += 1
-
-def tz_hours_from_offset(utc_offset):
-    """
-    Convert a UTC offset string to an integer tz for USNO API.
-    Supports "-07:00", "-0700", "-7", "+05:30" etc.
-    Only hours are returned; minutes are ignored.
-    Valid USNO tz range: -12 <= tz <= 14
-    """
-    utc_offset = utc_offset.replace(':', '')
-    if utc_offset.startswith('-'):
-        sign = -1
-        digits = utc_offset[1:]
-    elif utc_offset.startswith('+'):
-        sign = 1
-        digits = utc_offset[1:]
-    else:
-        sign = 1
-        digits = utc_offset
-
-    if len(digits) >= 3:
-        hours = int(digits[:-2]) * sign
-    else:
-        hours = int(digits) * sign
-
-    if hours < -12 or hours > 14:
-        raise ValueError("tz offset out-of-bounds for USNO API: {}".format(hours))
-
-    return hours
-
-########################################################################################################################
-
-class SolarEphemera:
-    global latitude, longitude, utc_offset, moon_phase
-
-    def __init__(self, datetime):
-        self.sunrise = None
-        self.sunset = None
-        self.moonrise = None
-        self.moonset = None
-        self.percent = None
-        self.datetime = datetime
-        self.phase = None
-
-        date_str = "{:04d}-{:02d}-{:02d}".format(datetime.tm_year, datetime.tm_mon, datetime.tm_mday)
-        url = "https://aa.usno.navy.mil/api/rstt/oneday?date={}&coords={},{}&tz={}".format(
-            date_str, latitude, longitude, tz_hours_from_offset(utc_offset)
-        )
-
-        # Interesting fields: isdst, curphase
-        print("Fetching daily sun & moon data via USNO AA for {}".format(date_str))
-        data_str = fetch_url_with_retry(url, max_retries=3, delay=3)
-        if data_str is None:
-            print("Failed to fetch USNO data. Leaving ephemera empty.")
-            return
-
-        try:
-            raw = json.loads(data_str)
-            data = raw['properties']['data']
-        except Exception as e:
-            print("Failed to parse USNO response: {}".format(e))
-            return
-
-        # "Waxing Crescent", "Waxing Gibbous", "Waning Crescent", "Waning Gibbous", "New Moon", "Full Moon"
-        self.phase = data.get('curphase', '')
-        daylight_saving_time = data.get('isdst', False)
-
-        try:
-            self.percent = float(data.get('fracillum', "0%").strip('%'))
-        except Exception as e:
-            print("Failed to parse fracillum: {}".format(e))
-            self.percent = 100 # Default to full moon
-
-        try:
-            for item in data.get('sundata', []):
-                phen = item.get('phen', '')
-                t = self.parse_usno_time(item.get('time'))
-                if phen == 'Rise':
-                    self.sunrise = t
-                elif phen == 'Set':
-                    self.sunset = t
-        except Exception as e:
-            print("Failed to parse sun events: {}".format(e))
-
-        try:
-            for item in data.get('moondata', []):
-                phen = item.get('phen', '')
-                t = self.parse_usno_time(item.get('time'))
-                if phen == 'Rise':
-                    self.moonrise = t
-                elif phen == 'Set':
-                    self.moonset = t
-        except Exception as e:
-            print("Failed to parse moon events: {}".format(e))
-
-    @staticmethod
-    def parse_usno_time(timestr):
-        if not timestr:
-            return None
-        try:
-            h, m = [int(x) for x in timestr.split(':')]
-            now = time.localtime()
-            t = time.struct_time((
-                now.tm_year, now.tm_mon, now.tm_mday, h, m, 0, -1, -1, -1
-            ))
-            return time.mktime(t)
-        except Exception as e:
-            print("Failed to parse time '{}': {}".format(timestr, e))
-            return None
+    global location
+    gcpolicy.before_large()
+    guard.begin(guard.LOCATION)
+    try:
+        data = json.loads(http.get(secrets.get('geolocation_url', GEOLOCATION_URL)))
+        if data['status'] != 'success':
+            raise ValueError(data['status'])
+        try: ip = bytes([int(x) for x in data['query'].split('.')])
+        except ValueError: ip = bytes(4) # Not IPv4
+        fresh = store.Location(time.time(), data['lat'], data['lon'], data['offset'] // 60, ip)
+    except Exception as e:
+        print('IP geolocation failed: {}'.format(e))
+        return False
+    finally:
+        guard.end(guard.LOCATION)
+
+    moved = not fresh.same_place(location)
+    if moved or location.stale(fresh.saved):
+        store.save_location(nvm, fresh)
+        location = fresh
+        apply_location()
+    return moved
+
+def fetch_days(datetime):
+    """Fill days with ephemera from the day of datetime onwards, from whichever provider has been answering best"""
+    gcpolicy.before_large()
+    memstat.begin(memstat.EPHEMERA)
+    guard.begin(guard.EPHEMERA)
+    for i in range(len(days)):
+        day = time.localtime(time.mktime(datetime) + i * 86400)
+        days[i] = ephemeris.fetch(http, day, latitude, longitude, utc_offset)
+    print('Ephemeris providers: {}'.format(ephemeris.stats()))
+    guard.end(guard.EPHEMERA)
+    memstat.end(memstat.EPHEMERA)
+
+def load_image(name):
+    """TileGrid for an image from the asset bundle, or from its BMP file if there's no bundle (e.g. running from src)"""
+    if name in images:
+        bitmap, palette = images.load(name)
+        return displayio.TileGrid(bitmap, pixel_shader=palette)
+    # Use the bitmap's own shader: a Palette for indexed BMPs, else a ColorConverter
+    bitmap = displayio.OnDiskBitmap(name)
+    return displayio.TileGrid(bitmap, pixel_shader=bitmap.pixel_shader)
+
+def handle_push(topic, message):
+    """Apply one message received from the MQTT broker"""
+    print('MQTT {}: {}'.format(topic, message))
+    try:
+        if topic.startswith('ephemeris'):
+            date_str, data = message.split(',', 1)
+            for i in (TODAY, TOMORROW):
+                if date_string(days[i].datetime) == date_str:
+                    day = SolarEphemera(days[i].datetime)
+                    day.parse_compact(data)
+                    days[i] = day
+        elif topic == 'time':
+            RTC().datetime = time.localtime(int(message) + offset_seconds(utc_offset))
+        elif topic == 'sleep':
+            if message == 'sleep': sleep(forced = True)
+            elif message == 'wake': wake(forced = True)
+            elif message == 'auto': nvm[0:1] = bytes([0])
+    except Exception as e:
+        print('Failed to handle MQTT message: {}'.format(e))
 
 ########################################################################################################################
 
 def update_display(time_only=False):
-    global moon_frame, percent_illum, days, current_event, last_update_sec, moon_phase
-
-    # moon_frame = 90 if waning crescent and percent = 10
-    # moon_frame = 10 if waxing crescent and percent = 10
-    # moon_frame == 50 if full moon and percent >= 100.0
-    # moon_frame == 99 if new moon and percent <= 0.0
-    percent_illum = int(days[TODAY].percent)
-    moon_phase = days[TODAY].phase
-    if moon_phase != None:
-        if "Waning" in moon_phase:
-            phase_glyph = '-'
-            moon_frame = 100 - percent_illum // 2
-        if "Waxing" in moon_phase:
-            phase_glyph = '+'
-            moon_frame = percent_illum // 2
-        if "New Moon" in moon_phase:
-            phase_glyph = ''
-            moon_frame = 99
-        if "Full Moon" in moon_phase:
-            phase_glyph = ''
-            moon_frame = 50
-
-    if landscape_orientation:
-        MOON_Y = 0
-        CENTER_X = 48
-        TIME_Y = 6
-        DATE_Y = 16
-        EVENT_Y = 27
-        CLOCK_GLYPH_X = 30
-    else:
-        MOON_Y = 0
-        CENTER_X = 16
-        TIME_Y = 37
-        DATE_Y = 47
-        EVENT_Y = 57
-        CLOCK_GLYPH_X = 0
+    memstat.begin(memstat.DISPLAY)
+    refresh_display(time_only)
+    memstat.end(memstat.DISPLAY)
 
-    try:
-        bitmap = displayio.OnDiskBitmap('moon/moon{:02d}.bmp'.format(moon_frame))
-        tile_grid = displayio.TileGrid(bitmap, pixel_shader=displayio.ColorConverter())
-        tile_grid.x = 0
-        tile_grid.y = MOON_Y
-        clock_face[0] = tile_grid
-    except Exception as e:
-        print("Error loading bitmap: {}".format(e))
+def refresh_display(time_only):
+    global last_update_sec, layout_shown
 
-    # Update minimal set of display elements and return quickly
-    if time_only:
-        global brightness, dwell
+    layout = LANDSCAPE_LAYOUT if landscape_orientation else PORTRAIT_LAYOUT
+    MOON_Y, CENTER_X, TIME_Y, DATE_Y, EVENT_Y, CLOCK_GLYPH_X = layout
 
+    # Update minimal set of display elements and return quickly. Nothing here allocates in steady state: the time
+    # label only changes when the colon flashes, and its strings are rebuilt once a minute
+    if time_only:
         # Draw time with alternating (flashing) colon separator
-        clock_face[CLOCK_TIME].text = hh_mm(local_time)
-        clock_face[CLOCK_TIME].x = CENTER_X - clock_face[CLOCK_TIME].bounding_box[2] // 2
-        clock_face[CLOCK_TIME].y = TIME_Y
+        if clock_text.tick():
+            clock_face[CLOCK_TIME].text = clock_text.text
+            clock_face[CLOCK_TIME].x = CENTER_X - clock_face[CLOCK_TIME].bounding_box[2] // 2
+            clock_face[CLOCK_TIME].y = TIME_Y
 
         # Draw brightening glyph for waxing, or dimming glyph for waning
-        clock_face[CLOCK_PHASE].x = 0
-        clock_face[CLOCK_PHASE].y = 2
-        clock_face[CLOCK_PHASE].text = phase_glyph
-        if phase_glyph == '+':
-            brightness = brightness + 0.1
-            if brightness >= 1.0:
-                brightness = 1.0
-                if dwell > 0: dwell = dwell - 1
-                else:
-                    brightness = 0.0
-                    dwell = 10
-        else:
-            brightness = brightness - 0.1
-            if brightness <= 0.0:
-                brightness = 0.0
-                if dwell > 0: dwell = dwell - 1
-                else:
-                    brightness = 1.0
-                    dwell = 10
-        clock_face[CLOCK_PHASE].color = color.adjust_brightness(0xBB9946, brightness)
+        clock_face[CLOCK_PHASE].color = phase_pulse.tick(view.glyph == '+')
 
         display.refresh()
         return
@@ -549,45 +356,60 @@ def update_display(time_only=False):
     if last_update_sec == local_time.tm_sec:
         return
 
-    clock_face[CLOCK_PERCENT].text = '100%' if percent_illum >= 99 else '{:.1f}%'.format(percent_illum)
-    clock_face[CLOCK_PERCENT].x = 16 - clock_face[CLOCK_PERCENT].bounding_box[2] // 2
-    clock_face[CLOCK_PERCENT].y = MOON_Y + 16
-    for i in range(1, 5): clock_face[i].text = clock_face[CLOCK_PERCENT].text
-
-    clock_face[1].x, clock_face[1].y = clock_face[CLOCK_PERCENT].x, clock_face[CLOCK_PERCENT].y - 1
-    clock_face[2].x, clock_face[2].y = clock_face[CLOCK_PERCENT].x - 1, clock_face[CLOCK_PERCENT].y
-    clock_face[3].x, clock_face[3].y = clock_face[CLOCK_PERCENT].x + 1, clock_face[CLOCK_PERCENT].y
-    clock_face[4].x, clock_face[4].y = clock_face[CLOCK_PERCENT].x, clock_face[CLOCK_PERCENT].y + 1
-
-    event_map = [
-        ('Moonset tomorrow', days[TOMORROW].moonset, TOMORROW_SET),
-        ('Moonrise tomorrow', days[TOMORROW].moonrise, TOMORROW_RISE),
-        ('Sunset tomorrow', days[TOMORROW].sunset, TOMORROW_SET),
-        ('Sunrise tomorrow', days[TOMORROW].sunrise, TOMORROW_RISE),
-        ('Moonset today', days[TODAY].moonset, TODAY_SET),
-        ('Moonrise today', days[TODAY].moonrise, TODAY_RISE),
-        ('Sunset today', days[TODAY].sunset, TODAY_SET),
-        ('Sunrise today', days[TODAY].sunrise, TODAY_RISE)
-    ]
-
-    event_name, event_time, icon = event_map[(NUM_EVENTS - current_event) % NUM_EVENTS]
-    display_event(event_name, event_time, icon, EVENT_Y, CLOCK_GLYPH_X, CENTER_X, phase_glyph)
-
-    clock_face[CLOCK_TIME].text = hh_mm(local_time)
+    # Only what changed since the last refresh is redrawn, plus everything when the orientation changes
+    now = time.time()
+    changed = view.update(now, local_time)
+    if changed & PHASE: moon_image.render(moon.age)
+    if layout_shown is not layout:
+        if clock_face[0] is not moon_grid: clock_face[0] = moon_grid
+        moon_grid.y = MOON_Y
+        layout_shown = layout
+        changed = ALL
+
+    if changed & PHASE:
+        clock_face[CLOCK_PHASE].x = 0
+        clock_face[CLOCK_PHASE].y = 2
+        clock_face[CLOCK_PHASE].text = view.glyph
+
+        clock_face[CLOCK_PERCENT].text = view.percent_text
+        clock_face[CLOCK_PERCENT].x = 16 - clock_face[CLOCK_PERCENT].bounding_box[2] // 2
+        clock_face[CLOCK_PERCENT].y = MOON_Y + 16
+        for i in range(1, 5): clock_face[i].text = view.percent_text
+
+        clock_face[1].x, clock_face[1].y = clock_face[CLOCK_PERCENT].x, clock_face[CLOCK_PERCENT].y - 1
+        clock_face[2].x, clock_face[2].y = clock_face[CLOCK_PERCENT].x - 1, clock_face[CLOCK_PERCENT].y
+        clock_face[3].x, clock_face[3].y = clock_face[CLOCK_PERCENT].x + 1, clock_face[CLOCK_PERCENT].y
+        clock_face[4].x, clock_face[4].y = clock_face[CLOCK_PERCENT].x, clock_face[CLOCK_PERCENT].y + 1
+
+    # The event slot moves on through the events still to come on every refresh; their strings only change with the days
+    event = view.next_event(now)
+    display_event(view.event_icons[event], view.event_texts[event], view.event_colors[event], EVENT_Y, CLOCK_GLYPH_X, CENTER_X)
+
+    clock_text.sync(local_time)
+    clock_text.tick()
+    clock_face[CLOCK_TIME].text = clock_text.text
     clock_face[CLOCK_TIME].x = CENTER_X - clock_face[CLOCK_TIME].bounding_box[2] // 2
     clock_face[CLOCK_TIME].y = TIME_Y
 
-    clock_face[CLOCK_DATE].text = '{0}-{1:02d}'.format(local_time.tm_mon, local_time.tm_mday)
-    clock_face[CLOCK_DATE].x = CENTER_X - clock_face[CLOCK_DATE].bounding_box[2] // 2
-    clock_face[CLOCK_DATE].y = DATE_Y
+    if changed & DATE:
+        clock_face[CLOCK_DATE].text = view.date_text
+        clock_face[CLOCK_DATE].x = CENTER_X - clock_face[CLOCK_DATE].bounding_box[2] // 2
+        clock_face[CLOCK_DATE].y = DATE_Y
 
     display.refresh()
     last_update_sec = local_time.tm_sec
 
-    current_event = current_event - 1 if current_event > 1 else NUM_EVENTS
-
 ########################################################################################################################
 
+# Fixed-size crash/event journal (see src/journal.py). Boots are rare, so their records are written straight away
+crash_log = journal.Journal()
+for record in crash_log.recent(3): print('Earlier: {}'.format(record))
+crash_log.log(journal.BOOT, 'v{} {}'.format(VERSION, str(cpu.reset_reason).split('.')[-1]))
+if cpu.reset_reason == ResetReason.WATCHDOG:
+    section, description = guard.last_reset() or (guard.IDLE, 'no section recorded')
+    crash_log.log(journal.WATCHDOG, description, section)
+crash_log.flush()
+
 # Setup force sleep and wake buttons
 pin_down = DigitalInOut(board.BUTTON_DOWN)
 pin_down.switch_to_input(pull=Pull.UP)
@@ -608,8 +430,10 @@ snoozing = displayio.Group()
 # Append elements to clock_face
 try:
     splash_screen_image = 'splash-landscape.bmp' if landscape_orientation else 'splash-portrait.bmp'
-    clock_face.append(displayio.TileGrid(displayio.OnDiskBitmap(splash_screen_image), pixel_shader=displayio.ColorConverter()))
-    snoozing.append(displayio.TileGrid(displayio.OnDiskBitmap('sleeping.bmp'), pixel_shader=displayio.ColorConverter()))
+    images = Assets()
+    clock_face.append(load_image(splash_screen_image))
+    snoozing.append(load_image('sleeping.bmp'))
+    images = None   # The splash bitmap goes once the moon replaces it
 except Exception as e:
     print("Error loading image(s): {}".format(e))
     clock_face.append(Label(SMALL_FONT, color=0xFF0000, text='ERROR!'))
@@ -633,67 +457,135 @@ esp32_ready = DigitalInOut(board.ESP_BUSY)
 esp32_reset = DigitalInOut(board.ESP_RESET)
 spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
 esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-wifi = Network(status_neopixel=board.NEOPIXEL, esp=esp, external_spi=spi, debug=False)
-wifi.connect()
-
-get_utc_offset()
-get_lat_long()
+net = EspNet(esp, secrets['ssid'], secrets['password'], status_pin=board.NEOPIXEL, feed=guard.feed)
+guard.begin(guard.CONNECT)
+net.connect()
+guard.end(guard.CONNECT)
+socket_pool = net.socket_pool
+http = Session(socket_pool, tls_mode=esp.TLS_MODE, timeout=HTTP_TIMEOUT, feed=guard.feed)
 
-datetime = update_time()
+# The LAN aggregator first if there is one, then the public services, then the board's own computation
+ephemeris = Providers(([Aggregator(secrets['ephemeris_url'])] if 'ephemeris_url' in secrets else []) +
+                      [Usno(secrets.get('usno_url', USNO_URL)), MetNo(secrets.get('met_no_url', MET_NO_URL)), Computed()],
+                      feed=guard.feed)
 
-days = [
-    SolarEphemera(datetime),
-    SolarEphemera(time.localtime(time.mktime(datetime) + 86400))
-]
-
-watchdog.timeout = WATCHDOG_TIMEOUT
-watchdog.mode = WatchDogMode.RESET
-should_update_dst = False
+get_location()
 
-########################################################################################################################
+datetime = update_time()
+# First boot without location secrets: look it up now the RTC is set, or the saved record would be stamped in 2000 and
+# be stale on the next boot. The UTC offset it brings replaces the default, so sync again
+if location is None and not all(key in secrets for key in LOCATION_KEYS) and refresh_location():
+    datetime = update_time()
+location_refresh_due = location is not None and location.stale(time.time()) and not all(key in secrets for key in LOCATION_KEYS)
 
-while True:
-    display.rotation = (int(((math.atan2(-accelerometer.acceleration.y, -accelerometer.acceleration.x) + math.pi) / (math.pi * 2) + 0.875) * 4) % 4) * 90
-    landscape_orientation = display.rotation in (0, 180)
-    watchdog.feed()
+# With an MQTT broker configured, ephemera arrive as retained messages and HTTP is only a fallback
+push = None
+if 'mqtt_broker' in secrets:
+    try:
+        from push import Push
+        push = Push(socket_pool, secrets['mqtt_broker'], secrets.get('mqtt_port', 1883), secrets.get('mqtt_topic', 'moonclock'),
+                    secrets.get('mqtt_username'), secrets.get('mqtt_password'))
+        guard.begin(guard.PUSH)
+        push.connect()
+    except Exception as e:
+        print('MQTT unavailable, falling back to HTTP polling: {}'.format(e))
+        push = None
+    guard.end(guard.PUSH)
+
+days = Days(DAYS)
+view = ClockView(days, moon, SUN_PHEN_COLOR, MOON_PHEN_COLOR)    # Display strings, recomputed as days and moon change
+if push:
+    for i in range(DAYS): days.clear(i, time.localtime(time.mktime(datetime) + i * 86400))
+    for _ in range(20):
+        message = push.poll(wait=True)
+        if message: handle_push(*message)
+if not push or days[TODAY].percent is None:
+    fetch_days(datetime)
+print('HTTP session: {}'.format(http.stats()))
+
+def tick():
+    """The 10 Hz job: watchdog, buttons, push messages and the clock digits"""
+    guard.feed()
+    check_buttons()
+    if push:
+        message = push.poll()
+        if message: handle_push(*message)
+    update_display(True)
+    memstat.poll_serial()
+    gcpolicy.watch()
+
+def orient_display():
+    global landscape_orientation
+    rotation = (int(((math.atan2(-accelerometer.acceleration.y, -accelerometer.acceleration.x) + math.pi) / (math.pi * 2) + 0.875) * 4) % 4) * 90
+    if rotation != display.rotation:
+        display.rotation = rotation
+        landscape_orientation = rotation in (0, 180)
+
+def refresh():
+    """Day rollover, the 2 AM location check and a full redraw"""
+    global datetime, local_time, should_update_dst, location_refresh_due
     local_time = time.localtime()
+    clock_text.sync(local_time)
 
     if secrets['sleep_time'] != None and secrets['wake_time'] != None: sleep_or_wake()
 
     if local_time.tm_mday == days[TOMORROW].datetime.tm_mday:
         should_update_dst = True
         datetime = update_time()
-        days = [
-            SolarEphemera(datetime),
-            SolarEphemera(time.localtime(time.mktime(datetime) + 86400))
-        ]
+        if push and days[TOMORROW].percent is not None:
+            days.shift()
+            days.clear(DAYS - 1, time.localtime(time.mktime(datetime) + (DAYS - 1) * 86400))
+        else:
+            fetch_days(datetime)
         datetime = update_time()
 
-    if local_time.tm_hour == 2 and should_update_dst:
-        get_utc_offset()
+    # Daily around 2 AM (when DST changes), check whether the public IP address or UTC offset has changed
+    if location_refresh_due or (local_time.tm_hour == 2 and should_update_dst):
+        if not all(key in secrets for key in LOCATION_KEYS) and refresh_location():
+            fetch_days(datetime)
+        location_refresh_due = False
         should_update_dst = False
 
-    next_refresh_time = time.time() + REFRESH_DELAY
-    while(time.time() < next_refresh_time):
-        watchdog.feed()
-        check_buttons()
-        local_time = time.localtime()
-        update_display(True)
-        time.sleep(0.1)
-
-    # if asleep:
-    #     print('.', end = '')
-    #     check_buttons()
-    #     continue
-
-    datetime = update_time()
-    current_time = time.time()
-
     check_buttons()
     update_display()
     check_buttons()
-    gc.collect()
 
     print('Moon Clock: Version {} ({:,} RAM free) @ {} moon_frame: {}, percent_illum: {:.2f}, moon_phase: {}'.format(
-        VERSION, gc.mem_free(), strftime(local_time), moon_frame, percent_illum, moon_phase
+        VERSION, gc.mem_free(), strftime(local_time, utc_offset), view.frame, view.percent, view.phase_name
     ))
+    crash_log.maybe_flush()
+
+def sync_time():
+    global datetime
+    datetime = update_time()
+
+def summary():
+    # Or type 'm' on the serial console at any time for the memory summary
+    print(memstat.summary())
+    print(scheduler.summary())
+    print(gcpolicy.summary())
+    scheduler.reset()
+    gcpolicy.reset()
+
+gcpolicy.setup()
+guard.start(WATCHDOG_TIMEOUT)
+should_update_dst = False
+local_time = time.localtime()
+
+# Jobs due together run in this order. The offsets keep the slower jobs off the same tick as each other
+scheduler = Scheduler()
+scheduler.every('tick', TICK_MS, tick)
+scheduler.every('orient', ORIENT_MS, orient_display)
+scheduler.every('refresh', REFRESH_MS, refresh)
+scheduler.every('time', TIME_SYNC_MS, sync_time, TIME_SYNC_MS)
+scheduler.every('summary', SUMMARY_MS, summary, SUMMARY_MS)
+
+########################################################################################################################
+
+try:
+    while True:
+        # Collect, if it's due, in the time left before the next deadline rather than in the middle of a job
+        if scheduler.run_pending(): gcpolicy.idle(scheduler.until_next())
+        scheduler.idle()
+except Exception as e:
+    log_exception_and_restart(e)
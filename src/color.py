@@ -83,3 +83,19 @@ def adjust_brightness(color, value):
     h, s, l = rgb_to_hsl(r, g, b)
 
     return hsl_to_rgb(h, s, l * value)
+
+# Packs an RGB list, as returned by hsl_to_rgb() and adjust_brightness(), into a
+# single 0xRRGGBB value. Small ints don't allocate, so these are cheap to reuse.
+#
+# @param   {Array}   rgb     The RGB representation e.g. [51, 102, 153]
+# @return  {number}          The color value e.g. 0x336699
+def rgb_to_int(rgb):
+    return (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
+
+# Packs an RGB list into a 16-bit RGB565 value (5 bits red, 6 green, 5 blue), as
+# used by framebuf.RGB565 and the ST7789 LCD.
+#
+# @param   {Array}   rgb     The RGB representation e.g. [51, 102, 153]
+# @return  {number}          The RGB565 value e.g. 0x3333
+def rgb_to_565(rgb):
+    return ((rgb[0] & 0xF8) << 8) | ((rgb[1] & 0xFC) << 3) | (rgb[2] >> 3)
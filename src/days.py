@@ -0,0 +1,119 @@
+# Compact storage for a window of daily ephemera.
+#
+# A SolarEphemera carries a struct_time, a phase string, a float and four event times in an instance __dict__, which
+# comes to several hundred bytes of heap per day. Days keeps each day as one row of a shared array('l'): the day's
+# local time and its four events as epoch minutes, a phase code and the illumination in tenths of a percent. Reading
+# days[i] returns a preallocated view with the same attribute names as SolarEphemera, so the display code is unchanged.
+# Assigning a SolarEphemera to days[i] packs it into the row, after which the parsed object can be collected.
+# version goes up on every change, so anything derived from the rows can tell when to recompute.
+
+import time
+from array import array
+
+PHASES = ('New Moon', 'Waxing Crescent', 'First Quarter', 'Waxing Gibbous',
+          'Full Moon', 'Waning Gibbous', 'Last Quarter', 'Waning Crescent')
+
+DATE = 0
+SUNRISE = 1
+SUNSET = 2
+MOONRISE = 3
+MOONSET = 4
+PHASE = 5
+ILLUMINATION = 6
+FIELDS = 7
+
+MISSING = -1    # Event didn't happen that day, or the day hasn't been filled in
+
+
+def _minutes(seconds):
+    return MISSING if seconds is None else int(seconds) // 60
+
+
+class Day:
+    """Read-only view of one row, with the same attributes as SolarEphemera"""
+    __slots__ = ('_data', '_base')  # Saves a __dict__ per view on CPython; MicroPython ignores it
+
+    def __init__(self, data, row):
+        self._data = data
+        self._base = row * FIELDS
+
+    def _event(self, field):
+        minutes = self._data[self._base + field]
+        return None if minutes == MISSING else minutes * 60
+
+    @property
+    def datetime(self):
+        return time.localtime(self._data[self._base + DATE] * 60)
+
+    @property
+    def sunrise(self):
+        return self._event(SUNRISE)
+
+    @property
+    def sunset(self):
+        return self._event(SUNSET)
+
+    @property
+    def moonrise(self):
+        return self._event(MOONRISE)
+
+    @property
+    def moonset(self):
+        return self._event(MOONSET)
+
+    @property
+    def phase(self):
+        code = self._data[self._base + PHASE]
+        return None if code == MISSING else PHASES[code]
+
+    @property
+    def percent(self):
+        tenths = self._data[self._base + ILLUMINATION]
+        return None if tenths == MISSING else tenths / 10
+
+
+class Days:
+    def __init__(self, count=2):
+        self._data = array('l', [MISSING] * (count * FIELDS))
+        self._views = [Day(self._data, row) for row in range(count)]
+        self.version = 0
+
+    def __len__(self):
+        return len(self._views)
+
+    def __getitem__(self, row):
+        return self._views[row]
+
+    def __setitem__(self, row, ephemera):
+        """Pack a SolarEphemera (or anything with the same attributes) into a row"""
+        base = row * FIELDS
+        data = self._data
+        data[base + DATE] = _minutes(time.mktime(ephemera.datetime))
+        data[base + SUNRISE] = _minutes(ephemera.sunrise)
+        data[base + SUNSET] = _minutes(ephemera.sunset)
+        data[base + MOONRISE] = _minutes(ephemera.moonrise)
+        data[base + MOONSET] = _minutes(ephemera.moonset)
+        data[base + PHASE] = PHASES.index(ephemera.phase) if ephemera.phase in PHASES else MISSING
+        data[base + ILLUMINATION] = MISSING if ephemera.percent is None else int(ephemera.percent * 10 + 0.5)
+        self.version += 1
+
+    def minutes(self, row, field):
+        """A row's raw field, e.g. SUNRISE in epoch minutes or MISSING, without building a time"""
+        return self._data[row * FIELDS + field]
+
+    def shift(self):
+        """Drop the first day and move the others up one row, leaving the last row empty"""
+        data = self._data
+        for i in range(len(data) - FIELDS):
+            data[i] = data[i + FIELDS]
+        for i in range(len(data) - FIELDS, len(data)):
+            data[i] = MISSING
+        self.version += 1
+
+    def clear(self, row, datetime):
+        """Empty a row, keeping only its date (e.g. to be filled in later by a push)"""
+        base = row * FIELDS
+        for i in range(FIELDS):
+            self._data[base + i] = MISSING
+        self._data[base + DATE] = _minutes(time.mktime(datetime))
+        self.version += 1
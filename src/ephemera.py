@@ -0,0 +1,104 @@
+# The day record for sun and moon ephemera, with parsers for the USNO Astronomical Applications API and the compact
+# per-day payload served by the LAN aggregator in tools/ephemeris_aggregator.py. The fetching is done by providers.py.
+#
+# Nothing here touches the board, so the parsers can also be exercised on a desktop machine against the stand-in server
+# in tools/usno_stub.py.
+
+import json
+import time
+
+USNO_URL = 'https://aa.usno.navy.mil/api/rstt/oneday?date={}&coords={},{}&tz={}'
+
+def date_string(datetime):
+    """Format a struct_time as YYYY-MM-DD"""
+    return "{:04d}-{:02d}-{:02d}".format(datetime.tm_year, datetime.tm_mon, datetime.tm_mday)
+
+########################################################################################################################
+
+class SolarEphemera:
+    def __init__(self, datetime):
+        """An empty record for the day of datetime, filled in by a provider (see providers.py) or a push"""
+        self.sunrise = None
+        self.sunset = None
+        self.moonrise = None
+        self.moonset = None
+        self.percent = None
+        self.datetime = datetime
+        self.phase = None
+
+    def parse_usno(self, data_str):
+        """Parse a USNO rstt/oneday JSON response"""
+        try:
+            raw = json.loads(data_str)
+            data = raw['properties']['data']
+        except Exception as e:
+            print("Failed to parse USNO response: {}".format(e))
+            return
+
+        # "Waxing Crescent", "Waxing Gibbous", "Waning Crescent", "Waning Gibbous", "New Moon", "Full Moon"
+        self.phase = data.get('curphase', '')
+        daylight_saving_time = data.get('isdst', False)
+
+        try:
+            self.percent = float(data.get('fracillum', "0%").strip('%'))
+        except Exception as e:
+            print("Failed to parse fracillum: {}".format(e))
+            self.percent = 100 # Default to full moon
+
+        try:
+            for item in data.get('sundata', []):
+                phen = item.get('phen', '')
+                t = self.parse_usno_time(item.get('time'), self.datetime)
+                if phen == 'Rise':
+                    self.sunrise = t
+                elif phen == 'Set':
+                    self.sunset = t
+        except Exception as e:
+            print("Failed to parse sun events: {}".format(e))
+
+        try:
+            for item in data.get('moondata', []):
+                phen = item.get('phen', '')
+                t = self.parse_usno_time(item.get('time'), self.datetime)
+                if phen == 'Rise':
+                    self.moonrise = t
+                elif phen == 'Set':
+                    self.moonset = t
+        except Exception as e:
+            print("Failed to parse moon events: {}".format(e))
+
+    def parse_compact(self, data_str):
+        """
+        Parse the one-line payload served by tools/ephemeris_aggregator.py
+        Format: phase,percent,sunrise,sunset,moonrise,moonset e.g. 'Waxing Crescent,44,07:31,18:21,14:03,23:19'
+        Times are HH:MM local time, or empty if the event doesn't happen that day.
+        """
+        try:
+            phase, percent, sunrise, sunset, moonrise, moonset = data_str.strip().split(',')
+            self.percent = float(percent)
+        except Exception as e:
+            print("Failed to parse aggregator response: {}".format(e))
+            return
+
+        self.phase = phase
+        self.sunrise = self.parse_usno_time(sunrise, self.datetime)
+        self.sunset = self.parse_usno_time(sunset, self.datetime)
+        self.moonrise = self.parse_usno_time(moonrise, self.datetime)
+        self.moonset = self.parse_usno_time(moonset, self.datetime)
+
+    @staticmethod
+    def parse_usno_time(timestr, day=None):
+        """Epoch seconds for HH:MM on the date of struct_time day (today if None), or None if there's no time"""
+        if not timestr:
+            return None
+        try:
+            h, m = [int(x) for x in timestr.split(':')]
+            if day is None:
+                day = time.localtime()
+            t = time.struct_time((
+                day.tm_year, day.tm_mon, day.tm_mday, h, m, 0, -1, -1, -1
+            ))
+            return time.mktime(t)
+        except Exception as e:
+            print("Failed to parse time '{}': {}".format(timestr, e))
+            return None
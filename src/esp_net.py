@@ -0,0 +1,78 @@
+# WiFi through the MatrixPortal's ESP32 co-processor, without adafruit_matrixportal.network.
+#
+# Network imports adafruit_portalbase, adafruit_requests, adafruit_io, adafruit_fakerequests and neopixel, which cost
+# most of the RAM the imports take, yet the clock only called its connect(). EspNet does just what's needed on top of
+# adafruit_esp32spi: join the access point, read the time the ESP32 keeps from NTP, and provide the socket layer that
+# session.Session streams its GETs over. The status NeoPixel is set with the core neopixel_write module (blue while
+# connecting, red if it gave up) instead of the neopixel library.
+
+import time
+
+try:
+    from neopixel_write import neopixel_write
+except ImportError: # Not running on a board
+    neopixel_write = None
+
+CONNECTING = b'\x00\x00\x64'    # NeoPixel GRB bytes
+FAILED = b'\x00\x64\x00'
+OFF = b'\x00\x00\x00'
+ATTEMPTS = 10
+
+
+class EspNet:
+    def __init__(self, esp, ssid, password, status_pin=None, feed=None):
+        self.esp = esp
+        self.ssid = ssid
+        self.password = password
+        self.feed = feed            # Called between attempts, e.g. guard.feed
+        self._pixel = None
+        self._socket_pool = None
+        if status_pin is not None and neopixel_write is not None:
+            from digitalio import DigitalInOut, Direction
+            self._pixel = DigitalInOut(status_pin)
+            self._pixel.direction = Direction.OUTPUT
+
+    def status(self, grb):
+        if self._pixel is not None:
+            neopixel_write(self._pixel, grb)
+
+    def connect(self, attempts=ATTEMPTS):
+        """Join the access point if not already connected, raising OSError after attempts failures"""
+        attempt = 0
+        while not self.esp.is_connected:
+            self.status(CONNECTING)
+            attempt += 1
+            try:
+                self.esp.connect_AP(self.ssid, self.password)
+            except (ConnectionError, OSError, RuntimeError) as e:
+                print('Could not connect to {} ({}/{}): {}'.format(self.ssid, attempt, attempts, e))
+                if attempt >= attempts:
+                    self.status(FAILED)
+                    raise OSError('WiFi connection failed')
+                if self.feed:
+                    self.feed()
+                time.sleep(1)
+        self.status(OFF)
+
+    def utc_time(self):
+        """Epoch seconds (UTC) from the ESP32's NTP client, or None if it doesn't have the time yet"""
+        try:
+            value = self.esp.get_time()
+        except (OSError, RuntimeError, ValueError):
+            return None
+        if isinstance(value, tuple):    # Older adafruit_esp32spi releases
+            value = value[0]
+        return value or None
+
+    @property
+    def socket_pool(self):
+        """The socket layer for session.Session and push.Push"""
+        if self._socket_pool is None:
+            try:
+                from adafruit_esp32spi.adafruit_esp32spi_socketpool import SocketPool
+                self._socket_pool = SocketPool(self.esp)
+            except ImportError: # Older adafruit_esp32spi releases
+                from adafruit_esp32spi import adafruit_esp32spi_socket
+                adafruit_esp32spi_socket.set_interface(self.esp)
+                self._socket_pool = adafruit_esp32spi_socket
+        return self._socket_pool
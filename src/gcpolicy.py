@@ -0,0 +1,137 @@
+# When the garbage collector runs, and how long it pauses.
+#
+# Collecting on a fixed timer lands the pause wherever it falls, and anything the tick path allocates in between can
+# set off an automatic collection halfway through a refresh. Instead idle() is called in the slack after a refresh and
+# collects only when it's worth it: when free RAM has fallen below a floor, or when it's falling fast enough to reach
+# the floor before the next idle slot. It also waits for a slot long enough for the pause, going by the longest pause
+# seen so far, unless RAM is already under the floor. The floor is FLOOR, but when live data leaves little more than
+# that free even after a collection, it's three quarters of what the last collection left, so a heap that collecting
+# can't bring back above FLOOR isn't collected on every pass. idle() also never collects within MIN_INTERVAL_MS of the
+# last collection. Call before_large() ahead of a big allocation, such as an HTTP response, so the allocation finds a
+# compacted heap rather than triggering a collection of its own.
+#
+# watch() is cheap enough for the 100 ms tick. If free RAM has gone up since the last call and this module didn't
+# collect, the VM collected on its own, which is counted as a hitch. Where gc.threshold() exists (MicroPython; not all
+# CircuitPython builds have it) it's set high enough that automatic collections are only a backstop.
+#
+# Like memstat.py, everything lives in preallocated arrays so the bookkeeping doesn't allocate.
+
+import gc
+from array import array
+
+from ticker import ticks_diff, ticks_ms
+
+IDLE = 0
+FORCED = 1
+NAMES = ('idle', 'forced')
+
+COUNT = 0
+TOTAL_MS = 1
+MAX_MS = 2
+FIELDS = 3
+
+FLOOR = 24 * 1024           # Collect at the next idle slot once free RAM is below this (or below floor())
+MIN_INTERVAL_MS = 1000      # Shortest time between collections from idle()
+HORIZON_MS = 6000           # Collect early if RAM would reach the floor within this long (two refreshes)
+THRESHOLD_FRACTION = 0.75   # gc.threshold() as a fraction of free RAM after the first collection
+
+_stats = array('l', [0] * (len(NAMES) * FIELDS))
+_state = array('l', [0] * 6)
+LAST_FREE = 0       # Free RAM at the last watch() or collection
+AFTER = 1           # Free RAM just after the last collection
+AFTER_MS = 2        # ticks_ms() of the last collection
+AUTO = 3            # Automatic collections seen by watch()
+DEFERRED = 4        # idle() calls that wanted to collect but didn't have the slack
+PAUSE_MS = 5        # Longest pause so far, kept across reset()
+
+
+def setup():
+    """Collect once and move the automatic collection threshold out of the way"""
+    collect(FORCED)
+    threshold = getattr(gc, 'threshold', None)
+    if threshold is not None:
+        threshold(int(_state[AFTER] * THRESHOLD_FRACTION))
+
+
+def collect(reason):
+    started = ticks_ms()
+    gc.collect()
+    now = ticks_ms()
+    pause = ticks_diff(now, started)
+    base = reason * FIELDS
+    _stats[base + COUNT] += 1
+    _stats[base + TOTAL_MS] += pause
+    if pause > _stats[base + MAX_MS]:
+        _stats[base + MAX_MS] = pause
+    if pause > _state[PAUSE_MS]:
+        _state[PAUSE_MS] = pause
+    free = gc.mem_free()
+    _state[AFTER] = free
+    _state[AFTER_MS] = now
+    _state[LAST_FREE] = free
+    return pause
+
+
+def watch():
+    """Note an automatic collection if free RAM has risen since the last call"""
+    free = gc.mem_free()
+    if free > _state[LAST_FREE]:
+        _state[AUTO] += 1
+        _state[AFTER] = free
+        _state[AFTER_MS] = ticks_ms()
+    _state[LAST_FREE] = free
+
+
+def floor():
+    """FLOOR, unless the last collection left less than that free, in which case three quarters of what it left"""
+    after = _state[AFTER]
+    return FLOOR if after > FLOOR * 4 // 3 else after - after // 4
+
+
+def due(free, elapsed):
+    """Whether free RAM is low, or falling fast enough to be low within HORIZON_MS"""
+    low = floor()
+    if free < low:
+        return True
+    used = _state[AFTER] - free
+    # Time to reach the floor at the rate since the last collection. Divide first: used * HORIZON_MS would be a long int
+    return used > 0 and (free - low) // used * elapsed < HORIZON_MS
+
+
+def idle(slack_ms):
+    """Collect if it's due and the pause fits in slack_ms (or RAM is below the floor). Returns True if it collected"""
+    elapsed = ticks_diff(ticks_ms(), _state[AFTER_MS])
+    if elapsed < MIN_INTERVAL_MS:
+        return False
+    free = gc.mem_free()
+    if not due(free, elapsed):
+        return False
+    if free >= floor() and _state[PAUSE_MS] > slack_ms:
+        _state[DEFERRED] += 1
+        return False
+    collect(IDLE)
+    return True
+
+
+def before_large():
+    collect(FORCED)
+
+
+def reset():
+    for i in range(len(_stats)):
+        _stats[i] = 0
+    _state[AUTO] = 0
+    _state[DEFERRED] = 0
+
+
+def summary():
+    """
+    One line: name:count/total ms/max ms for idle and forced collections, then automatic collections and deferrals
+    Example: gc idle:4/52/14 forced:2/31/16 auto=0 deferred=1 free=61312
+    """
+    parts = ['gc']
+    for i, name in enumerate(NAMES):
+        base = i * FIELDS
+        parts.append('{}:{}/{}/{}'.format(name, _stats[base + COUNT], _stats[base + TOTAL_MS], _stats[base + MAX_MS]))
+    parts.append('auto={} deferred={} free={}'.format(_state[AUTO], _state[DEFERRED], _state[LAST_FREE]))
+    return ' '.join(parts)
@@ -0,0 +1,125 @@
+# Watchdog supervisor that knows which operation the clock was in when it stopped making progress.
+#
+# Long-running operations are wrapped in begin(section)/end(section), the same way memstat wraps subsystems. Entering a
+# section records its id in nvm, so after a watchdog reset the next boot can say where the clock was, even if it hung
+# inside a call that never returned. Each section has a time budget. feed() only feeds the hardware watchdog while every
+# open section is inside its budget. Once a budget is spent, the stall and the time the section was entered are written
+# to nvm and feeding stops, so the board resets within WATCHDOG_TIMEOUT with the culprit on record.
+#
+# Leaving the outermost open section records that the clock is outside any section, naming the section it left, so a
+# hang in the main loop isn't blamed on whichever section ran last. nvm is flash, so the record is only rewritten when
+# it changes. A section entered again within REPEAT_MS of being left, like the resync in update_time() every minute,
+# is marked as repeating and the record then stays as it is across its runs: a hang there is reported as "in or just
+# after" that section, and the steady state writes nothing.
+
+import time
+from array import array
+
+from microcontroller import nvm, watchdog
+from watchdog import WatchDogMode
+
+import store
+from ticker import ticks_ms, ticks_diff
+
+IDLE = 0
+CONNECT = 1
+TIME = 2
+EPHEMERA = 3
+LOCATION = 4
+PUSH = 5
+BUTTONS = 6
+NAMES = ('idle', 'connect', 'time', 'ephemera', 'location', 'push', 'buttons')
+BUDGETS = (0, 60, 30, 60, 30, 30, 20)   # Seconds each section may run, fed, before the board is allowed to reset
+
+ENTERED = 0     # Record statuses: in the section
+STALLED = 1     # In the section, which overran its budget
+LEFT = 2        # Outside any section, having left this one last
+REPEATING = 3   # In or between runs of a section entered again soon after it was left
+
+FEED_INTERVAL = 1000    # Milliseconds between hardware feeds. Feeding too quickly can crash the board
+REPEAT_MS = 5 * 60 * 1000
+
+_stack = array('b', [IDLE] * 4)     # Nested sections, e.g. check_buttons() -> wake() -> update_time()
+_entered_ms = array('l', [0] * 4)
+_depth = array('b', [0])
+_last_feed = array('l', [0])
+_left_ms = array('l', [0])          # When the outermost section was last left
+_state = array('b', [0, 0, -1, 0])  # Running, stalled, section and status last written to nvm
+
+
+def start(timeout):
+    """
+    Start the hardware watchdog. Sections entered before this are still recorded, but budgets only apply from here on
+    """
+    watchdog.timeout = timeout
+    watchdog.mode = WatchDogMode.RESET
+    _state[0] = 1
+    _last_feed[0] = ticks_ms()
+
+
+def begin(section):
+    depth = _depth[0] + 1 if _depth[0] < len(_stack) - 1 else _depth[0]
+    _depth[0] = depth
+    _stack[depth] = section
+    now = ticks_ms()
+    _entered_ms[depth] = now
+    if section != _state[2]:
+        record(section, ENTERED)
+    elif _state[3] == LEFT:
+        record(section, REPEATING if ticks_diff(now, _left_ms[0]) < REPEAT_MS else ENTERED)
+
+
+def end(section):
+    if _depth[0] > 0 and _stack[_depth[0]] == section:
+        _depth[0] -= 1
+        if not _depth[0]:
+            _left_ms[0] = ticks_ms()
+            if _state[3] != REPEATING or _state[2] != section:
+                record(section, LEFT)
+
+
+def record(section, status):
+    store.save_section(nvm, section, status, int(time.time()))
+    _state[2] = section
+    _state[3] = status
+
+
+def feed():
+    """Feed the watchdog if every open section is within its budget. Call this from loops that may run for a while"""
+    if not _state[0] or _state[1]:
+        return
+    now = ticks_ms()
+    for depth in range(1, _depth[0] + 1):
+        section = _stack[depth]
+        if ticks_diff(now, _entered_ms[depth]) > BUDGETS[section] * 1000:
+            _state[1] = 1
+            store.save_section(nvm, section, STALLED, int(time.time()) - ticks_diff(now, _entered_ms[depth]) // 1000)
+            print('Watchdog: {} stalled for more than {}s, letting the board reset'.format(NAMES[section], BUDGETS[section]))
+            return
+    if ticks_diff(now, _last_feed[0]) >= FEED_INTERVAL:
+        watchdog.feed()
+        _last_feed[0] = now
+
+
+def last_reset():
+    """
+    Describe the section record left by the previous run as (section id, description), then clear its stalled status
+    Call at boot after a watchdog reset. The id is IDLE if the clock was outside any section. Returns None if no
+    section has been recorded yet.
+    """
+    saved = store.load_section(nvm)
+    if saved is None:
+        return None
+    section, status, when = saved
+    name = NAMES[section] if section < len(NAMES) else str(section)
+    if status == STALLED:
+        description = '{} stalled, entered at {}'.format(name, when)
+        store.save_section(nvm, section, ENTERED, when)
+    elif status == LEFT:
+        description = 'outside any section, last left {} at {}'.format(name, when)
+        section = IDLE
+    elif status == REPEATING:
+        description = 'in or just after {}'.format(name)
+    else:
+        description = 'in {}, entered at {}'.format(name, when)
+    return section, description
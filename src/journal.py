@@ -0,0 +1,149 @@
+# Crash and event journal kept in a fixed-size ring of records on the CIRCUITPY drive.
+#
+# The file is created once at its full size and then only overwritten in place, so it never grows and the FAT doesn't
+# change after the first boot. Records are buffered in RAM and written out together on a schedule (or immediately
+# before a reset), so a normal day costs one small write rather than one per event. Each record carries a sequence
+# number, so the newest record is found by scanning rather than by rewriting a header on every flush.
+#
+# The drive is read-only to code unless boot.py remounts it (see README), in which case records are only printed.
+# tools/decode_journal.py reads the file back on a desktop machine.
+
+import gc
+import struct
+import time
+
+MAGIC = b'JRN1'
+HEADER_FORMAT = '<4sHH'     # Magic, record size, capacity
+HEADER_SIZE = 16
+RECORD_FORMAT = '<IIIHH48s'   # Sequence, epoch time, free RAM, kind, code (e.g. a watchdog section), text
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+TEXT_SIZE = 48
+
+BOOT = 1
+EXCEPTION = 2
+WATCHDOG = 3
+EVENT = 4
+KINDS = ('', 'boot', 'exception', 'watchdog', 'event')
+
+FLUSH_INTERVAL = 3600       # Seconds between scheduled flushes of buffered records
+PENDING = 4                 # Records buffered in RAM; a full buffer is flushed early
+
+
+class Journal:
+    def __init__(self, path='/journal.bin', capacity=64):
+        self.path = path
+        self.capacity = capacity
+        self.writable = True
+        self._pending = bytearray(PENDING * RECORD_SIZE)
+        self._count = 0
+        self._sequence = 0
+        self._last_flush = time.time()
+        try:
+            self._open()
+        except OSError as e:   # Read-only (the default for code on CIRCUITPY) or full
+            print('Journal disabled: {}'.format(e))
+            self.writable = False
+
+    def _open(self):
+        try:
+            with open(self.path, 'rb') as f:
+                magic, record_size, capacity = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+                if magic == MAGIC and record_size == RECORD_SIZE:
+                    self.capacity = capacity
+                    self._sequence = self._last_sequence(f) + 1
+                    return
+        except (OSError, ValueError):
+            pass
+        self._create()
+
+    def _last_sequence(self, f):
+        last = 0
+        for i in range(self.capacity):
+            f.seek(HEADER_SIZE + i * RECORD_SIZE)
+            record = f.read(4)
+            if len(record) < 4:
+                break
+            last = max(last, struct.unpack('<I', record)[0])
+        return last
+
+    def _create(self):
+        header = bytearray(HEADER_SIZE)
+        struct.pack_into(HEADER_FORMAT, header, 0, MAGIC, RECORD_SIZE, self.capacity)
+        with open(self.path, 'wb') as f:
+            f.write(header)
+            empty = bytes(RECORD_SIZE)
+            for _ in range(self.capacity):
+                f.write(empty)
+        self._sequence = 1
+
+    def log(self, kind, text, code=0):
+        """Buffer a record, printing it as well. Flushes early if the buffer is full"""
+        now = int(time.time())
+        free = gc.mem_free()
+        print('Journal: {} {} (RAM {:,}) {}'.format(KINDS[kind], now, free, text))
+        if not self.writable:
+            return
+        if self._count == PENDING:
+            self.flush()
+        struct.pack_into(RECORD_FORMAT, self._pending, self._count * RECORD_SIZE,
+                         self._sequence, now, free, kind, code, clip(text.encode(), TEXT_SIZE))
+        self._sequence += 1
+        self._count += 1
+
+    def flush(self):
+        """Write buffered records into their slots. Call before any deliberate reset"""
+        if not self._count:
+            return
+        try:
+            with open(self.path, 'r+b') as f:
+                for i in range(self._count):
+                    sequence = struct.unpack_from('<I', self._pending, i * RECORD_SIZE)[0]
+                    f.seek(HEADER_SIZE + (sequence - 1) % self.capacity * RECORD_SIZE)
+                    f.write(memoryview(self._pending)[i * RECORD_SIZE:(i + 1) * RECORD_SIZE])
+        except OSError as e:
+            print('Journal write failed: {}'.format(e))
+            self.writable = False
+        self._count = 0
+        self._last_flush = time.time()
+
+    def maybe_flush(self, now=None):
+        """Flush if anything is buffered and FLUSH_INTERVAL has passed since the last flush"""
+        now = time.time() if now is None else now
+        if self._count and not self._last_flush <= now < self._last_flush + FLUSH_INTERVAL:
+            self.flush()
+
+    def recent(self, count, kinds=(EXCEPTION, WATCHDOG)):
+        """Return up to count (sequence, time, free RAM, kind, code, text) tuples of the given kinds, newest first"""
+        self.flush()
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                for sequence in range(self._sequence - 1, max(0, self._sequence - 1 - self.capacity), -1):
+                    f.seek(HEADER_SIZE + (sequence - 1) % self.capacity * RECORD_SIZE)
+                    record = decode(f.read(RECORD_SIZE))
+                    if record[0] == sequence and record[3] in kinds:
+                        records.append(record)
+                        if len(records) == count:
+                            break
+        except OSError:
+            pass
+        return records
+
+
+def clip(encoded, size):
+    """UTF-8 bytes cut to at most size bytes without splitting a character"""
+    if len(encoded) <= size:
+        return encoded
+    while size and encoded[size] & 0xC0 == 0x80:  # Continuation byte: the cut would fall inside a character
+        size -= 1
+    return encoded[:size]
+
+
+def decode(record):
+    """Unpack one record into (sequence, time, free RAM, kind, code, text)"""
+    sequence, when, free, kind, code, text = struct.unpack(RECORD_FORMAT, record)
+    text = text.rstrip(b'\0')
+    try:
+        return sequence, when, free, kind, code, text.decode()
+    except UnicodeError:    # Written before clip(), cut part way through a character
+        return sequence, when, free, kind, code, clip(text, len(text) - 1).decode()
@@ -0,0 +1,51 @@
+# Moon clock on a Raspberry Pi Pico with a Waveshare Pico-LCD-1.14: the main loop that drives lcd_face.LcdFace.
+#
+# Copy this file to the Pico as main.py, along with lcd_display_code.py, lcd_face.py, color.py, moonphase.py,
+# timeutil.py, viewmodel.py, timeline.py, days.py and the moon folder of BMPs (see the README). The Pico has no
+# network, so the time comes from its RTC, which mpremote and Thonny set from the computer when they connect, and the
+# moon is computed by moonphase.Phase. With no ephemeris source there are no rise/set times, so the event slot stays
+# empty.
+#
+# The loop wakes once a second and hands LcdFace the current strings. LcdFace compares them with what's on screen, so
+# a pass redraws only the time (its colon flashes), plus the date when the day changes and the moon when the phase
+# moves on a frame (about every 7 hours).
+
+import time
+
+from machine import Pin, PWM
+
+from lcd_display_code import BL, LCD_1inch14
+from lcd_face import LcdFace
+from moonphase import Phase
+from timeutil import offset_seconds
+
+UTC_OFFSET = '-800'     # The RTC's offset from UTC, written like utc_offset in secrets.py
+BACKLIGHT = 32768       # PWM duty out of 65535
+EPOCH_2000 = 946684800  # Unix time of 2000-01-01, where time.time() starts on ports without a 1970 epoch
+NO_EVENT_COLOR = [0, 0, 0]
+
+
+def main():
+    backlight = PWM(Pin(BL))
+    backlight.freq(1000)
+    backlight.duty_u16(BACKLIGHT)
+
+    lcd = LCD_1inch14()
+    lcd.fill(0)
+    face = LcdFace(lcd)
+    moon = Phase(offset_seconds(UTC_OFFSET))
+    epoch = EPOCH_2000 if time.gmtime(0)[0] == 2000 else 0
+
+    while True:
+        now = time.time() + epoch   # Local Unix time, which is what Phase.update() takes
+        moon.update(now)
+        year, month, mday, hour, minute, second = time.localtime()[:6]
+        percent = '100%' if moon.percent >= 99.95 else '{:.1f}%'.format(moon.percent)
+        # 12-hour with a flashing colon, as on the matrix
+        time_text = '{}{}{:02d}'.format(hour % 12 or 12, ':' if second % 2 == 0 else ' ', minute)
+        face.update(moon.frame, moon.glyph, percent, time_text, '{}-{:02d}'.format(month, mday), '', '', NO_EVENT_COLOR)
+        time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 
 from machine import Pin,SPI,PWM
+from array import array
 import framebuf
 import time
 
@@ -10,6 +11,30 @@ MOSI = 11
 SCK = 10
 CS = 9
 
+X_OFFSET = 40   # Panel RAM column/row of the visible 240x135 area with MADCTL 0x70
+Y_OFFSET = 53
+MAX_DIRTY = 8   # Dirty rectangles tracked before they're merged into one
+
+# ST7789 setup, played back by init_display(): command, number of parameters, parameters
+INIT_SEQUENCE = bytes((
+    0x36, 1, 0x70,                          # MADCTL: landscape, RGB order
+    0x3A, 1, 0x05,                          # COLMOD: 16 bits per pixel
+    0xB2, 5, 0x0C, 0x0C, 0x00, 0x33, 0x33,  # PORCTRL
+    0xB7, 1, 0x35,                          # GCTRL
+    0xBB, 1, 0x19,                          # VCOMS
+    0xC0, 1, 0x2C,                          # LCMCTRL
+    0xC2, 1, 0x01,                          # VDVVRHEN
+    0xC3, 1, 0x12,                          # VRHS
+    0xC4, 1, 0x20,                          # VDVS
+    0xC6, 1, 0x0F,                          # FRCTRL2
+    0xD0, 2, 0xA4, 0xA1,                    # PWCTRL1
+    0xE0, 14, 0xD0, 0x04, 0x0D, 0x11, 0x13, 0x2B, 0x3F, 0x54, 0x4C, 0x18, 0x0D, 0x0B, 0x1F, 0x23,  # PVGAMCTRL
+    0xE1, 14, 0xD0, 0x04, 0x0C, 0x11, 0x13, 0x2C, 0x3F, 0x44, 0x51, 0x2F, 0x1F, 0x1F, 0x20, 0x23,  # NVGAMCTRL
+    0x21, 0,                                # INVON
+    0x11, 0,                                # SLPOUT
+    0x29, 0,                                # DISPON
+))
+
 class LCD_1inch14(framebuf.FrameBuffer):
     def __init__(self):
         self.width = 240
@@ -25,8 +50,14 @@ class LCD_1inch14(framebuf.FrameBuffer):
         self.dc = Pin(DC,Pin.OUT)
         self.dc(1)
         self.buffer = bytearray(self.height * self.width * 2)
+        self.pixels = memoryview(self.buffer)
         super().__init__(self.buffer, self.width, self.height, framebuf.RGB565)
+        self.cmd = bytearray(1)
+        self.window = bytearray(4)
+        self.dirty = array('h', [0] * (MAX_DIRTY * 4))  # x0, y0, x1, y1 (exclusive) per rectangle
+        self.dirty_count = 0
         self.init_display()
+        self.invalidate()
 
         self.red   =   0x07E0
         self.green =   0x001f
@@ -34,120 +65,163 @@ class LCD_1inch14(framebuf.FrameBuffer):
         self.white =   0xffff
 
     def write_cmd(self, cmd):
-        self.cs(1)
-        self.dc(0)
-        self.cs(0)
-        self.spi.write(bytearray([cmd]))
-        self.cs(1)
+        self.command(cmd)
 
     def write_data(self, buf):
+        self.cmd[0] = buf
         self.cs(1)
         self.dc(1)
         self.cs(0)
-        self.spi.write(bytearray([buf]))
+        self.spi.write(self.cmd)
         self.cs(1)
 
+    def command(self, cmd, params=None):
+        """Send a command and its parameters (any buffer) in one CS-asserted transfer"""
+        self.cmd[0] = cmd
+        self.cs(0)
+        self.dc(0)
+        self.spi.write(self.cmd)
+        if params:
+            self.dc(1)
+            self.spi.write(params)
+        self.cs(1)
+
+    def address(self, cmd, start, end):
+        """CASET or RASET from the preallocated window buffer. CS must already be asserted"""
+        w = self.window
+        w[0] = start >> 8
+        w[1] = start & 0xFF
+        w[2] = end >> 8
+        w[3] = end & 0xFF
+        self.cmd[0] = cmd
+        self.dc(0)
+        self.spi.write(self.cmd)
+        self.dc(1)
+        self.spi.write(w)
+
     def init_display(self):
-        """Initialize dispaly"""
+        """Initialize display"""
         self.rst(1)
         self.rst(0)
         self.rst(1)
 
-        self.write_cmd(0x36)
-        self.write_data(0x70)
-
-        self.write_cmd(0x3A)
-        self.write_data(0x05)
-
-        self.write_cmd(0xB2)
-        self.write_data(0x0C)
-        self.write_data(0x0C)
-        self.write_data(0x00)
-        self.write_data(0x33)
-        self.write_data(0x33)
-
-        self.write_cmd(0xB7)
-        self.write_data(0x35)
-
-        self.write_cmd(0xBB)
-        self.write_data(0x19)
-
-        self.write_cmd(0xC0)
-        self.write_data(0x2C)
-
-        self.write_cmd(0xC2)
-        self.write_data(0x01)
-
-        self.write_cmd(0xC3)
-        self.write_data(0x12)
-
-        self.write_cmd(0xC4)
-        self.write_data(0x20)
-
-        self.write_cmd(0xC6)
-        self.write_data(0x0F)
-
-        self.write_cmd(0xD0)
-        self.write_data(0xA4)
-        self.write_data(0xA1)
-
-        self.write_cmd(0xE0)
-        self.write_data(0xD0)
-        self.write_data(0x04)
-        self.write_data(0x0D)
-        self.write_data(0x11)
-        self.write_data(0x13)
-        self.write_data(0x2B)
-        self.write_data(0x3F)
-        self.write_data(0x54)
-        self.write_data(0x4C)
-        self.write_data(0x18)
-        self.write_data(0x0D)
-        self.write_data(0x0B)
-        self.write_data(0x1F)
-        self.write_data(0x23)
-
-        self.write_cmd(0xE1)
-        self.write_data(0xD0)
-        self.write_data(0x04)
-        self.write_data(0x0C)
-        self.write_data(0x11)
-        self.write_data(0x13)
-        self.write_data(0x2C)
-        self.write_data(0x3F)
-        self.write_data(0x44)
-        self.write_data(0x51)
-        self.write_data(0x2F)
-        self.write_data(0x1F)
-        self.write_data(0x1F)
-        self.write_data(0x20)
-        self.write_data(0x23)
-
-        self.write_cmd(0x21)
-
-        self.write_cmd(0x11)
-
-        self.write_cmd(0x29)
+        seq = memoryview(INIT_SEQUENCE)
+        i = 0
+        while i < len(seq):
+            count = seq[i + 1]
+            self.command(seq[i], seq[i + 2:i + 2 + count])
+            i += 2 + count
+
+    # Drawing calls mark the area they touch, so show() only sends what changed
+
+    def mark(self, x, y, w, h):
+        """Add a rectangle to the areas show() will send, merging it with one it overlaps"""
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        d = self.dirty
+        for i in range(0, self.dirty_count * 4, 4):
+            if x0 <= d[i + 2] and d[i] <= x1 and y0 <= d[i + 3] and d[i + 1] <= y1:
+                d[i] = min(d[i], x0)
+                d[i + 1] = min(d[i + 1], y0)
+                d[i + 2] = max(d[i + 2], x1)
+                d[i + 3] = max(d[i + 3], y1)
+                return
+        if self.dirty_count == MAX_DIRTY:
+            # Out of slots, so fall back to one rectangle around everything
+            for i in range(0, MAX_DIRTY * 4, 4):
+                x0 = min(x0, d[i])
+                y0 = min(y0, d[i + 1])
+                x1 = max(x1, d[i + 2])
+                y1 = max(y1, d[i + 3])
+            self.dirty_count = 0
+        i = self.dirty_count * 4
+        d[i], d[i + 1], d[i + 2], d[i + 3] = x0, y0, x1, y1
+        self.dirty_count += 1
+
+    def invalidate(self):
+        """Send the whole buffer on the next show()"""
+        self.dirty_count = 0
+        self.mark(0, 0, self.width, self.height)
+
+    def fill(self, c):
+        super().fill(c)
+        self.invalidate()
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        super().pixel(x, y, c)
+        self.mark(x, y, 1, 1)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.mark(x, y, w, 1)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.mark(x, y, 1, h)
+
+    def line(self, x1, y1, x2, y2, c):
+        super().line(x1, y1, x2, y2, c)
+        self.mark(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1)
+
+    def rect(self, x, y, w, h, c, *f):
+        super().rect(x, y, w, h, c, *f)
+        self.mark(x, y, w, h)
+
+    def fill_rect(self, x, y, w, h, c):
+        super().fill_rect(x, y, w, h, c)
+        self.mark(x, y, w, h)
+
+    def ellipse(self, x, y, xr, yr, c, *args):
+        super().ellipse(x, y, xr, yr, c, *args)
+        self.mark(x - xr, y - yr, 2 * xr + 1, 2 * yr + 1)
+
+    def text(self, s, x, y, c=1):
+        super().text(s, x, y, c)
+        self.mark(x, y, 8 * len(s), 8)
+
+    # The extent of these isn't cheap to work out, so they send the whole buffer
+
+    def blit(self, *args):
+        super().blit(*args)
+        self.invalidate()
+
+    def scroll(self, xstep, ystep):
+        super().scroll(xstep, ystep)
+        self.invalidate()
+
+    def poly(self, *args):
+        super().poly(*args)
+        self.invalidate()
 
     def show(self):
-        self.write_cmd(0x2A)
-        self.write_data(0x00)
-        self.write_data(0x28)
-        self.write_data(0x01)
-        self.write_data(0x17)
-
-        self.write_cmd(0x2B)
-        self.write_data(0x00)
-        self.write_data(0x35)
-        self.write_data(0x00)
-        self.write_data(0xBB)
-
-        self.write_cmd(0x2C)
-
-        self.cs(1)
-        self.dc(1)
+        """Send the dirty rectangles, each as its own CASET/RASET window streamed from slices of the buffer"""
+        d = self.dirty
+        for i in range(0, self.dirty_count * 4, 4):
+            self.show_rect(d[i], d[i + 1], d[i + 2], d[i + 3])
+        self.dirty_count = 0
+
+    def show_rect(self, x0, y0, x1, y1):
+        """Window, RAMWR and pixels for one rectangle, all in one CS-asserted transfer"""
         self.cs(0)
-        self.spi.write(self.buffer)
+        self.address(0x2A, x0 + X_OFFSET, x1 - 1 + X_OFFSET)
+        self.address(0x2B, y0 + Y_OFFSET, y1 - 1 + Y_OFFSET)
+        self.cmd[0] = 0x2C
+        self.dc(0)
+        self.spi.write(self.cmd)
+        self.dc(1)
+        stride = self.width * 2
+        if x0 == 0 and x1 == self.width:
+            # Full-width rows are contiguous in the buffer
+            self.spi.write(self.pixels[y0 * stride:y1 * stride])
+        else:
+            for y in range(y0, y1):
+                self.spi.write(self.pixels[y * stride + x0 * 2:y * stride + x1 * 2])
         self.cs(1)
 
 if __name__=='__main__':
@@ -0,0 +1,190 @@
+# Moon clock face for the Pico-LCD-1.14 (ST7789, 240x135) driven by LCD_1inch14 in lcd_display_code.py.
+#
+# Draws the same elements as the MatrixPortal face in code.py: the moon image, phase glyph, illumination percentage,
+# time, date and the next rise/set event. Each element has a fixed region, and update() only clears and redraws the
+# regions whose content changed. The driver then sends just those areas over SPI.
+#
+# Moon frames are 24-bit BMPs, scaled up and converted to RGB565 on first use. The converted pixels are written next to
+# the BMP as moonNN.565, so later boots read them straight into a buffer, and the last few frames are kept in RAM.
+#
+# framebuf only has an 8x8 font, so larger text is drawn by scaling each glyph from a one-character scratch buffer.
+
+import framebuf
+
+import color
+from viewmodel import TODAY_RISE, TOMORROW_RISE, TOMORROW_SET
+
+MOON_PATH = 'moon/moon{:02d}.bmp'
+MOON_SIZE = 32          # Source BMPs are 32x32, 24 bits per pixel
+
+# Regions: x, y, width, height
+PHASE = 0
+PERCENT = 1
+MOON = 2
+TIME = 3
+DATE = 4
+EVENT = 5
+REGIONS = (
+    (0, 2, 16, 16),
+    (16, 2, 88, 16),
+    (4, 24, 96, 96),
+    (108, 14, 132, 24),
+    (108, 56, 132, 16),
+    (108, 96, 132, 16),
+)
+
+COLOR_BRIGHTNESS = 0.5
+
+
+def lcd_color(rgb):
+    """RGB565 with the bytes swapped, because framebuf stores pixels little-endian and the ST7789 reads them big-endian"""
+    value = color.rgb_to_565(rgb)
+    return ((value & 0xFF) << 8) | (value >> 8)
+
+
+BACKGROUND = 0x0000
+PERCENT_COLOR = lcd_color(color.adjust_brightness(0x9B24F9, COLOR_BRIGHTNESS))
+TIME_COLOR = lcd_color(color.adjust_brightness(0xA00000, COLOR_BRIGHTNESS))
+DATE_COLOR = lcd_color(color.adjust_brightness(0x46BBDF, COLOR_BRIGHTNESS))
+MOON_PHASE_COLOR = lcd_color(color.adjust_brightness(0xBB9946, COLOR_BRIGHTNESS))
+
+
+class LcdFace:
+    def __init__(self, lcd, scale=3, cached_frames=4):
+        self.lcd = lcd
+        self.scale = scale
+        self.cached_frames = cached_frames
+        self.frames = {}        # Moon frame number -> FrameBuffer
+        self.frame_order = []   # Oldest first, for eviction
+        self.glyph = framebuf.FrameBuffer(bytearray(8), 8, 8, framebuf.MONO_HLSB)
+        self.shown = [None] * len(REGIONS)
+
+    def invalidate(self):
+        """Redraw every region on the next update(), e.g. after something else has drawn on the LCD"""
+        for i in range(len(REGIONS)):
+            self.shown[i] = None
+
+    def update(self, moon_frame, phase_glyph, percent_text, time_text, date_text, icon, event_text, event_color):
+        """
+        Redraw the regions whose content changed and send them to the LCD. Returns the number of regions redrawn
+        event_color is an [r, g, b] list like SUN_PHEN_COLOR and MOON_PHEN_COLOR in code.py
+        """
+        redrawn = 0
+        if self.changed(MOON, moon_frame):
+            x, y, w, h = REGIONS[MOON]
+            # LCD_1inch14.blit() would mark the whole screen dirty, so blit with the base class and mark just the moon
+            framebuf.FrameBuffer.blit(self.lcd, self.moon(moon_frame), x, y)
+            self.lcd.mark(x, y, w, h)
+            redrawn += 1
+        if self.changed(PHASE, phase_glyph):
+            self.text(PHASE, phase_glyph, 2, MOON_PHASE_COLOR, False)
+            redrawn += 1
+        if self.changed(PERCENT, percent_text):
+            self.text(PERCENT, percent_text, 2, PERCENT_COLOR)
+            redrawn += 1
+        if self.changed(TIME, time_text):
+            self.text(TIME, time_text, 3, TIME_COLOR)
+            redrawn += 1
+        if self.changed(DATE, date_text):
+            self.text(DATE, date_text, 2, DATE_COLOR)
+            redrawn += 1
+        event = (icon, event_text, event_color)
+        if self.changed(EVENT, event):
+            c = lcd_color(event_color)
+            x, y = self.text(EVENT, event_text, 2, c, offset=16)
+            if icon:    # No icon leaves the slot empty, e.g. with nothing to show
+                self.arrow(x - 16, y, icon in (TODAY_RISE, TOMORROW_RISE), icon in (TOMORROW_RISE, TOMORROW_SET), c)
+            redrawn += 1
+        if redrawn:
+            self.lcd.show()
+        return redrawn
+
+    def changed(self, region, value):
+        if self.shown[region] == value:
+            return False
+        self.shown[region] = value
+        return True
+
+    def text(self, region, s, scale, c, centered=True, offset=0):
+        """Clear a region and draw s in it at scale times the 8x8 font. Returns where the text starts"""
+        rx, ry, rw, rh = REGIONS[region]
+        lcd = self.lcd
+        lcd.fill_rect(rx, ry, rw, rh, BACKGROUND)     # Marks the region dirty for show()
+        size = 8 * scale
+        x = rx + (rw - len(s) * size - offset) // 2 + offset if centered else rx + offset
+        y = ry + (rh - size) // 2
+        # The region is already dirty, so draw with the base class and skip per-pixel dirty tracking
+        fill_rect = framebuf.FrameBuffer.fill_rect
+        glyph = self.glyph
+        for i in range(len(s)):
+            glyph.fill(0)
+            glyph.text(s[i], 0, 0, 1)
+            gx = x + i * size
+            for row in range(8):
+                run = -1
+                for col in range(9):
+                    on = col < 8 and glyph.pixel(col, row)
+                    if on and run < 0:
+                        run = col
+                    elif not on and run >= 0:
+                        # One rectangle per horizontal run of set pixels
+                        fill_rect(lcd, gx + run * scale, y + row * scale, (col - run) * scale, scale, c)
+                        run = -1
+        return x, y
+
+    def arrow(self, x, y, up, double, c):
+        """Rise/set icon in a 12x16 box: a stem with one arrowhead (today) or two (tomorrow)"""
+        lcd = self.lcd
+        lcd.fill_rect(x + 5, y + 1, 2, 14, c)
+        heads = (1, 5) if double else (1,)
+        for head in heads:
+            for i in range(5):
+                row = y + head + i if up else y + 14 - head - i
+                lcd.hline(x + 5 - i, row, 2 + 2 * i, c)
+
+    def moon(self, frame):
+        """FrameBuffer holding moon frame at self.scale, from RAM, the .565 file or the BMP, in that order"""
+        fb = self.frames.get(frame)
+        if fb is not None:
+            return fb
+        size = MOON_SIZE * self.scale
+        pixels = bytearray(size * size * 2)
+        path = MOON_PATH.format(frame)
+        cache = path[:-4] + '.565'
+        try:
+            with open(cache, 'rb') as f:
+                if f.readinto(pixels) != len(pixels):
+                    raise OSError('short')
+        except OSError:
+            self.convert(path, pixels)
+            try:
+                with open(cache, 'wb') as f:
+                    f.write(pixels)
+            except OSError:
+                pass    # Read-only filesystem, so convert again next boot
+        fb = framebuf.FrameBuffer(pixels, size, size, framebuf.RGB565)
+        if len(self.frame_order) >= self.cached_frames:
+            del self.frames[self.frame_order.pop(0)]
+        self.frames[frame] = fb
+        self.frame_order.append(frame)
+        return fb
+
+    def convert(self, path, pixels):
+        """Scale a bottom-up 24-bit BMP into big-endian RGB565 pixels"""
+        scale = self.scale
+        stride = MOON_SIZE * scale * 2
+        row = bytearray(MOON_SIZE * 3)
+        with open(path, 'rb') as f:
+            header = f.read(54)
+            f.seek(header[10] | header[11] << 8)
+            for y in range(MOON_SIZE - 1, -1, -1):
+                f.readinto(row)
+                start = y * scale * stride
+                for x in range(MOON_SIZE):
+                    value = color.rgb_to_565((row[3 * x + 2], row[3 * x + 1], row[3 * x]))    # BMP rows are BGR
+                    for i in range(scale):
+                        pixels[start + (x * scale + i) * 2] = value >> 8
+                        pixels[start + (x * scale + i) * 2 + 1] = value & 0xFF
+                # Repeat the row just written for the rest of the scaled block
+                for i in range(1, scale):
+                    pixels[start + i * stride:start + (i + 1) * stride] = pixels[start:start + stride]
@@ -0,0 +1,82 @@
+# Per-subsystem memory accounting with high-water marks.
+#
+# Wrap a subsystem call in begin()/end() to record free RAM around it. For each subsystem this keeps the number of
+# calls, the lowest free RAM seen on the way out, and the largest drop in free RAM across a single call. Everything
+# lives in one preallocated array, so recording doesn't allocate and can be left on in the 100 ms display tick.
+
+import gc
+from array import array
+
+try:
+    from supervisor import runtime
+except ImportError: # Not running on a board
+    runtime = None
+
+DISPLAY = 0
+EVENT = 1
+EPHEMERA = 2
+TIME = 3
+BUTTONS = 4
+NAMES = ('display', 'event', 'ephemera', 'time', 'buttons')
+
+CALLS = 0
+MIN_FREE = 1
+MAX_DELTA = 2
+BEFORE = 3
+FIELDS = 4
+
+UNSET = 0x7FFFFFFF
+
+_stats = array('l', [0] * (len(NAMES) * FIELDS))
+_low_water = array('l', [UNSET])
+
+
+def reset():
+    for i in range(len(NAMES)):
+        _stats[i * FIELDS + CALLS] = 0
+        _stats[i * FIELDS + MIN_FREE] = UNSET
+        _stats[i * FIELDS + MAX_DELTA] = 0
+    _low_water[0] = UNSET
+
+
+def begin(subsystem):
+    _stats[subsystem * FIELDS + BEFORE] = gc.mem_free()
+
+
+def end(subsystem):
+    free = gc.mem_free()
+    base = subsystem * FIELDS
+    _stats[base + CALLS] += 1
+    if free < _stats[base + MIN_FREE]:
+        _stats[base + MIN_FREE] = free
+        if free < _low_water[0]:
+            _low_water[0] = free
+    delta = _stats[base + BEFORE] - free
+    if delta > _stats[base + MAX_DELTA]:
+        _stats[base + MAX_DELTA] = delta
+
+
+def summary():
+    """
+    One compact line: overall minimum free RAM, then name:calls/min free/max delta for each subsystem used so far
+    Example: mem low=28416 display:310/28416/1280 time:10/29952/512 buttons:620/30464/0
+    """
+    parts = ['mem low={}'.format(_low_water[0] if _low_water[0] != UNSET else '-')]
+    for i, name in enumerate(NAMES):
+        base = i * FIELDS
+        if _stats[base + CALLS]:
+            parts.append('{}:{}/{}/{}'.format(
+                name, _stats[base + CALLS], _stats[base + MIN_FREE], _stats[base + MAX_DELTA]
+            ))
+    return ' '.join(parts)
+
+
+def poll_serial():
+    """Print the summary if 'm' has been typed on the serial console"""
+    if runtime is not None and runtime.serial_bytes_available:
+        import sys
+        if sys.stdin.read(1) == 'm':
+            print(summary())
+
+
+reset()
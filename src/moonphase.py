@@ -0,0 +1,104 @@
+# Moon phase computed locally from a reference new moon, both as the fallback when no ephemeris service can be reached
+# and as the clock's running phase model.
+#
+# Ages are fractions of the synodic month: 0.0 is new, 0.25 first quarter, 0.5 full and 0.75 last quarter. The
+# arithmetic on epoch seconds is done in integers, because CircuitPython's floats only carry about six significant
+# digits and an epoch time has ten. The mean age is corrected by the four largest periodic terms in the moon's and sun's
+# longitudes, which keeps it within an hour or so of the true phase (the mean alone drifts by up to about 14 hours).
+
+import math
+
+NEW_MOON = 947168374        # Mean new moon of 2000-01-06 14:20 TT, in Unix epoch seconds
+SYNODIC_SECONDS = 2551443   # 29.530588853 days
+J2000 = 946728000           # 2000-01-01 12:00 UTC
+MOON_ANOMALY = 0.374897     # Moon's mean anomaly at J2000, in turns
+MOON_ANOMALISTIC_SECONDS = 2380713  # 27.554550 days
+SUN_ANOMALY = 0.993136      # Sun's mean anomaly at J2000, in turns
+SUN_ANOMALISTIC_SECONDS = 31558433  # 365.259636 days
+
+FRAMES = 100                # moon/moon00.bmp to moon/moon99.bmp, in equal steps of age starting at new moon
+PERCENT_INTERVAL = 600      # Seconds between illumination updates when the frame isn't changing
+
+
+def turns(utc, epoch, period):
+    """Fraction of period elapsed at utc since epoch"""
+    return (int(utc) - epoch) % period / period
+
+
+def age(utc):
+    """Moon age at a Unix epoch time in UTC, as a fraction of the synodic month"""
+    elongation = turns(utc, NEW_MOON, SYNODIC_SECONDS) * 2 * math.pi
+    moon_anomaly = (turns(utc, J2000, MOON_ANOMALISTIC_SECONDS) + MOON_ANOMALY) * 2 * math.pi
+    sun_anomaly = (turns(utc, J2000, SUN_ANOMALISTIC_SECONDS) + SUN_ANOMALY) * 2 * math.pi
+    # Equation of centre of the moon and the sun, evection and variation, in degrees of elongation
+    degrees = (6.289 * math.sin(moon_anomaly) - 1.915 * math.sin(sun_anomaly) +
+               1.274 * math.sin(2 * elongation - moon_anomaly) + 0.658 * math.sin(2 * elongation))
+    return (elongation / (2 * math.pi) + degrees / 360) % 1
+
+
+def illumination(age):
+    """Percentage of the disc that is lit"""
+    return (1 - math.cos(age * 2 * math.pi)) * 50
+
+
+def phase_name(age):
+    """Name an age the way USNO does, e.g. 'Waxing Crescent'"""
+    if age < 0.02 or age > 0.98:
+        return 'New Moon'
+    if 0.48 < age < 0.52:
+        return 'Full Moon'
+    if 0.23 < age < 0.27:
+        return 'First Quarter'
+    if 0.73 < age < 0.77:
+        return 'Last Quarter'
+    return ('Waxing ' if age < 0.5 else 'Waning ') + ('Crescent' if age < 0.25 or age > 0.75 else 'Gibbous')
+
+
+def glyph(frame):
+    """'+' while waxing, '-' while waning, nothing around new and full moon (the same windows as phase_name)"""
+    if frame < 2 or frame > 97 or 47 < frame < 52:
+        return ''
+    return '+' if frame < 50 else '-'
+
+
+class Phase:
+    """
+    The moon frame, glyph and illumination at the current time, recomputed only when one of them is due to change
+    update() is called every tick. Between changes it costs one integer comparison, instead of trig and string matching.
+    """
+
+    def __init__(self, utc_offset=0):
+        self.utc_offset = utc_offset    # Seconds, so update() can take local epoch times like time.time()
+        self.age = 0.0
+        self.frame = -1
+        self.percent = 0.0
+        self.glyph = ''
+        self.name = None
+        self.next_change = 0            # Local epoch time of the next recompute
+
+    def set_utc_offset(self, utc_offset):
+        if utc_offset != self.utc_offset:
+            self.utc_offset = utc_offset
+            self.next_change = 0
+
+    def update(self, now):
+        """Bring the model up to local epoch time now. Returns True if it was recomputed"""
+        if now < self.next_change:
+            return False
+        self.recompute(int(now))
+        return True
+
+    def recompute(self, now):
+        a = age(now - self.utc_offset)
+        frame = int(a * FRAMES) % FRAMES
+        self.age = a
+        self.percent = illumination(a)
+        if frame != self.frame:
+            self.frame = frame
+            self.glyph = glyph(frame)
+            self.name = phase_name(a)
+        # The true age runs up to about a quarter faster or slower than the mean, so aim three quarters of the way to
+        # the next frame boundary at the mean rate. Near the boundary this converges in a few short steps.
+        remaining = (frame + 1) / FRAMES - a
+        step = int(remaining * SYNODIC_SECONDS * 3 / 4)
+        self.next_change = now + max(1, min(step, PERCENT_INTERVAL))
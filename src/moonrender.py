@@ -0,0 +1,99 @@
+# Draws the moon for any age into a 32x32 indexed displayio.Bitmap, in place of the 100 pre-rendered frames in moon/.
+#
+# Each row of the disc is a chord of the limb. The terminator is an ellipse whose half-width is cos(2 pi age) times the
+# limb's, so the lit part of every row runs from the terminator to one edge of the disc. render() works out those
+# integer spans once per age, then redraws only the rows whose span changed since the last render: the row is cleared
+# with bitmaptools.fill_region and the lit span is copied in from the surface texture with bitmaptools.blit. Without
+# the texture file (tools/make_moon_texture.py builds it) the lit part is a flat grey.
+#
+# The spans and texture are drawn as seen from the northern hemisphere, lit on the right while waxing. orient() turns
+# the TileGrid upside down for the southern hemisphere, so there is nothing extra to draw or store.
+
+import math
+
+import bitmaptools
+import displayio
+
+SIZE = 32
+TEXTURE_PATH = 'moon-texture.bin'   # TEXTURE_COLORS x r, g, b, then SIZE x SIZE palette indexes, top row first
+TEXTURE_COLORS = 16
+FLAT_COLOR = 0x8C8A8C
+
+
+def load_texture(path, size=SIZE):
+    """The texture's palette and pixels, as a displayio.Palette and displayio.Bitmap"""
+    with open(path, 'rb') as f:
+        colors = f.read(TEXTURE_COLORS * 3)
+        palette = displayio.Palette(TEXTURE_COLORS)
+        for i in range(TEXTURE_COLORS):
+            palette[i] = (colors[3 * i] << 16) | (colors[3 * i + 1] << 8) | colors[3 * i + 2]
+        texture = displayio.Bitmap(size, size, TEXTURE_COLORS)
+        bitmaptools.readinto(texture, f, bits_per_pixel=8)
+    return palette, texture
+
+
+def orient(tile_grid, latitude):
+    """Show the moon as seen from latitude: rotated 180 degrees south of the equator, lit on the left while waxing"""
+    south = latitude is not None and float(latitude) < 0
+    tile_grid.flip_x = south
+    tile_grid.flip_y = south
+
+
+class MoonRenderer:
+    def __init__(self, texture_path=TEXTURE_PATH, size=SIZE):
+        self.size = size
+        center = size / 2
+        # Half-width of the disc through the middle of each row
+        self.half = [math.sqrt(max(0, center * center - (y + 0.5 - center) ** 2)) for y in range(size)]
+        self.spans = bytearray(2 * size)            # Lit start and end column of each row
+        self.shown = bytearray(b'\xff' * (2 * size))  # Spans currently in the bitmap. 0xFF forces the first draw
+        self.age = None
+        try:
+            self.palette, self.texture = load_texture(texture_path, size)
+        except OSError as e:
+            print('No moon texture ({}), drawing a flat disc'.format(e))
+            self.palette, self.texture = displayio.Palette(2), None
+            self.palette[0] = 0x000000
+            self.palette[1] = FLAT_COLOR
+        self.bitmap = displayio.Bitmap(size, size, len(self.palette))
+
+    def render(self, age):
+        """Draw the moon at age (0.0 new, 0.5 full, 1.0 new again) and return the number of rows redrawn"""
+        if age == self.age:
+            return 0
+        self.age = age
+        size = self.size
+        center = size / 2
+        k = math.cos(age * 2 * math.pi)
+        waxing = age < 0.5
+        spans = self.spans
+        for y in range(size):
+            w = self.half[y]
+            # Waxing, the lit part runs from the terminator to the right-hand limb; waning, from the left-hand limb
+            start = center + w * k if waxing else center - w
+            end = center + w if waxing else center - w * k
+            spans[2 * y] = int(start + 0.5)
+            spans[2 * y + 1] = max(int(end + 0.5), spans[2 * y])
+        return self.draw()
+
+    def draw(self):
+        bitmap = self.bitmap
+        texture = self.texture
+        spans = self.spans
+        shown = self.shown
+        redrawn = 0
+        for y in range(self.size):
+            start = spans[2 * y]
+            end = spans[2 * y + 1]
+            if shown[2 * y] == start and shown[2 * y + 1] == end:
+                continue
+            bitmaptools.fill_region(bitmap, 0, y, self.size, y + 1, 0)
+            if end > start:
+                if texture is None:
+                    bitmaptools.fill_region(bitmap, start, y, end, y + 1, 1)
+                else:
+                    bitmaptools.blit(bitmap, texture, start, y, x1=start, y1=y, x2=end, y2=y + 1)
+            shown[2 * y] = start
+            shown[2 * y + 1] = end
+            redrawn += 1
+        return redrawn
@@ -0,0 +1,178 @@
+# Ephemeris sources behind one interface, tried in order of how they've been behaving lately.
+#
+# Each provider turns one day's data into a SolarEphemera, which is the common day record (days.Days packs it from
+# there). Providers make a single attempt with no retries. Providers keeps a moving average of each one's latency and
+# failure rate and tries the best first, so a slow or unreachable service costs one socket timeout, once, and then
+# moves to the back of the queue until the others start failing too. Providers marked fallback (the local
+# computation, which has no moonrise/moonset) are only used when every network source has failed.
+#
+# Like ephemera.py, nothing here touches the board.
+
+import json
+import math
+import time
+
+import moonphase
+from ephemera import SolarEphemera, USNO_URL, date_string
+from ticker import ticks_ms, ticks_diff
+from timeutil import iso_offset, offset_seconds, parse_iso_time, tz_hours_from_offset
+
+MET_NO_URL = 'https://api.met.no/weatherapi/sunrise/3.0/{}?lat={}&lon={}&date={}&offset={}'
+
+DECAY = 0.25                # Weight of the latest attempt in each moving average
+FAILURE_PENALTY_MS = 20000  # Added to a provider's score per unit of failure rate
+UNKNOWN_LATENCY_MS = 1000   # Assumed for a provider that hasn't been tried yet
+
+
+def event_time(properties, name):
+    """Epoch time of a met.no event, e.g. 'sunrise', or None if it doesn't happen that day"""
+    event = properties.get(name)
+    return parse_iso_time(event.get('time')) if event else None
+
+
+class Usno:
+    name = 'usno'
+    fallback = False
+
+    def __init__(self, url=USNO_URL):
+        self.url = url
+
+    def fetch(self, http, datetime, latitude, longitude, utc_offset):
+        day = SolarEphemera(datetime)
+        day.parse_usno(http.get(self.url.format(date_string(datetime), latitude, longitude,
+                                                tz_hours_from_offset(utc_offset))))
+        return day
+
+
+class Aggregator:
+    """The LAN aggregator in tools/ephemeris_aggregator.py"""
+    name = 'aggregator'
+    fallback = False
+
+    def __init__(self, url):
+        self.url = url
+
+    def fetch(self, http, datetime, latitude, longitude, utc_offset):
+        day = SolarEphemera(datetime)
+        day.parse_compact(http.get(self.url.format(date_string(datetime), latitude, longitude,
+                                                   tz_hours_from_offset(utc_offset))))
+        return day
+
+
+class MetNo:
+    """met.no's sunrise 3.0 API, which needs one request for the sun and one for the moon"""
+    name = 'met.no'
+    fallback = False
+
+    def __init__(self, url=MET_NO_URL):
+        self.url = url
+
+    def fetch(self, http, datetime, latitude, longitude, utc_offset):
+        day = SolarEphemera(datetime)
+        date_str = date_string(datetime)
+        offset = iso_offset(utc_offset)
+        sun = json.loads(http.get(self.url.format('sun', latitude, longitude, date_str, offset)))['properties']
+        day.sunrise = event_time(sun, 'sunrise')
+        day.sunset = event_time(sun, 'sunset')
+        sun = None
+        moon = json.loads(http.get(self.url.format('moon', latitude, longitude, date_str, offset)))['properties']
+        day.moonrise = event_time(moon, 'moonrise')
+        day.moonset = event_time(moon, 'moonset')
+        age = moon['moonphase'] / 360   # Degrees, 180 is full
+        day.phase = moonphase.phase_name(age)
+        day.percent = moonphase.illumination(age)
+        return day
+
+
+class Computed:
+    """Phase, illumination, sunrise and sunset computed on the board. There is no moonrise or moonset"""
+    name = 'computed'
+    fallback = True
+
+    def fetch(self, http, datetime, latitude, longitude, utc_offset):
+        day = SolarEphemera(datetime)
+        offset = offset_seconds(utc_offset)
+        noon = time.mktime(time.struct_time((datetime.tm_year, datetime.tm_mon, datetime.tm_mday, 12, 0, 0, -1, -1, -1)))
+        age = moonphase.age(noon - offset)
+        day.phase = moonphase.phase_name(age)
+        day.percent = moonphase.illumination(age)
+        day.sunrise = self.sun_event(datetime, float(latitude), float(longitude), offset, True)
+        day.sunset = self.sun_event(datetime, float(latitude), float(longitude), offset, False)
+        return day
+
+    @staticmethod
+    def sun_event(datetime, latitude, longitude, offset, rising):
+        """
+        Local epoch time of sunrise or sunset, or None if the sun doesn't rise or set that day
+        From the Almanac for Computers (1990) algorithm, which is good to a minute or two away from the poles
+        """
+        rad = math.pi / 180
+        start = time.mktime(time.struct_time((datetime.tm_year, 1, 1, 0, 0, 0, -1, -1, -1)))
+        midnight = time.mktime(time.struct_time((datetime.tm_year, datetime.tm_mon, datetime.tm_mday, 0, 0, 0, -1, -1, -1)))
+        day_of_year = (midnight - start) // 86400 + 1
+        lng_hour = longitude / 15
+        t = day_of_year + ((6 if rising else 18) - lng_hour) / 24
+        anomaly = 0.9856 * t - 3.289
+        sun_lng = (anomaly + 1.916 * math.sin(anomaly * rad) + 0.020 * math.sin(2 * anomaly * rad) + 282.634) % 360
+        ra = math.atan(0.91764 * math.tan(sun_lng * rad)) / rad % 360
+        ra = (ra + (sun_lng // 90) * 90 - (ra // 90) * 90) / 15
+        sin_dec = 0.39782 * math.sin(sun_lng * rad)
+        cos_dec = math.cos(math.asin(sin_dec))
+        cos_h = (math.cos(90.833 * rad) - sin_dec * math.sin(latitude * rad)) / (cos_dec * math.cos(latitude * rad))
+        if cos_h > 1 or cos_h < -1:
+            return None
+        hour_angle = (360 - math.acos(cos_h) / rad if rising else math.acos(cos_h) / rad) / 15
+        local_hours = (hour_angle + ra - 0.06571 * t - 6.622 - lng_hour + offset / 3600) % 24
+        return midnight + int(local_hours * 3600) // 60 * 60
+
+
+class Providers:
+    def __init__(self, providers, feed=None):
+        """feed, if given, is called after every attempt, e.g. to keep a watchdog from firing during a long failover"""
+        self.providers = providers
+        self.feed = feed
+        self.latency_ms = [UNKNOWN_LATENCY_MS] * len(providers)
+        self.failure_rate = [0.0] * len(providers)
+
+    def score(self, i):
+        return self.latency_ms[i] + self.failure_rate[i] * FAILURE_PENALTY_MS
+
+    def order(self):
+        """Provider indices, best first, with fallbacks last"""
+        ranked = list(range(len(self.providers)))
+        ranked.sort(key=lambda i: (self.providers[i].fallback, self.score(i)))
+        return ranked
+
+    def fetch(self, http, datetime, latitude, longitude, utc_offset):
+        """
+        Return a SolarEphemera for the day of datetime from the best provider that answers
+        If every provider fails, the record is empty, the same as a failed SolarEphemera fetch.
+        """
+        for i in self.order():
+            provider = self.providers[i]
+            started = ticks_ms()
+            if self.feed:
+                self.feed()
+            try:
+                day = provider.fetch(http, datetime, latitude, longitude, utc_offset)
+                if day.percent is None:
+                    raise ValueError('no phase in response')
+            except Exception as e:
+                print('{} failed after {} ms: {}'.format(provider.name, ticks_diff(ticks_ms(), started), e))
+                self.record(i, ticks_diff(ticks_ms(), started), True)
+                continue
+            finally:
+                if self.feed:
+                    self.feed()
+            self.record(i, ticks_diff(ticks_ms(), started), False)
+            print('Ephemera for {} from {}'.format(date_string(datetime), provider.name))
+            return day
+        return SolarEphemera(datetime)
+
+    def record(self, i, elapsed_ms, failed):
+        self.latency_ms[i] = int(self.latency_ms[i] * (1 - DECAY) + elapsed_ms * DECAY)
+        self.failure_rate[i] = self.failure_rate[i] * (1 - DECAY) + (DECAY if failed else 0)
+
+    def stats(self):
+        return ' '.join('{}:{}ms/{:.0f}%'.format(p.name, self.latency_ms[i], self.failure_rate[i] * 100)
+                        for i, p in enumerate(self.providers))
@@ -0,0 +1,87 @@
+# Optional MQTT push of ephemeris, time and sleep/wake overrides via the bundled adafruit_minimqtt.
+#
+# Instead of every clock polling USNO, a publisher on the LAN sends small retained messages to a local broker and the
+# clock keeps one idle connection open. Messages are only queued by the MQTT callback; poll() hands them back one at a
+# time from the main loop so a burst of updates never holds up the display.
+#
+# If the broker goes away, poll() stops talking to it and reconnects with exponential backoff: one attempt, of at most
+# CONNECT_TIMEOUT, per backoff window, inside the watchdog's push section. Times are ticker.ticks_ms() small ints, since
+# poll() runs on the 100 ms tick.
+#
+# Topics, relative to the configured prefix (default 'moonclock'):
+#   <prefix>/ephemeris/#  YYYY-MM-DD,phase,percent,sunrise,sunset,moonrise,moonset (SolarEphemera.parse_compact format)
+#   <prefix>/time         UTC epoch seconds
+#   <prefix>/sleep        'sleep', 'wake' or 'auto' (return to the sleep_time/wake_time schedule)
+
+import adafruit_minimqtt.adafruit_minimqtt as MQTT
+
+import guard
+from ticker import TICKS_MASK, ticks_diff, ticks_ms
+
+POLL_INTERVAL_MS = 1000   # How often poll() actually talks to the broker
+SOCKET_TIMEOUT = 0.05     # Upper bound on how long a poll can block
+CONNECT_TIMEOUT = 2       # Seconds to wait for the broker to accept a connection. It's on the LAN
+RETRY_MIN_MS = 2000       # Wait before the first reconnect, doubled after each failed one
+RETRY_MAX_MS = 5 * 60 * 1000
+MAX_PENDING = 4
+
+
+class Push:
+    def __init__(self, socket_pool, broker, port=1883, prefix='moonclock', username=None, password=None):
+        self._prefix = prefix + '/'
+        self._pending = []
+        self._polled_ms = (ticks_ms() - POLL_INTERVAL_MS) & TICKS_MASK
+        self._failed_ms = 0
+        self._retry_ms = 0          # Backoff before the next reconnect, 0 while connected
+        self.received = 0
+        self.dropped = 0
+        # connect_retries=1: minimqtt would otherwise retry with its own backoff inside a single connect()
+        self._client = MQTT.MQTT(
+            broker=broker, port=port, username=username, password=password, is_ssl=False, keep_alive=120,
+            socket_pool=socket_pool, socket_timeout=SOCKET_TIMEOUT, recv_timeout=CONNECT_TIMEOUT, connect_retries=1
+        )
+        self._client.on_message = self._on_message
+
+    def connect(self):
+        self._client.connect()
+        self._client.subscribe(self._prefix + '#')
+        print('MQTT subscribed to {}#'.format(self._prefix))
+
+    def _on_message(self, client, topic, message):
+        self.received += 1
+        if len(self._pending) < MAX_PENDING:
+            self._pending.append((topic[len(self._prefix):], message))
+        else:
+            self.dropped += 1
+
+    def poll(self, wait=False):
+        """
+        Service the MQTT connection at most once every POLL_INTERVAL_MS (or right away if wait is True), or while
+        disconnected, make one reconnect attempt once the backoff has passed.
+        Returns the next queued (topic, message) with the prefix removed, or None.
+        """
+        now = ticks_ms()
+        if self._retry_ms:
+            if ticks_diff(now, self._failed_ms) >= self._retry_ms:
+                self._reconnect()
+        elif wait or ticks_diff(now, self._polled_ms) >= POLL_INTERVAL_MS:
+            self._polled_ms = now
+            try:
+                self._client.loop(timeout=SOCKET_TIMEOUT)
+            except Exception as e:
+                self._failed_ms = now
+                self._retry_ms = RETRY_MIN_MS
+                print('MQTT loop failed: {}. Reconnecting in {} s'.format(e, RETRY_MIN_MS // 1000))
+        return self._pending.pop(0) if self._pending else None
+
+    def _reconnect(self):
+        guard.begin(guard.PUSH)
+        try:
+            self._client.reconnect()
+            self._retry_ms = 0
+            print('MQTT reconnected')
+        except Exception as e:
+            self._failed_ms = ticks_ms()
+            self._retry_ms = min(self._retry_ms * 2, RETRY_MAX_MS)
+            print('MQTT reconnect failed: {}. Next attempt in {} s'.format(e, self._retry_ms // 1000))
+        guard.end(guard.PUSH)
@@ -0,0 +1,108 @@
+# Periodic jobs run against absolute deadlines, with a lateness histogram per job.
+#
+# Each job has a period and a next deadline. run_pending() runs every job whose deadline has passed and moves its
+# deadline on by one period, so the time the job itself takes doesn't push later runs back. A job that has fallen a
+# whole period or more behind skips the runs it missed instead of running them back to back, and the skips are counted.
+# idle() sleeps until the earliest deadline.
+#
+# Times come from supervisor.ticks_ms() (via ticker.py) rather than time.monotonic_ns(): on the board the latter returns
+# a long int, which allocates on every call, while ticks_ms() is a small int and millisecond resolution is plenty for a
+# 100 ms tick. ticks_ms() wraps every 2**29 ms (about 6 days), so deadlines are compared with ticks_diff().
+
+import time
+from array import array
+
+from ticker import TICKS_MASK, TICKS_PERIOD, ticks_diff, ticks_ms
+
+BUCKETS = (1, 5, 10, 25, 50, 100, 250, 1000)   # Upper bounds in ms of each lateness bucket, plus one for the rest
+
+
+def behind(now, deadline):
+    """Milliseconds now is past deadline, negative if the deadline is still ahead"""
+    late = ticks_diff(now, deadline)
+    return late - TICKS_PERIOD if late >= TICKS_PERIOD // 2 else late
+
+
+class Scheduler:
+    def __init__(self, capacity=8):
+        self.names = []
+        self.functions = []
+        self.periods = array('l', [0] * capacity)
+        self.deadlines = array('l', [0] * capacity)
+        self.skipped = array('l', [0] * capacity)
+        self.worst = array('l', [0] * capacity)
+        self.histogram = array('l', [0] * (capacity * (len(BUCKETS) + 1)))
+
+    def every(self, name, period_ms, function, delay_ms=0):
+        """Run function every period_ms, first after delay_ms. Jobs due at the same time run in the order added"""
+        i = len(self.names)
+        if i == len(self.periods):
+            raise ValueError('scheduler full')
+        self.names.append(name)
+        self.functions.append(function)
+        self.periods[i] = period_ms
+        self.deadlines[i] = (ticks_ms() + delay_ms) & TICKS_MASK
+        return i
+
+    def run_pending(self):
+        """Run every job that is due. Returns the number of jobs run"""
+        ran = 0
+        for i in range(len(self.names)):
+            now = ticks_ms()
+            late = behind(now, self.deadlines[i])
+            if late < 0:
+                continue
+            self.record(i, late)
+            self.functions[i]()
+            period = self.periods[i]
+            missed = late // period
+            self.skipped[i] += missed
+            self.deadlines[i] = (self.deadlines[i] + (missed + 1) * period) & TICKS_MASK
+            ran += 1
+        return ran
+
+    def record(self, i, late):
+        if late > self.worst[i]:
+            self.worst[i] = late
+        bucket = 0
+        while bucket < len(BUCKETS) and late >= BUCKETS[bucket]:
+            bucket += 1
+        self.histogram[i * (len(BUCKETS) + 1) + bucket] += 1
+
+    def until_next(self):
+        """Milliseconds until the earliest deadline, 0 if a job is already due"""
+        now = ticks_ms()
+        wait = TICKS_PERIOD
+        for i in range(len(self.names)):
+            wait = min(wait, -behind(now, self.deadlines[i]))
+        return max(0, wait)
+
+    def idle(self):
+        wait = self.until_next()
+        if wait:
+            time.sleep(wait / 1000)
+
+    def reset(self):
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+        for i in range(len(self.names)):
+            self.skipped[i] = 0
+            self.worst[i] = 0
+
+    def summary(self):
+        """
+        One line per job: name, runs per lateness bucket, worst lateness and runs skipped
+        Example: tick <1:580 <5:17 <10:2 <25:1 worst=13ms skipped=0
+        """
+        lines = []
+        for i, name in enumerate(self.names):
+            base = i * (len(BUCKETS) + 1)
+            parts = [name]
+            for bucket in range(len(BUCKETS) + 1):
+                count = self.histogram[base + bucket]
+                if count:
+                    label = '<{}'.format(BUCKETS[bucket]) if bucket < len(BUCKETS) else '>={}'.format(BUCKETS[-1])
+                    parts.append('{}:{}'.format(label, count))
+            parts.append('worst={}ms skipped={}'.format(self.worst[i], self.skipped[i]))
+            lines.append(' '.join(parts))
+        return '\n'.join(lines)
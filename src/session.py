@@ -0,0 +1,239 @@
+# Minimal HTTP/1.1 client with keep-alive and per-host socket reuse.
+#
+# Every fetch through adafruit_matrixportal's Network opened a fresh socket, so consecutive requests to the same host
+# (e.g. today's and tomorrow's USNO data) each paid for a new TLS handshake on the ESP32. This session keeps one socket
+# open per (host, port) and reuses it for as long as the server allows. Any error closes that socket so the next
+# request starts from a clean connection.
+#
+# timeout bounds a whole request, from connecting to the end of the body, not just each read, so a server that sends
+# a few bytes at a time is abandoned with HTTPError like one that doesn't answer. feed, if given (guard.feed on the
+# board), is called before each read so a body that streams in for a few seconds doesn't starve the watchdog.
+#
+# The socket layer is passed in, so the same code runs against `adafruit_esp32spi_socket` on the board and the
+# standard `socket` module on a desktop machine (where only plain http:// is supported).
+
+from ticker import ticks_diff, ticks_ms
+
+HTTP_PORT = 80
+HTTPS_PORT = 443
+BUFFER_SIZE = 512
+
+
+def split_url(url):
+    """
+    Split a URL into (tls, host, port, path)
+    Example: https://aa.usno.navy.mil/api/rstt/oneday?x=1 -> (True, 'aa.usno.navy.mil', 443, '/api/rstt/oneday?x=1')
+    """
+    scheme, rest = url.split('://', 1)
+    tls = scheme == 'https'
+    slash = rest.find('/')
+    host, path = (rest, '/') if slash < 0 else (rest[:slash], rest[slash:])
+    port = HTTPS_PORT if tls else HTTP_PORT
+    if ':' in host:
+        host, port = host.split(':')
+        port = int(port)
+    return tls, host, port, path
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Session:
+    def __init__(self, socket_pool, tls_mode=None, timeout=10, user_agent='MoonClock', feed=None):
+        self._pool = socket_pool
+        self._tls_mode = tls_mode   # ESP32 SPI conntype for TLS, i.e. esp.TLS_MODE
+        self._timeout = timeout     # Seconds for a whole request
+        self._feed = feed
+        self._started = 0           # ticks_ms() when the request in progress began
+        self._user_agent = user_agent
+        self._sockets = {}          # (host, port) -> open socket
+        self._buffer = bytearray(BUFFER_SIZE)
+        self._start = 0             # Read position within _buffer
+        self._end = 0               # End of valid data within _buffer
+        self._current = None        # (host, port) of the request in progress
+        self.requests = 0
+        self.handshakes = 0
+        self.resets = 0
+        self.connect_ms = 0
+        self.elapsed_ms = 0
+
+    def stats(self):
+        return '{} requests, {} handshakes, {} resets, {} ms connecting, {} ms total'.format(
+            self.requests, self.handshakes, self.resets, self.connect_ms, self.elapsed_ms
+        )
+
+    def get(self, url):
+        """Return the body of url as a string, raising on a network error or non-2xx status"""
+        return b''.join(self.stream(url)).decode()
+
+    def stream(self, url, chunk_size=BUFFER_SIZE):
+        """
+        Yield the body of url as a series of bytes objects, at most chunk_size bytes each.
+        The socket is returned to the pool once the body has been fully read.
+        """
+        tls, host, port, path = split_url(url)
+        key = self._current = (host, port)
+        started = self._started = ticks_ms()
+        self.requests += 1
+        try:
+            length, chunked, close = self._request(key, tls, path)
+            if chunked:
+                while True:
+                    size = int(self._readline().split(';')[0], 16)
+                    if size == 0:
+                        self._readline()
+                        break
+                    for chunk in self._read_body(size, chunk_size):
+                        yield chunk
+                    self._readline()
+            elif length is not None:
+                for chunk in self._read_body(length, chunk_size):
+                    yield chunk
+            else:
+                close = True
+                for chunk in self._read_body(None, chunk_size):
+                    yield chunk
+        except GeneratorExit:
+            self._close(key)    # Abandoned part way through the body
+            raise
+        except Exception:
+            self.reset(key)
+            raise
+        finally:
+            self.elapsed_ms += ticks_diff(ticks_ms(), started)
+        if close:
+            self._close(key)
+
+    def reset(self, key=None):
+        """Close the socket for key (a (host, port) tuple), or every open socket if key is None"""
+        for k in list(self._sockets) if key is None else [key]:
+            if k in self._sockets:
+                self.resets += 1
+                self._close(k)
+
+    def _close(self, key):
+        sock = self._sockets.pop(key, None)
+        self._start = self._end = 0
+        if sock is not None:
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+    def _connect(self, key, tls):
+        started = ticks_ms()
+        sock = self._pool.socket(self._pool.AF_INET, self._pool.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            if tls:
+                sock.connect(key, self._tls_mode)
+            else:
+                sock.connect(key)
+        except Exception:
+            sock.close()
+            raise
+        self.handshakes += 1
+        self.connect_ms += ticks_diff(ticks_ms(), started)
+        self._sockets[key] = sock
+        return sock
+
+    def _request(self, key, tls, path):
+        request = 'GET {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: {}\r\nConnection: keep-alive\r\n\r\n'.format(
+            path, key[0], self._user_agent
+        ).encode()
+
+        # A pooled socket may have been closed by the server while idle, so allow one retry on a fresh connection
+        for reused in (key in self._sockets, False):
+            sock = self._sockets.get(key) or self._connect(key, tls)
+            self._start = self._end = 0
+            try:
+                sock.send(request)
+                status = self._readline()
+                break
+            except Exception:
+                self._close(key)
+                if not reused:
+                    raise
+
+        if not status.startswith('HTTP/'):
+            raise HTTPError('Bad status line: {}'.format(status))
+        code = int(status.split(' ')[1])
+
+        length = None
+        chunked = False
+        close = status.startswith('HTTP/1.0')
+        while True:
+            # Long headers (Set-Cookie, Content-Security-Policy, Link) are skipped; none of them matter here
+            line = self._readline(skip_long=True)
+            if line == '':
+                break
+            if line is None or ':' not in line:
+                continue
+            name, value = line.split(':', 1)
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = 'chunked' in value
+            elif name == 'connection':
+                close = value == 'close'
+
+        if not 200 <= code < 300:
+            raise HTTPError('HTTP {} from {}'.format(code, key[0]))
+        return length, chunked, close
+
+    def _fill(self):
+        if self._start > 0:
+            self._buffer[:self._end - self._start] = self._buffer[self._start:self._end]
+            self._end -= self._start
+            self._start = 0
+        elapsed = ticks_diff(ticks_ms(), self._started)
+        if elapsed >= self._timeout * 1000:
+            raise HTTPError('No complete response from {} in {} ms'.format(self._current[0], elapsed))
+        if self._feed:
+            self._feed()
+        sock = self._sockets[self._current]
+        sock.settimeout(self._timeout - elapsed / 1000)    # So the last read can't run past the deadline either
+        count = sock.recv_into(memoryview(self._buffer)[self._end:])
+        if not count:
+            raise HTTPError('Connection closed by server')
+        self._end += count
+
+    def _readline(self, skip_long=False):
+        """
+        The next line, without its line ending. A line that doesn't fit in the buffer raises HTTPError, unless skip_long
+        is set, in which case it's read to the end and dropped, and None is returned
+        """
+        scanned = self._start
+        skipping = False
+        while True:
+            for index in range(scanned, self._end):
+                if self._buffer[index] == 10:   # '\n'
+                    line = None if skipping else bytes(self._buffer[self._start:index]).decode().rstrip('\r')
+                    self._start = index + 1
+                    return line
+            if self._end - self._start >= BUFFER_SIZE:
+                if not skip_long:
+                    raise HTTPError('Line too long')
+                skipping = True
+                self._start = self._end     # Drop what's been read of it
+            scanned = self._end - self._start
+            self._fill()    # Moves unread data to the start of the buffer
+
+    def _read_body(self, remaining, chunk_size):
+        while remaining is None or remaining > 0:
+            if self._start == self._end:
+                try:
+                    self._fill()
+                except HTTPError:
+                    if remaining is None:
+                        return  # Body delimited by connection close
+                    raise
+            count = min(self._end - self._start, chunk_size)
+            if remaining is not None:
+                count = min(count, remaining)
+                remaining -= count
+            yield bytes(self._buffer[self._start:self._start + count])
+            self._start += count
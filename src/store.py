@@ -0,0 +1,73 @@
+# Small records kept in microcontroller.nvm so they survive resets.
+#
+# Layout (byte offsets into nvm):
+#   0       Forced sleep flag (1 = forced asleep)
+#   16-37   Location record: magic, saved time, latitude, longitude, UTC offset in minutes, public IPv4 address
+#   40-49   Watchdog section record: magic, section id, status (see guard.py), time of the last change
+
+import struct
+
+NVM_FORCED_SLEEP = 0
+NVM_LOCATION = 16
+NVM_SECTION = 40
+
+LOCATION_MAGIC = b'LOC1'
+LOCATION_FORMAT = '<4sIffh4s'
+LOCATION_SIZE = struct.calcsize(LOCATION_FORMAT)
+LOCATION_TTL = 7 * 86400    # Seconds before a saved location is refreshed in the background
+
+SECTION_MAGIC = b'SEC1'
+SECTION_FORMAT = '<4sBBI'
+SECTION_SIZE = struct.calcsize(SECTION_FORMAT)
+
+
+class Location:
+    def __init__(self, saved, latitude, longitude, offset_minutes, ip):
+        self.saved = saved
+        self.latitude = latitude
+        self.longitude = longitude
+        self.offset_minutes = offset_minutes
+        self.ip = ip
+
+    def stale(self, now):
+        return not self.saved <= now < self.saved + LOCATION_TTL
+
+    def same_place(self, other):
+        return (other is not None and self.ip == other.ip and self.offset_minutes == other.offset_minutes
+                and abs(self.latitude - other.latitude) < 0.01 and abs(self.longitude - other.longitude) < 0.01)
+
+    def utc_offset(self):
+        """UTC offset in the clock's '-700' / '+530' string format"""
+        minutes = abs(self.offset_minutes)
+        return '{}{}{:02d}'.format('-' if self.offset_minutes < 0 else '+', minutes // 60, minutes % 60)
+
+
+def load_location(nvm):
+    """Return the saved Location, or None if nothing valid has been saved"""
+    magic, saved, latitude, longitude, offset_minutes, ip = struct.unpack(
+        LOCATION_FORMAT, nvm[NVM_LOCATION:NVM_LOCATION + LOCATION_SIZE]
+    )
+    if magic != LOCATION_MAGIC:
+        return None
+    return Location(saved, latitude, longitude, offset_minutes, ip)
+
+
+def save_location(nvm, location):
+    record = struct.pack(LOCATION_FORMAT, LOCATION_MAGIC, location.saved, location.latitude, location.longitude,
+                         location.offset_minutes, location.ip)
+    if nvm[NVM_LOCATION:NVM_LOCATION + LOCATION_SIZE] != record:   # Flash has limited write cycles
+        nvm[NVM_LOCATION:NVM_LOCATION + LOCATION_SIZE] = record
+
+
+def load_section(nvm):
+    """Return (section id, status, time) from the last watchdog section record, or None"""
+    magic, section, status, when = struct.unpack(SECTION_FORMAT, nvm[NVM_SECTION:NVM_SECTION + SECTION_SIZE])
+    if magic != SECTION_MAGIC:
+        return None
+    return section, status, when
+
+
+def save_section(nvm, section, status, when):
+    record = struct.pack(SECTION_FORMAT, SECTION_MAGIC, section, status, when)
+    if nvm[NVM_SECTION:NVM_SECTION + SECTION_SIZE] != record:
+        nvm[NVM_SECTION:NVM_SECTION + SECTION_SIZE] = record
@@ -0,0 +1,88 @@
+# Allocation-free state for the 100 ms display tick.
+#
+# The tick used to build a struct_time, a formatted time string and an RGB list from adjust_brightness ten times a
+# second. ClockText instead counts seconds from supervisor.ticks_ms() (a small int, so no heap allocation) relative to
+# the last wall-clock sync. It rebuilds its 'H:MM' and 'H MM' strings only when the minute changes and otherwise hands
+# back the same two string objects. PhasePulse steps through a colour table computed once at startup.
+
+import time
+
+import color
+
+try:
+    from supervisor import ticks_ms
+except ImportError: # Not running on a board
+    def ticks_ms():
+        return (time.monotonic_ns() // 1000000) & TICKS_MASK
+
+TICKS_PERIOD = 1 << 29  # supervisor.ticks_ms() wraps at this value
+TICKS_MASK = TICKS_PERIOD - 1
+
+
+def ticks_diff(end, start):
+    """Milliseconds from start to end, allowing for one wrap of ticks_ms()"""
+    return (end - start) & TICKS_MASK
+
+
+class ClockText:
+    def __init__(self):
+        self._sync_ms = 0
+        self._sync_second = 0   # Second of the day at _sync_ms
+        self._minute = -1
+        self._colon = ''
+        self._blank = ''
+        self.text = ''
+
+    def sync(self, local_time, now_ms=None):
+        """Anchor the tick count to wall-clock time, e.g. whenever time.localtime() has been read anyway"""
+        self._sync_ms = ticks_ms() if now_ms is None else now_ms
+        self._sync_second = local_time.tm_hour * 3600 + local_time.tm_min * 60 + local_time.tm_sec
+
+    def tick(self, now_ms=None):
+        """
+        Return True if text has changed since the last tick
+        Text alternates between e.g. '2:35' on even seconds and '2 35' on odd seconds, the same as hh_mm()
+        """
+        elapsed = ticks_diff(ticks_ms() if now_ms is None else now_ms, self._sync_ms)
+        second = self._sync_second + elapsed // 1000
+        minute = second // 60 % 1440
+        if minute != self._minute:
+            self._minute = minute
+            hour12 = minute // 60 % 12 or 12
+            self._colon = '{0}:{1:02d}'.format(hour12, minute % 60)
+            self._blank = '{0} {1:02d}'.format(hour12, minute % 60)
+        text = self._colon if second % 2 == 0 else self._blank
+        if text is self.text:
+            return False
+        self.text = text
+        return True
+
+
+class PhasePulse:
+    """Brightening (waxing) or dimming (waning) phase glyph colour, one step per tick with a pause at the end"""
+
+    def __init__(self, base_color, steps=10, dwell=10):
+        self._colors = [color.rgb_to_int(color.adjust_brightness(base_color, i / steps)) for i in range(steps + 1)]
+        self._steps = steps
+        self._dwell_ticks = dwell
+        self._dwell = dwell
+        self._level = 0
+
+    def tick(self, brightening):
+        if brightening:
+            self._level += 1
+            if self._level >= self._steps:
+                self._level = self._steps
+                if self._dwell > 0: self._dwell -= 1
+                else:
+                    self._level = 0
+                    self._dwell = self._dwell_ticks
+        else:
+            self._level -= 1
+            if self._level <= 0:
+                self._level = 0
+                if self._dwell > 0: self._dwell -= 1
+                else:
+                    self._level = self._steps
+                    self._dwell = self._dwell_ticks
+        return self._colors[self._level]
@@ -0,0 +1,93 @@
+# Sun and moon events across the days in Days, in time order.
+#
+# The event slot used to cycle through every event of today and tomorrow, including those already past. Timeline keeps
+# the events that happen as two parallel arrays sorted by time: epoch minutes (small ints, as in days.py) and a kind
+# code saying which day row and which event each one is. Finding the next event, the next few, or the time until the
+# next of some kind is a binary search rather than a scan. rebuild() only re-sorts when Days.version has changed.
+
+from array import array
+
+from days import MISSING, SUNRISE
+
+SUN_RISE = 0    # Kind codes: row * EVENTS + event
+SUN_SET = 1
+MOON_RISE = 2
+MOON_SET = 3
+EVENTS = 4
+
+
+def day_of(kind):
+    return kind // EVENTS
+
+
+def event_of(kind):
+    return kind % EVENTS
+
+
+def is_sun(kind):
+    return kind % EVENTS < MOON_RISE
+
+
+def is_rise(kind):
+    return kind % 2 == 0
+
+
+def bisect_left(values, x, count):
+    """First index in values[:count] (sorted) whose value is >= x. CircuitPython has no bisect module"""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] < x:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Timeline:
+    def __init__(self, days):
+        self.days = days
+        self.minutes = array('l', [0] * (len(days) * EVENTS))
+        self.kinds = array('b', [0] * (len(days) * EVENTS))
+        self.count = 0
+        self._version = -1
+
+    def rebuild(self):
+        """Re-sort the events if the days have changed since the last call. Returns True if it did"""
+        if self.days.version == self._version:
+            return False
+        self._version = self.days.version
+        self.count = 0
+        for row in range(len(self.days)):
+            for event in range(EVENTS):
+                minutes = self.days.minutes(row, SUNRISE + event)
+                if minutes != MISSING:
+                    self.insert(minutes, row * EVENTS + event)
+        return True
+
+    def insert(self, minutes, kind):
+        # At most eight events, so an insertion sort is enough
+        i = self.count
+        while i > 0 and self.minutes[i - 1] > minutes:
+            self.minutes[i] = self.minutes[i - 1]
+            self.kinds[i] = self.kinds[i - 1]
+            i -= 1
+        self.minutes[i] = minutes
+        self.kinds[i] = kind
+        self.count += 1
+
+    def next_index(self, now):
+        """Index of the first event at or after the minute of epoch seconds now; count if there are none"""
+        return bisect_left(self.minutes, now // 60, self.count)
+
+    def upcoming(self, now, n):
+        """Indexes of the next n events (fewer if the window runs out)"""
+        first = self.next_index(now)
+        return range(first, min(first + n, self.count))
+
+    def until(self, now, event=None):
+        """Seconds from now to the next event (e.g. the next SUN_RISE on any day), or None if there isn't one"""
+        for i in range(self.next_index(now), self.count):
+            if event is None or self.kinds[i] % EVENTS == event:
+                return self.minutes[i] * 60 - now
+        return None
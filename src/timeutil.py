@@ -0,0 +1,154 @@
+# Time and UTC offset helpers shared by code.py, ephemera.py and providers.py.
+#
+# Nothing here touches the board, so these can be imported and benchmarked on a desktop machine (see
+# tools/bench_helpers.py).
+
+import time
+
+def parse_utc_offset(offset_str):
+    """
+    Convert a UTC offset string like '-700' or '-07:00' into (hours, minutes)
+    """
+    offset_str = offset_str.strip()
+    if ':' in offset_str:
+        hours_str, minutes_str = offset_str.split(':')
+    else:
+        # e.g., -700 → -7 hours, 0 minutes
+        val = int(offset_str)
+        hours_str = str(val // 100)
+        minutes_str = str(abs(val) % 100)
+    return int(hours_str), int(minutes_str)
+
+def format_utc_offset(offset_str):
+    """
+    Convert an offset like '-700', '-07:00', '+530', '+05:30' into standard ±HH:MM
+    """
+    offset_str = offset_str.strip()
+    if ':' in offset_str:
+        if offset_str[0] in '+-':
+            sign = offset_str[0]
+            hours, minutes = offset_str[1:].split(':')
+        else:
+            sign = '+'
+            hours, minutes = offset_str.split(':')
+        return "{}{:02d}:{:02d}".format(sign, int(hours), int(minutes))
+    else:
+        val = int(offset_str)
+        sign = '-' if val < 0 else '+'
+        val = abs(val)
+        hours = val // 100
+        minutes = val % 100
+        return '{}{:02d}:{:02d}'.format(sign, hours, minutes)
+
+def offset_seconds(utc_offset):
+    """'-700' or '-07:00' -> -25200"""
+    utc_offset = utc_offset.replace(':', '')
+    sign = -1 if utc_offset.startswith('-') else 1
+    digits = utc_offset.lstrip('+-')
+    if len(digits) <= 2:
+        return sign * int(digits) * 3600
+    return sign * (int(digits[:-2]) * 3600 + int(digits[-2:]) * 60)
+
+def iso_offset(utc_offset):
+    """'-700' or '-07:00' -> '-07:00'"""
+    seconds = offset_seconds(utc_offset)
+    minutes = abs(seconds) // 60
+    return '{}{:02d}:{:02d}'.format('-' if seconds < 0 else '+', minutes // 60, minutes % 60)
+
+def tz_hours_from_offset(utc_offset):
+    """
+    Convert a UTC offset string to an integer tz for USNO API.
+    Supports "-07:00", "-0700", "-7", "+05:30" etc.
+    Only hours are returned; minutes are ignored.
+    Valid USNO tz range: -12 <= tz <= 14
+    """
+    utc_offset = utc_offset.replace(':', '')
+    if utc_offset.startswith('-'):
+        sign = -1
+        digits = utc_offset[1:]
+    elif utc_offset.startswith('+'):
+        sign = 1
+        digits = utc_offset[1:]
+    else:
+        sign = 1
+        digits = utc_offset
+
+    if len(digits) >= 3:
+        hours = int(digits[:-2]) * sign
+    else:
+        hours = int(digits) * sign
+
+    if hours < -12 or hours > 14:
+        raise ValueError("tz offset out-of-bounds for USNO API: {}".format(hours))
+
+    return hours
+
+def parse_time(timestring):
+    if timestring == None:
+        return None
+
+    try:
+        date_time = timestring.split('T')
+        year_month_day = date_time[0].split('-')
+        hour_minute = date_time[1].split('+')[0].split('-')[0].split(':')
+    except Exception as e:
+        print('Exception parsing timestring: {0} - {1}'.format(timestring, e))
+        return None
+
+    return time.struct_time(( # Note: Extra parenthesis are needed because struct_time() now takes a tuple
+        int(year_month_day[0]),
+        int(year_month_day[1]),
+        int(year_month_day[2]),
+        int(hour_minute[0]),
+        int(hour_minute[1]),
+        0,  # second not provided by API
+        -1, # day of week
+        -1, # day of year
+        -1  # 1 = Yes, 0 = No, -1 = Unknown
+    ))
+
+def parse_iso_time(timestring):
+    """Epoch time of the local date and time in e.g. '2023-09-16T08:24-07:00', ignoring the offset"""
+    if not timestring:
+        return None
+    date_str, time_str = timestring.split('T')
+    year, month, day = [int(x) for x in date_str.split('-')]
+    hour, minute = [int(x) for x in time_str[:5].split(':')]
+    return time.mktime(time.struct_time((year, month, day, hour, minute, 0, -1, -1, -1)))
+
+def hh_mm(time_struct):
+    """
+    Return a 12-hour formatted string with alternating colon separator
+    Example: 2:35 ... 2 35 ... 2:35 ... 2 35 ...
+    """
+
+    hour = (time_struct.tm_hour) % 24
+    minute = (time_struct.tm_min) % 60
+
+    # Adjust hour if minutes overflow
+    if time_struct.tm_min >= 60:
+        hour = (hour + 1) % 24
+
+    # Format as 12-hour clock
+    hour12 = 12 if hour % 12 == 0 else hour % 12
+    # Flash colon time separator
+    separator = ':' if time_struct.tm_sec % 2 == 0 else ' '
+    return "{0}{1}{2:02d}".format(hour12, separator, minute)
+
+def strftime(time_struct, utc_offset):
+    """
+    Return a date/time string
+    Format: MM/DD/YYYY HH:MM:SS ±HHMM
+    """
+    hour = (time_struct.tm_hour) % 24
+    minute = (time_struct.tm_min) % 60
+
+    return "{0:0>2}/{1:0>2}/{2:0>4} {3:0>2}:{4:0>2}:{5:0>2} {6}".format(
+        time_struct.tm_mon,
+        time_struct.tm_mday,
+        time_struct.tm_year,
+        hour,
+        minute,
+        time_struct.tm_sec,
+        utc_offset
+    )
@@ -0,0 +1,101 @@
+# Display fields derived from the day records and the moon phase, kept until their inputs change.
+#
+# refresh_display() used to copy the phase fields, format the percentage and build the list of eight events on every
+# refresh, although the inputs change a few times an hour at most. ClockView holds the finished strings, colours and
+# frame index instead. update() brings them up to date and returns a mask of the groups that changed, so the render
+# path only touches labels whose text is different. Phase changes come from moonphase.Phase.update(); changes to the
+# day records from Days.version. The event strings follow the order of timeline.Timeline, so the event slot can rotate
+# through just the events still to come.
+
+import time
+
+from timeline import Timeline, day_of, is_rise, is_sun
+
+PHASE = 1       # frame, percent, phase_name, glyph, percent_text
+DATE = 2        # date_text
+EVENTS = 4      # event_icons, event_texts, event_colors
+ALL = PHASE | DATE | EVENTS
+
+TODAY = 0
+
+TODAY_RISE = '\u2191'   # ↑
+TODAY_SET = '\u2193'    # ↓
+TOMORROW_RISE = '\u219F'# ↟
+TOMORROW_SET = '\u21A1' # ↡
+NO_EVENT = '--:--'
+
+
+def event_icon(kind):
+    """Single arrows for today's events, double arrows for later days'"""
+    if day_of(kind) == TODAY:
+        return TODAY_RISE if is_rise(kind) else TODAY_SET
+    return TOMORROW_RISE if is_rise(kind) else TOMORROW_SET
+
+
+def event_text(seconds, sun):
+    """'H:MM' for an event, or '--:--' if it doesn't happen that day"""
+    if seconds is None:
+        return NO_EVENT
+    time_struct = time.localtime(seconds)
+    hour = 12 if sun and time_struct.tm_hour == 0 else time_struct.tm_hour
+    return '{0}:{1:0>2}'.format(hour, time_struct.tm_min)
+
+
+class ClockView:
+    def __init__(self, days, moon, sun_color, moon_color):
+        self.days = days
+        self.moon = moon
+        self.timeline = Timeline(days)
+        self.sun_color = sun_color
+        self.moon_color = moon_color
+        self.frame = 0
+        self.percent = 0.0
+        self.phase_name = ''
+        self.glyph = ''
+        self.percent_text = ''
+        self.date_text = ''
+        # One entry per timeline event, plus a last one shown when no events are left in the window
+        self.no_event = len(self.timeline.kinds)
+        self.event_icons = [''] * (self.no_event + 1)
+        self.event_texts = [NO_EVENT] * (self.no_event + 1)
+        self.event_colors = [moon_color] * (self.no_event + 1)
+        self.turn = -1      # Position in the rotation of upcoming events
+        self._mday = 0
+
+    def update(self, now, local_time):
+        """
+        Recompute whatever is out of date for local epoch time now (time.time() on the board, whose RTC runs on local
+        time, as moonphase.Phase.update() takes) and struct_time local_time. Returns a mask of changes
+        """
+        changed = 0
+        if self.moon.update(now):
+            moon = self.moon
+            self.frame, self.percent, self.phase_name, self.glyph = moon.frame, moon.percent, moon.name, moon.glyph
+            self.percent_text = '100%' if moon.percent >= 99.95 else '{:.1f}%'.format(moon.percent)
+            changed |= PHASE
+        if local_time.tm_mday != self._mday:
+            self._mday = local_time.tm_mday
+            self.date_text = '{0}-{1:02d}'.format(local_time.tm_mon, local_time.tm_mday)
+            changed |= DATE
+        timeline = self.timeline
+        if timeline.rebuild():
+            for i in range(timeline.count):
+                kind = timeline.kinds[i]
+                self.event_icons[i] = event_icon(kind)
+                self.event_texts[i] = event_text(timeline.minutes[i] * 60, is_sun(kind))
+                self.event_colors[i] = self.sun_color if is_sun(kind) else self.moon_color
+            changed |= EVENTS
+        return changed
+
+    def next_event(self, now):
+        """
+        Index of the event to show next: the rotation runs through the events from the minute of now onwards, soonest
+        first, and drops each one once it has passed. Returns no_event if none are left
+        """
+        timeline = self.timeline
+        first = timeline.next_index(now)
+        left = timeline.count - first
+        if not left:
+            return self.no_event
+        self.turn = self.turn + 1 if self.turn + 1 < left else 0
+        return first + self.turn
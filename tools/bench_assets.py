@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Flash footprint and decode latency of the packed asset bundle (src/assets.py, tools/pack_assets.py) against reading
+the same images through OnDiskBitmap, as the original BMPs and as the indexed BMPs from tools/optimize_assets.py.
+
+displayio and bitmaptools are the pure-Python stand-ins from tools/bench_moonrender.py. "OnDiskBitmap" reads every
+pixel with a seek and a read, which is what displayio does each time the image's area of the display is refreshed;
+the bundle is decoded once and then refreshes from RAM. Each decoded image is checked pixel for pixel against the
+panel colours of its BMP. Host times are far shorter than the M4's, so compare the columns with each other.
+
+Usage: python3 tools/bench_assets.py [file ...]   (default: the splash and sleeping images)
+"""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_moonrender
+import optimize_assets
+import pack_assets
+from optimize_assets import BIT_DEPTH, panel_color, read_bmp
+
+SRC = pack_assets.ROOT + '/src'
+REPEAT = 20
+
+
+def ondisk_read(path):
+    """Read every pixel of a BMP one at a time, as OnDiskBitmap does on a refresh"""
+    with open(path, 'rb') as f:
+        header = f.read(54)
+        offset = struct.unpack_from('<I', header, 10)[0]
+        width, height = struct.unpack_from('<ii', header, 18)
+        bpp = struct.unpack_from('<H', header, 28)[0]
+        stride = (width * bpp + 31) // 32 * 4
+        size = max(1, bpp // 8)
+        for y in range(height):
+            for x in range(width):
+                f.seek(offset + (height - 1 - y) * stride + x * bpp // 8)
+                f.read(size)
+
+
+def timed_ms(function):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        function()
+    return (time.perf_counter() - started) * 1000 / REPEAT
+
+
+def main():
+    names = sys.argv[1:] or pack_assets.default_names(SRC)
+    bench_moonrender.install_stubs()
+    import assets
+
+    work = tempfile.mkdtemp()
+    try:
+        run(assets, names, work)
+    finally:
+        shutil.rmtree(work)
+
+
+def run(assets, names, work):
+    bundle_path = os.path.join(work, 'assets.bin')
+    with open(bundle_path, 'wb') as f:
+        f.write(pack_assets.pack(SRC, names))
+    bundle = assets.Assets(bundle_path)
+
+    print('{:<24} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        '', 'BMP bytes', 'ms', 'indexed', 'ms', 'bundled', 'decode ms'))
+    flash = [0, 0]
+    for name in names:
+        original = os.path.join(SRC, name)
+        indexed = os.path.join(work, name)
+        optimize_assets.optimize(original, indexed, 1.0, BIT_DEPTH)
+        width, height, colors, offset, size = bundle.index[name]
+
+        bitmap, palette = bundle.load(name)
+        expected = read_bmp(original)[2]
+        for y in range(height):
+            for x in range(width):
+                value = palette[bitmap[x, y]]
+                if (value >> 16, value >> 8 & 0xFF, value & 0xFF) != panel_color(expected[y][x], 1.0, BIT_DEPTH):
+                    raise AssertionError('{}: pixel {},{} differs'.format(name, x, y))
+
+        flash[0] += os.path.getsize(original)
+        flash[1] += os.path.getsize(indexed)
+        print('{:<24} {:>10,} {:>10.2f} {:>10,} {:>10.2f} {:>10,} {:>10.2f}'.format(
+            name, os.path.getsize(original), timed_ms(lambda: ondisk_read(original)),
+            os.path.getsize(indexed), timed_ms(lambda: ondisk_read(indexed)),
+            colors * 3 + size + struct.calcsize(assets.INDEX_FORMAT), timed_ms(lambda: bundle.load(name))))
+    print('Flash: BMPs {:,} bytes, indexed BMPs {:,}, bundle {:,}'.format(flash[0], flash[1], os.path.getsize(bundle_path)))
+
+
+if __name__ == '__main__':
+    main()
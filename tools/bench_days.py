@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compare the heap held by a window of days as a list of SolarEphemera against the same days packed into days.Days.
+
+Each day is filled from the aggregator's compact payload, so both sides hold the same phase, illumination and four
+event times. Under the MicroPython unix port this counts bytes with gc.mem_alloc() around building the window, which
+matches what the board sees. Under CPython it uses tracemalloc, whose per-object sizes are larger than the board's
+but in the same proportion.
+
+Usage: python3 tools/bench_days.py [7 30 ...]   or   micropython tools/bench_days.py
+"""
+
+import gc
+import sys
+import time
+
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')  # No os.path on MicroPython
+
+from days import Days, FIELDS
+from ephemera import SolarEphemera
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+PAYLOAD = 'Waxing Crescent,44,07:31,18:21,14:03,23:19'
+
+
+def ephemera_list(count, start):
+    window = []
+    for i in range(count):
+        day = SolarEphemera(time.localtime(start + i * 86400))
+        day.parse_compact(PAYLOAD)
+        window.append(day)
+    return window
+
+
+def packed(count, start):
+    window = Days(count)
+    for i in range(count):
+        day = SolarEphemera(time.localtime(start + i * 86400))
+        day.parse_compact(PAYLOAD)
+        window[i] = day
+    return window
+
+
+def retained(build, count, start):
+    """Bytes still allocated once build() has returned and temporaries have been collected"""
+    if MICROPYTHON:
+        gc.collect()
+        before = gc.mem_alloc()
+        window = build(count, start)
+        gc.collect()
+        used = gc.mem_alloc() - before
+    else:
+        import tracemalloc
+        gc.collect()
+        tracemalloc.start()
+        window = build(count, start)
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    assert window[count - 1].moonset is not None
+    return used
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [7, 30]
+    start = time.mktime(time.localtime())
+    print('Heap held by a window of days on {}'.format(sys.implementation.name))
+    print('{:>5} {:>16} {:>12} {:>8}'.format('days', 'SolarEphemera', 'Days', 'ratio'))
+    for count in counts:
+        before = retained(ephemera_list, count, start)
+        after = retained(packed, count, start)
+        print('{:>5} {:>16} {:>12} {:>7.1f}x'.format(count, before, after, before / after))
+    print('Of the Days figure, the rows themselves are {} bytes per day; the rest is the views and the list holding them'
+          .format(FIELDS * 4))
+
+
+if __name__ == '__main__':
+    main()
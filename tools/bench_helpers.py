@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Time and heap cost per call of the board-free helpers: src/timeutil.py, src/color.py, SolarEphemera.parse_usno_time,
+ClockView.update between changes, and the three calls on the 100 ms display tick (ClockText.tick, PhasePulse.tick and
+moonphase.Phase.update).
+
+Under the MicroPython unix port bytes/call comes from gc.mem_alloc() with the collector disabled, which counts every
+allocation the way the board does. Under CPython it's tracemalloc's peak above the baseline during one call, averaged
+over a sample of calls, and CPython's boxed ints and larger objects make it higher than the board's. A helper that
+can't run on the current interpreter (MicroPython has no time.struct_time) is reported as n/a.
+
+ns/call is the fastest of five timed runs of --calls calls, since a run can only be slowed down by whatever else the
+host is doing. --json PATH writes the results as a baseline. --baseline PATH compares against one: a call more than
+25% slower, or any call that allocates more than before, is flagged, and the exit status is 1 if a tick-path call
+regressed. The tick-path calls are listed first and marked with *.
+
+Usage: python3 tools/bench_helpers.py [--calls 20000] [--json PATH] [--baseline PATH]   or   micropython ...
+"""
+
+import gc
+import json
+import sys
+import time
+
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')  # No os.path on MicroPython
+
+import color
+import timeutil
+from ephemera import SolarEphemera
+from moonphase import Phase
+from days import Days
+from ticker import ClockText, PhasePulse
+from viewmodel import ClockView
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+SLOWER = 1.25           # Ratio to the baseline's ns/call that counts as a regression
+REPEATS = 5             # Timed runs per helper, of which the fastest is reported
+ALLOC_SAMPLE = 200      # Calls measured one at a time for bytes/call on CPython
+
+
+class Options:
+    calls = 20000
+    json = None
+    baseline = None
+
+
+def parse_args(argv):
+    """argparse on CPython. The MicroPython unix port has no argparse, so there the same options are read by hand"""
+    if not MICROPYTHON:
+        import argparse
+        parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+        parser.add_argument('--calls', type=int, default=Options.calls)
+        parser.add_argument('--json', metavar='PATH', help='Write the results to PATH as a baseline')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare against the baseline in PATH')
+        return parser.parse_args(argv)
+    options = Options()
+    i = 0
+    while i < len(argv):
+        name = argv[i][2:]
+        if not argv[i].startswith('--') or not hasattr(Options, name) or i + 1 == len(argv):
+            print('usage: bench_helpers.py [--calls N] [--json PATH] [--baseline PATH]')
+            sys.exit(2)
+        setattr(options, name, int(argv[i + 1]) if name == 'calls' else argv[i + 1])
+        i += 2
+    return options
+
+
+def cases():
+    """(name, on the tick path, zero-argument callable)"""
+    local_time = time.localtime(1792400000)
+    clock_text = ClockText()
+    clock_text.sync(local_time, 0)
+    ticks = [0]
+
+    def clock_tick():
+        ticks[0] += 100
+        return clock_text.tick(ticks[0] % 60000)
+
+    pulse = PhasePulse(0xBB9946)
+    moon = Phase(-25200)
+    moon.update(1792400000)
+    view = ClockView(Days(2), Phase(-25200), 0xFBDE2C, 0xB8BFC9)
+    view.update(1792400000, local_time)
+    rgb = [187, 153, 70]
+    return (
+        ('ClockText.tick', True, clock_tick),
+        ('PhasePulse.tick', True, lambda: pulse.tick(True)),
+        ('Phase.update', True, lambda: moon.update(1792400001)),
+        ('ClockView.update', False, lambda: view.update(1792400001, local_time)),
+        ('color.rgb_to_int', False, lambda: color.rgb_to_int(rgb)),
+        ('color.rgb_to_565', False, lambda: color.rgb_to_565(rgb)),
+        ('color.rgb_to_hsl', False, lambda: color.rgb_to_hsl(187, 153, 70)),
+        ('color.hsl_to_rgb', False, lambda: color.hsl_to_rgb(0.1195, 0.4559, 0.5039)),
+        ('color.adjust_brightness', False, lambda: color.adjust_brightness(0xBB9946, 0.5)),
+        ('timeutil.hh_mm', False, lambda: timeutil.hh_mm(local_time)),
+        ('timeutil.strftime', False, lambda: timeutil.strftime(local_time, '-700')),
+        ('timeutil.parse_time', False, lambda: timeutil.parse_time('2023-09-16T20:02-07:00')),
+        ('timeutil.parse_iso_time', False, lambda: timeutil.parse_iso_time('2023-09-16T20:02-07:00')),
+        ('timeutil.parse_utc_offset', False, lambda: timeutil.parse_utc_offset('-07:00')),
+        ('timeutil.format_utc_offset', False, lambda: timeutil.format_utc_offset('-700')),
+        ('timeutil.offset_seconds', False, lambda: timeutil.offset_seconds('-700')),
+        ('timeutil.iso_offset', False, lambda: timeutil.iso_offset('-700')),
+        ('timeutil.tz_hours_from_offset', False, lambda: timeutil.tz_hours_from_offset('-07:00')),
+        ('SolarEphemera.parse_usno_time', False, lambda: SolarEphemera.parse_usno_time('07:31')),
+    )
+
+
+def measure(function, calls):
+    """(ns/call for the fastest of REPEATS runs, bytes/call)"""
+    function()
+    if MICROPYTHON:
+        best_us = None
+        for _ in range(REPEATS):
+            gc.collect()
+            gc.disable()
+            before = gc.mem_alloc()
+            started = time.ticks_us()
+            for _ in range(calls):
+                function()
+            elapsed_us = time.ticks_diff(time.ticks_us(), started)
+            allocated = gc.mem_alloc() - before
+            gc.enable()
+            if best_us is None or elapsed_us < best_us:
+                best_us = elapsed_us
+        gc.collect()
+        return best_us * 1000 / calls, allocated / calls
+    best_ns = None
+    for _ in range(REPEATS):
+        started = time.perf_counter_ns()
+        for _ in range(calls):
+            function()
+        elapsed_ns = time.perf_counter_ns() - started
+        if best_ns is None or elapsed_ns < best_ns:
+            best_ns = elapsed_ns
+    import tracemalloc
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(ALLOC_SAMPLE):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        function()
+        allocated += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return best_ns / calls, allocated / ALLOC_SAMPLE
+
+
+def main():
+    options = parse_args(sys.argv[1:])
+    calls = options.calls
+    baseline_path = options.baseline
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    regressed_tick = False
+    print('{} calls each on {}'.format(calls, sys.implementation.name))
+    print('  {:<32} {:>10} {:>11}  {}'.format('helper', 'ns/call', 'bytes/call', 'vs baseline' if baseline else ''))
+    for name, tick, function in cases():
+        try:
+            ns, allocated = measure(function, calls)
+        except (AttributeError, NotImplementedError) as e:
+            print('{} {:<32} {:>10} {:>11}  {}'.format('*' if tick else ' ', name, 'n/a', 'n/a', e))
+            continue
+        results[name] = {'ns': round(ns, 1), 'bytes': round(allocated, 1), 'tick': tick}
+        note = ''
+        if name in baseline:
+            old = baseline[name]
+            slower = ns > old['ns'] * SLOWER
+            grew = allocated > old['bytes'] + 0.5
+            note = '{:+.0%} time, {:+.1f} bytes'.format(ns / old['ns'] - 1 if old['ns'] else 0, allocated - old['bytes'])
+            if slower or grew:
+                note += '  REGRESSION'
+                regressed_tick = regressed_tick or tick
+        print('{} {:<32} {:>10.1f} {:>11.1f}  {}'.format('*' if tick else ' ', name, ns, allocated, note))
+
+    json_path = options.json
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'implementation': sys.implementation.name, 'calls': calls, 'results': results}, f)
+        print('Wrote {}'.format(json_path))
+    if regressed_tick:
+        print('* Tick-path regression')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
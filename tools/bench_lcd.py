@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Frames per second of the Pico-LCD-1.14 driver in src/lcd_display_code.py against a stubbed SPI bus.
+
+Runs the driver's demo loop (the four corner squares toggling between filled and outlined) and compares sending the
+whole buffer every frame with sending only the dirty rectangles, each both ways: through the driver as it is, and
+through the original write_cmd()/write_data() path, which put every command and parameter byte in a CS-asserted
+transfer of its own (Legacy below, driving the same LCD_1inch14 and stub bus). The new full-frame row is
+invalidate() followed by show(). The stub counts bytes, SPI writes and CS-asserted transactions, for init_display()
+as well as per frame. The bus time for a frame is its bytes at the SPI clock plus a fixed cost per write and per
+transaction, and the reported rate adds the measured CPU time of show().
+
+machine is always stubbed. framebuf is the real module under the MicroPython unix port; under CPython a small
+pure-Python stand-in covers the drawing calls the demo and lcd_face.py use.
+
+Usage: python3 tools/bench_lcd.py [--frames 200] [--write-us 4] [--transaction-us 6]   or   micropython tools/bench_lcd.py
+"""
+
+import sys
+import time
+
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')  # No os.path on MicroPython
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+
+
+class Bus:
+    bytes = 0
+    writes = 0
+    transactions = 0
+
+    @classmethod
+    def reset(cls):
+        cls.bytes = cls.writes = cls.transactions = 0
+
+
+class Pin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, pin, mode=None):
+        self.pin = pin
+        self.level = 1
+
+    def __call__(self, level=None):
+        if level is None:
+            return self.level
+        if self.pin == 9 and self.level and not level:  # CS asserted
+            Bus.transactions += 1
+        self.level = level
+
+    def value(self, level=None):
+        return self(level)
+
+
+class SPI:
+    def __init__(self, bus, baudrate=1000000, **kwargs):
+        self.baudrate = baudrate
+
+    def write(self, data):
+        Bus.bytes += len(data)
+        Bus.writes += 1
+
+
+class PWM:
+    def __init__(self, pin):
+        pass
+
+
+class FrameBuffer:
+    """Just enough of framebuf.FrameBuffer (RGB565 and MONO_HLSB) for the driver's demo loop and lcd_face.py"""
+
+    def __init__(self, buffer, width, height, format):
+        self._buf = buffer
+        self._width = width
+        self._height = height
+        self._format = format
+
+    def fill_rect(self, x, y, w, h, c):
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, self._width), min(y + h, self._height)
+        if x0 >= x1:
+            return
+        if self._format == MONO_HLSB:
+            for yy in range(y0, y1):
+                for xx in range(x0, x1):
+                    self.pixel(xx, yy, c)
+            return
+        row = bytes((c & 0xFF, c >> 8)) * (x1 - x0)
+        for yy in range(y0, y1):
+            start = (yy * self._width + x0) * 2
+            self._buf[start:start + len(row)] = row
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self._width, self._height, c)
+
+    def pixel(self, x, y, c=None):
+        if self._format != MONO_HLSB:
+            return self.fill_rect(x, y, 1, 1, c)
+        index = (y * self._width + x) // 8
+        bit = 0x80 >> (x % 8)
+        if c is None:
+            return 1 if self._buf[index] & bit else 0
+        self._buf[index] = self._buf[index] | bit if c else self._buf[index] & ~bit
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            return self.fill_rect(x, y, w, h, c)
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def text(self, s, x, y, c=1):
+        # Not the real font, but a similar number of set pixels per character
+        for i, ch in enumerate(s):
+            for row in range(7):
+                for col in range(6):
+                    if (ord(ch) >> ((row + col) % 7)) & 1:
+                        self.pixel(x + 8 * i + col, y + row, c)
+
+    def blit(self, source, x, y, *args):
+        for yy in range(source._height):
+            start = ((y + yy) * self._width + x) * 2
+            self._buf[start:start + source._width * 2] = source._buf[yy * source._width * 2:(yy + 1) * source._width * 2]
+
+
+MONO_HLSB = 0
+RGB565 = 1
+
+
+def install_stubs():
+    machine = type(sys)('machine')
+    machine.Pin, machine.SPI, machine.PWM = Pin, SPI, PWM
+    sys.modules['machine'] = machine
+    try:
+        import framebuf
+    except ImportError:
+        framebuf = type(sys)('framebuf')
+        framebuf.FrameBuffer = FrameBuffer
+        framebuf.MONO_HLSB = MONO_HLSB
+        framebuf.RGB565 = RGB565
+        sys.modules['framebuf'] = framebuf
+
+
+def ticks_us():
+    return time.ticks_us() if MICROPYTHON else int(time.perf_counter() * 1000000)
+
+
+def demo_frame(lcd, frame):
+    """One pass of the driver's demo loop, with a different key held each frame"""
+    for key, (x, y) in enumerate(((12, 12), (12, 103), (208, 12), (208, 103))):
+        if frame % 4 == key:
+            lcd.fill_rect(x, y, 20, 20, lcd.red)
+        else:
+            lcd.fill_rect(x, y, 20, 20, lcd.white)
+            lcd.rect(x, y, 20, 20, lcd.red)
+
+
+class Legacy:
+    """The driver's SPI path before commands were batched: one CS-asserted transfer per command or parameter byte"""
+
+    def __init__(self, lcd):
+        self.lcd = lcd
+
+    def write_cmd(self, cmd):
+        lcd = self.lcd
+        lcd.cs(1)
+        lcd.dc(0)
+        lcd.cs(0)
+        lcd.spi.write(bytearray([cmd]))
+        lcd.cs(1)
+
+    def write_data(self, buf):
+        lcd = self.lcd
+        lcd.cs(1)
+        lcd.dc(1)
+        lcd.cs(0)
+        lcd.spi.write(bytearray([buf]))
+        lcd.cs(1)
+
+    def init_display(self):
+        """The same ST7789 setup as INIT_SEQUENCE, a byte at a time"""
+        from lcd_display_code import INIT_SEQUENCE
+        lcd = self.lcd
+        lcd.rst(1)
+        lcd.rst(0)
+        lcd.rst(1)
+        i = 0
+        while i < len(INIT_SEQUENCE):
+            count = INIT_SEQUENCE[i + 1]
+            self.write_cmd(INIT_SEQUENCE[i])
+            for param in INIT_SEQUENCE[i + 2:i + 2 + count]:
+                self.write_data(param)
+            i += 2 + count
+
+    def show_rect(self, x0, y0, x1, y1):
+        from lcd_display_code import X_OFFSET, Y_OFFSET
+        lcd = self.lcd
+        self.write_cmd(0x2A)
+        self.write_data((x0 + X_OFFSET) >> 8)
+        self.write_data((x0 + X_OFFSET) & 0xFF)
+        self.write_data((x1 - 1 + X_OFFSET) >> 8)
+        self.write_data((x1 - 1 + X_OFFSET) & 0xFF)
+
+        self.write_cmd(0x2B)
+        self.write_data((y0 + Y_OFFSET) >> 8)
+        self.write_data((y0 + Y_OFFSET) & 0xFF)
+        self.write_data((y1 - 1 + Y_OFFSET) >> 8)
+        self.write_data((y1 - 1 + Y_OFFSET) & 0xFF)
+
+        self.write_cmd(0x2C)
+
+        lcd.cs(1)
+        lcd.dc(1)
+        lcd.cs(0)
+        stride = lcd.width * 2
+        if x0 == 0 and x1 == lcd.width:
+            lcd.spi.write(lcd.pixels[y0 * stride:y1 * stride])
+        else:
+            for y in range(y0, y1):
+                lcd.spi.write(lcd.pixels[y * stride + x0 * 2:y * stride + x1 * 2])
+        lcd.cs(1)
+
+    def show(self):
+        """The original show(): the full-screen window a byte at a time, then the whole buffer"""
+        self.show_rect(0, 0, self.lcd.width, self.lcd.height)
+        self.lcd.dirty_count = 0
+
+    def show_dirty(self):
+        lcd = self.lcd
+        d = lcd.dirty
+        for i in range(0, lcd.dirty_count * 4, 4):
+            self.show_rect(d[i], d[i + 1], d[i + 2], d[i + 3])
+        lcd.dirty_count = 0
+
+
+class Options:
+    frames = 200
+    write_us = 4
+    transaction_us = 6
+
+
+def parse_args(argv):
+    """argparse on CPython. The MicroPython unix port has no argparse, so there the same options are read by hand"""
+    if not MICROPYTHON:
+        import argparse
+        parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+        parser.add_argument('--frames', type=int, default=Options.frames)
+        parser.add_argument('--write-us', type=int, default=Options.write_us, help='Bus time per SPI write')
+        parser.add_argument('--transaction-us', type=int, default=Options.transaction_us,
+                            help='Bus time per CS-asserted transaction')
+        return parser.parse_args(argv)
+    options = Options()
+    i = 0
+    while i < len(argv):
+        name = argv[i][2:].replace('-', '_')
+        if not argv[i].startswith('--') or not hasattr(Options, name) or i + 1 == len(argv):
+            print('usage: bench_lcd.py [--frames N] [--write-us N] [--transaction-us N]')
+            sys.exit(2)
+        setattr(options, name, int(argv[i + 1]))
+        i += 2
+    return options
+
+
+def show_full(lcd):
+    lcd.invalidate()
+    lcd.show()
+
+
+def run(lcd, frames, show, write_us, transaction_us):
+    Bus.reset()
+    cpu_us = 0
+    for frame in range(frames):
+        demo_frame(lcd, frame)
+        started = ticks_us()
+        show()
+        cpu_us += ticks_us() - started
+    bus_us = Bus.bytes * 8 * 1000000 // lcd.spi.baudrate + Bus.writes * write_us + Bus.transactions * transaction_us
+    return Bus.bytes // frames, Bus.writes / frames, Bus.transactions / frames, frames * 1000000 / (bus_us + cpu_us)
+
+
+def main():
+    options = parse_args(sys.argv[1:])
+
+    install_stubs()
+    from lcd_display_code import LCD_1inch14
+
+    Bus.reset()
+    lcd = LCD_1inch14()
+    new_init = (Bus.transactions, Bus.writes, Bus.bytes)
+    legacy = Legacy(lcd)
+    Bus.reset()
+    legacy.init_display()
+    print('init_display: {} -> {} transactions, {} -> {} writes, {} -> {} bytes'.format(
+        Bus.transactions, new_init[0], Bus.writes, new_init[1], Bus.bytes, new_init[2]))
+    lcd.fill(lcd.white)
+    lcd.show()
+    print('{} frames of the demo loop at {} MHz SPI on {}'.format(options.frames, lcd.spi.baudrate // 1000000,
+                                                                 sys.implementation.name))
+    print('{:>6} {:>7} {:>12} {:>12} {:>14} {:>8}'.format('show', 'path', 'bytes/frame', 'writes/frame', 'transactions',
+                                                          'fps'))
+    for name, path, show in (('full', 'legacy', legacy.show), ('full', 'driver', lambda: show_full(lcd)),
+                             ('dirty', 'legacy', legacy.show_dirty), ('dirty', 'driver', lcd.show)):
+        sent, writes, transactions, fps = run(lcd, options.frames, show, options.write_us, options.transaction_us)
+        print('{:>6} {:>7} {:>12} {:>12.1f} {:>14.1f} {:>8.1f}'.format(name, path, sent, writes, transactions, fps))
+
+if __name__ == '__main__':
+    main()
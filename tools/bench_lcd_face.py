@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Full-face redraw against incremental updates for the Pico LCD face in src/lcd_face.py, with the stubbed SPI bus from
+tools/bench_lcd.py.
+
+Simulates a minute of the clock at one update a second. The time text changes every second (the flashing colon) and
+the event changes every few seconds. "full" clears the screen and redraws every region each second, which is what a
+straight port of the displayio face would do. "incremental" lets LcdFace redraw only the regions that changed. It also
+times loading one moon frame from the BMP, from the converted .565 file and from the RAM cache.
+
+The moon BMPs are copied to a temporary directory, so the .565 files written on first use don't land in src/moon.
+
+Usage: python3 tools/bench_lcd_face.py [--seconds 60]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import bench_lcd
+from bench_lcd import Bus
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+EVENTS = (('↑', '7:31', [125, 111, 22]), ('↓', '18:21', [125, 111, 22]),
+          ('↟', '14:03', [91, 96, 103]), ('↡', '23:19', [91, 96, 103]))
+
+
+def face_state(second):
+    icon, event_text, event_color = EVENTS[second // 3 % len(EVENTS)]
+    time_text = '{}{}{:02d}'.format(10, ':' if second % 2 == 0 else ' ', 42 + second // 60)
+    return 22, '+', '44.0%', time_text, '10-19', icon, event_text, event_color
+
+
+def run(lcd, face, seconds, full):
+    Bus.reset()
+    started = time.perf_counter()
+    for second in range(seconds):
+        if full:
+            lcd.fill(0)
+            face.invalidate()
+        face.update(*face_state(second))
+    cpu_us = (time.perf_counter() - started) * 1000000
+    bus_us = Bus.bytes * 8 * 1000000 // lcd.spi.baudrate + Bus.writes * 4 + Bus.transactions * 6
+    return cpu_us / seconds / 1000, Bus.bytes // seconds, bus_us / seconds / 1000
+
+
+def timed(function):
+    started = time.perf_counter()
+    function()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--seconds', type=int, default=60, help='Seconds of clock updates to simulate')
+    seconds = parser.parse_args().seconds
+    bench_lcd.install_stubs()
+    import lcd_face
+    from lcd_display_code import LCD_1inch14
+
+    moon_dir = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(SRC, 'moon', 'moon22.bmp'), moon_dir)
+        lcd_face.MOON_PATH = os.path.join(moon_dir, 'moon{:02d}.bmp')
+
+        lcd = LCD_1inch14()
+        face = lcd_face.LcdFace(lcd)
+        print('Moon frame 22 at {}x: BMP {:.1f} ms, .565 file {:.1f} ms, RAM cache {:.3f} ms'.format(
+            face.scale,
+            timed(lambda: face.moon(22)),
+            timed(lambda: (face.frames.clear(), face.frame_order.clear(), face.moon(22))),
+            timed(lambda: face.moon(22)),
+        ))
+
+        print('{} one-second updates on {}'.format(seconds, sys.implementation.name))
+        print('{:>12} {:>14} {:>12} {:>12}'.format('redraw', 'cpu ms/update', 'bytes/update', 'bus ms/update'))
+        for name, full in (('full', True), ('incremental', False)):
+            cpu_ms, sent, bus_ms = run(lcd, face, seconds, full)
+            print('{:>12} {:>14.2f} {:>12} {:>12.2f}'.format(name, cpu_ms, sent, bus_ms))
+    finally:
+        shutil.rmtree(moon_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Render time, flash and RAM of the procedural moon in src/moonrender.py against loading the pre-rendered BMPs in
+src/moon with displayio.OnDiskBitmap.
+
+displayio and bitmaptools are stubbed with pure-Python stand-ins that store pixels the way CircuitPython does (packed
+at the smallest power-of-two bits per value that holds the palette). The OnDiskBitmap stand-in reads every pixel from
+the file with a seek and a read, which is what displayio does each time the moon's area of the display is refreshed.
+Times on the host are far shorter than on the M4, so compare the columns with each other rather than with the board.
+
+It also prints a few rendered ages as ASCII art, to check the terminator by eye.
+
+Usage: python3 tools/bench_moonrender.py [--ages 100] [--show]
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+
+SHADES = ' .:-=+*#%@'
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.bits = 1
+        while (1 << self.bits) < value_count:
+            self.bits *= 2
+        self.data = bytearray((width * height * self.bits + 7) // 8)
+        self.pixels = [0] * (width * height)   # Unpacked copy, so the stand-in stays quick
+
+    def __getitem__(self, xy):
+        x, y = xy
+        return self.pixels[y * self.width + x]
+
+    def __setitem__(self, xy, value):
+        x, y = xy
+        self.pixels[y * self.width + x] = value
+
+
+class Palette(list):
+    def __init__(self, count):
+        super().__init__([0] * count)
+
+
+class OnDiskBitmap:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        header = self.file.read(54)
+        self.offset = struct.unpack_from('<I', header, 10)[0]
+        self.width, self.height = struct.unpack_from('<ii', header, 18)
+        self.stride = (self.width * 3 + 3) & ~3
+
+    def __getitem__(self, xy):
+        x, y = xy
+        self.file.seek(self.offset + (self.height - 1 - y) * self.stride + x * 3)
+        b, g, r = self.file.read(3)
+        return (r << 16) | (g << 8) | b
+
+    def close(self):
+        self.file.close()
+
+
+def fill_region(bitmap, x1, y1, x2, y2, value):
+    for y in range(y1, y2):
+        row = y * bitmap.width
+        bitmap.pixels[row + x1:row + x2] = [value] * (x2 - x1)
+
+
+def blit(dest, source, x, y, *, x1, y1, x2, y2):
+    for row in range(y2 - y1):
+        d = (y + row) * dest.width + x
+        s = (y1 + row) * source.width + x1
+        dest.pixels[d:d + x2 - x1] = source.pixels[s:s + x2 - x1]
+
+
+def readinto(bitmap, f, bits_per_pixel):
+    bitmap.pixels = list(f.read(bitmap.width * bitmap.height))
+
+
+def install_stubs():
+    displayio = type(sys)('displayio')
+    displayio.Bitmap, displayio.Palette, displayio.OnDiskBitmap = Bitmap, Palette, OnDiskBitmap
+    sys.modules['displayio'] = displayio
+    bitmaptools = type(sys)('bitmaptools')
+    bitmaptools.fill_region, bitmaptools.blit, bitmaptools.readinto = fill_region, blit, readinto
+    sys.modules['bitmaptools'] = bitmaptools
+
+
+def ascii_art(renderer):
+    palette = renderer.palette
+    lines = []
+    for y in range(0, renderer.size, 2):
+        lines.append(''.join(SHADES[min(9, (palette[renderer.bitmap[x, y]] >> 8 & 0xFF) * 10 // 256)]
+                             for x in range(renderer.size)))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--ages', type=int, default=100, help='Moon ages to render across the month')
+    parser.add_argument('--show', action='store_true', help='Print a few rendered ages as ASCII art')
+    options = parser.parse_args()
+    ages = options.ages
+    install_stubs()
+    import moonrender
+
+    texture_path = os.path.join(SRC, moonrender.TEXTURE_PATH)
+    moon_dir = os.path.join(SRC, 'moon')
+    frames = sorted(name for name in os.listdir(moon_dir) if name.endswith('.bmp'))
+
+    renderer = moonrender.MoonRenderer(texture_path)
+
+    if options.show:
+        for age in (0.1, 0.25, 0.4, 0.5, 0.6, 0.75, 0.9):
+            renderer.render(age)
+            print('age {}\n{}\n'.format(age, ascii_art(renderer)))
+
+    # Load every BMP the way the clock did: construct the OnDiskBitmap and read all its pixels once
+    started = time.perf_counter()
+    for name in frames:
+        bitmap = OnDiskBitmap(os.path.join(moon_dir, name))
+        for y in range(bitmap.height):
+            for x in range(bitmap.width):
+                bitmap[x, y]
+        bitmap.close()
+    bmp_ms = (time.perf_counter() - started) * 1000 / len(frames)
+
+    # Every age from scratch, then stepping through the month as the clock does
+    full_ms = 0
+    for i in range(ages):
+        renderer.shown[:] = b'\xff' * len(renderer.shown)
+        renderer.age = None
+        started = time.perf_counter()
+        renderer.render(i / ages)
+        full_ms += (time.perf_counter() - started) * 1000
+    rows = 0
+    started = time.perf_counter()
+    for i in range(ages):
+        rows += renderer.render(i / ages)
+    step_ms = (time.perf_counter() - started) * 1000 / ages
+
+    bmp_flash = sum(os.path.getsize(os.path.join(moon_dir, name)) for name in frames)
+    render_flash = os.path.getsize(texture_path) + os.path.getsize(os.path.join(SRC, 'moonrender.py'))
+    bitmap_ram = len(renderer.bitmap.data) + len(renderer.texture.data) + 4 * len(renderer.palette)
+
+    print('{} moon frames on {}'.format(ages, sys.implementation.name))
+    print('{:>22} {:>10} {:>12} {:>22}'.format('', 'ms/frame', 'flash bytes', 'pixel RAM bytes'))
+    print('{:>22} {:>10.3f} {:>12,} {:>22}'.format('OnDiskBitmap read', bmp_ms, bmp_flash, 'none, read per refresh'))
+    print('{:>22} {:>10.3f} {:>12,} {:>22,}'.format('render, full', full_ms / ages, render_flash, bitmap_ram))
+    print('{:>22} {:>10.3f} {:>12} {:>22}'.format('render, next age', step_ms, '', ''))
+    print('Rows redrawn per step: {:.1f} of {}'.format(rows / ages, renderer.size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compare a pooled keep-alive Session against one connection per request for a multi-day ephemeris prefetch.
+
+A local HTTP/1.1 server stands in for the USNO API. Each connect() sleeps for --handshake-ms before connecting, to
+model the TLS handshake that the ESP32 does inside connect(), which is what the pooled session avoids. The time shows
+up in the session's "ms connecting" figure.
+
+Usage: python3 tools/bench_session.py [--days 7] [--handshake-ms 400]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import socket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from session import Session
+
+BODY = b'{"properties": {"data": {"curphase": "Waxing Crescent", "fracillum": "8%"}}}'
+
+
+def serve():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class HandshakeSocket(socket.socket):
+    handshake_ms = 0
+
+    def connect(self, address):
+        time.sleep(self.handshake_ms / 1000)
+        super().connect(address)
+
+
+class HandshakePool:
+    """The socket module, with a delay in every connect() standing in for the TLS handshake"""
+    AF_INET = socket.AF_INET
+    SOCK_STREAM = socket.SOCK_STREAM
+
+    def __init__(self, handshake_ms):
+        self.handshake_ms = handshake_ms
+
+    def socket(self, family, kind):
+        sock = HandshakeSocket(family, kind)
+        sock.handshake_ms = self.handshake_ms
+        return sock
+
+
+def prefetch(days, port, pooled, handshake_ms):
+    session = Session(HandshakePool(handshake_ms))
+    started = time.monotonic()
+    for day in range(days):
+        if not pooled:
+            session.reset()
+        session.get('http://127.0.0.1:{}/api/rstt/oneday?date=2026-10-{:02d}'.format(port, day + 1))
+    return session, (time.monotonic() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--handshake-ms', type=int, default=400)
+    args = parser.parse_args()
+
+    server = serve()
+    port = server.server_address[1]
+    print('{}-day prefetch, {} ms simulated handshake'.format(args.days, args.handshake_ms))
+    results = {}
+    for name, pooled in (('per-request', False), ('pooled', True)):
+        session, elapsed = prefetch(args.days, port, pooled, args.handshake_ms)
+        results[name] = elapsed
+        print('{:>12}: {:3d} handshakes, {:7.1f} ms ({})'.format(name, session.handshakes, elapsed, session.stats()))
+    print('{:>12}: {:7.1f} ms ({:.0f}%)'.format(
+        'saved', results['per-request'] - results['pooled'],
+        100 * (1 - results['pooled'] / results['per-request'])
+    ))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
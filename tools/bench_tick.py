@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Count heap allocations per 100 ms display tick: code.py's tick() as it stands, against the original time-only tick.
+
+tick() and the functions it calls (check_buttons, update_display and refresh_display) are read out of src/code.py and
+run against stubs for the board: guard.feed, memstat, gcpolicy.watch, push.poll, the buttons and display.refresh do
+nothing, and the labels are plain objects whose text, position and color are set as they would be on the board.
+ticker.ticks_ms() is replaced by a clock that moves on 100 ms per tick, from a time of day on the minute. The
+original tick built a struct_time with time.localtime(), formatted it with hh_mm() and built an RGB list with
+color.adjust_brightness() on every tick.
+
+Under the MicroPython unix port bytes come from gc.mem_alloc() with the collector disabled, which counts every
+allocation the way the board does. CPython boxes every int above 256, where MicroPython and CircuitPython store ints
+below 2**30 inline, so under CPython the tool counts the tracemalloc blocks allocated from src/ (and from the legacy
+tick below) and leaves out blocks the size of a boxed int. On Python 3.12 and later it looks at the live blocks
+after every line through sys.monitoring, which catches temporaries. Before 3.12 it can only see what is still
+allocated when the tick returns.
+
+'steady bytes' is what was allocated on ticks where the minute didn't change.
+
+Usage: python3 tools/bench_tick.py [--minutes 5]   or   micropython tools/bench_tick.py
+"""
+
+import gc
+import sys
+import time
+
+SRC = (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src'  # No os.path on MicroPython
+sys.path.insert(0, SRC)
+
+import color
+import ticker
+from ticker import ClockText, PhasePulse
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+TICK_MS = 100
+FUNCTIONS = ('check_buttons', 'update_display', 'refresh_display', 'tick')    # The tick path in src/code.py
+CONSTANTS = ('CLOCK_TIME', 'CLOCK_PHASE', 'LANDSCAPE_LAYOUT', 'PORTRAIT_LAYOUT')
+INT_SIZES = (28, 32)    # Bytes in a CPython block holding an int below 2**30
+
+
+class Options:
+    minutes = 5
+
+
+def parse_args(argv):
+    """argparse on CPython. The MicroPython unix port has no argparse, so there the same option is read by hand"""
+    if not MICROPYTHON:
+        import argparse
+        parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+        parser.add_argument('--minutes', type=int, default=Options.minutes, help='Minutes of 10 Hz ticks to run')
+        return parser.parse_args(argv)
+    options = Options()
+    if argv:
+        if len(argv) != 2 or argv[0] != '--minutes':
+            print('usage: bench_tick.py [--minutes N]')
+            sys.exit(2)
+        options.minutes = int(argv[1])
+    return options
+
+
+_now = [0]
+
+
+def fake_ticks_ms():
+    return _now[0]
+
+
+class LocalTime:
+    """Enough of a struct_time for ClockText.sync() and hh_mm(). MicroPython's localtime() returns a plain tuple"""
+
+    def __init__(self, hour, minute, second):
+        self.tm_hour = hour
+        self.tm_min = minute
+        self.tm_sec = second
+
+
+class Stub:
+    """guard, memstat, gcpolicy, the two buttons (not pressed, as Pull.UP reads True) and the display"""
+    BUTTONS = 0
+    DISPLAY = 0
+    value = True
+
+    def feed(self): pass
+    def begin(self, subsystem): pass
+    def end(self, subsystem): pass
+    def poll_serial(self): pass
+    def watch(self): pass
+    def refresh(self): pass
+
+
+class Push:
+    def poll(self):
+        return None
+
+
+class Label:
+    """The attributes of an adafruit_display_text Label that the tick sets or reads"""
+
+    def __init__(self):
+        self.text = ''
+        self.x = 0
+        self.y = 0
+        self.color = 0
+        self.bounding_box = (0, 0, 24, 12)
+
+
+class View:
+    glyph = '+'
+
+
+def load_tick(namespace):
+    """Run the tick path's functions and constants from src/code.py in namespace, which already holds the stubs"""
+    path = SRC + '/code.py'
+    with open(path) as f:
+        lines = f.read().split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('def ') and line[4:line.find('(')] in FUNCTIONS:
+            start = i
+            i += 1
+            while i < len(lines) and (not lines[i] or lines[i][0] == ' '):
+                i += 1
+            # Blank lines in front keep the line numbers, so tracemalloc's tracebacks point into code.py
+            exec(compile('\n' * start + '\n'.join(lines[start:i]), path, 'exec'), namespace)
+            continue
+        if line.split(' = ')[0] in CONSTANTS:
+            exec(line, namespace)
+        i += 1
+
+
+def current():
+    """code.py's tick(), which calls refresh_display(True) through update_display"""
+    stub = Stub()
+    namespace = {'guard': stub, 'memstat': stub, 'gcpolicy': stub, 'pin_down': stub, 'pin_up': stub, 'display': stub,
+                 'push': Push(), 'clock_face': [Label() for _ in range(12)], 'landscape_orientation': True,
+                 'clock_text': ClockText(), 'phase_pulse': PhasePulse(0xBB9946), 'view': View()}
+    load_tick(namespace)
+    namespace['clock_text'].sync(LocalTime(12, 0, 0), 0)
+    return namespace['tick']
+
+
+def local_time():
+    if MICROPYTHON:
+        return LocalTime(*time.localtime()[3:6])
+    return time.localtime()
+
+
+def hh_mm(time_struct):
+    # Original hh_mm() from code.py
+    hour = (time_struct.tm_hour) % 24
+    minute = (time_struct.tm_min) % 60
+    if time_struct.tm_min >= 60:
+        hour = (hour + 1) % 24
+    hour12 = 12 if hour % 12 == 0 else hour % 12
+    separator = ':' if time_struct.tm_sec % 2 == 0 else ' '
+    return "{0}{1}{2:02d}".format(hour12, separator, minute)
+
+
+class Legacy:
+    """The original time-only tick, less the moon bitmap it also reloaded"""
+
+    def __init__(self):
+        self.brightness = 0.0
+        self.dwell = 10
+        self.label = Label()
+
+    def tick(self):
+        self.label.text = hh_mm(local_time())
+        self.brightness = self.brightness + 0.1
+        if self.brightness >= 1.0:
+            self.brightness = 1.0
+            if self.dwell > 0: self.dwell = self.dwell - 1
+            else:
+                self.brightness = 0.0
+                self.dwell = 10
+        self.label.color = color.adjust_brightness(0xBB9946, self.brightness)
+
+
+def legacy():
+    return Legacy().tick
+
+
+class Blocks:
+    """CPython only: bytes in the tracemalloc blocks allocated from src/ and the legacy tick since the last count()"""
+
+    def __init__(self):
+        import tracemalloc
+        self.tracemalloc = tracemalloc
+        self.filters = [tracemalloc.Filter(True, SRC + '/*'), tracemalloc.Filter(True, __file__)]
+        self.total = 0
+        self.monitoring = getattr(sys, 'monitoring', None)
+        if self.monitoring:
+            events = self.monitoring.events
+            self.events = events.LINE | events.PY_RETURN
+            self.monitoring.use_tool_id(self.monitoring.PROFILER_ID, 'bench_tick')
+            self.monitoring.register_callback(self.monitoring.PROFILER_ID, events.LINE, self.count)
+            self.monitoring.register_callback(self.monitoring.PROFILER_ID, events.PY_RETURN, self.count)
+
+    def count(self, *args):
+        for trace in self.tracemalloc.take_snapshot().filter_traces(self.filters).traces:
+            if trace.size not in INT_SIZES:
+                self.total += trace.size
+        self.tracemalloc.clear_traces()
+
+    def measure(self, tick):
+        """Bytes allocated by one call of tick"""
+        self.total = 0
+        self.tracemalloc.clear_traces()
+        if self.monitoring:
+            self.monitoring.set_events(self.monitoring.PROFILER_ID, self.events)
+        tick()
+        if self.monitoring:
+            self.monitoring.set_events(self.monitoring.PROFILER_ID, 0)
+        self.count()
+        return self.total
+
+
+def measure(make, ticks, blocks=None):
+    """Return (total bytes, ticks that allocated, bytes on ticks within a minute, elapsed us per tick)"""
+    times = [i * TICK_MS for i in range(1, ticks + 1)]
+    total = allocating = steady = 0
+    tick = make()
+    _now[0] = 0
+    tick()
+    if MICROPYTHON:
+        gc.collect()
+        gc.disable()
+        started = time.ticks_us()
+        for now_ms in times:
+            _now[0] = now_ms
+            before = gc.mem_alloc()
+            tick()
+            used = gc.mem_alloc() - before
+            total += used
+            allocating += used > 0
+            if now_ms % 60000: steady += used
+        elapsed = time.ticks_diff(time.ticks_us(), started)
+        gc.enable()
+        return total, allocating, steady, elapsed / ticks
+
+    # Timed without tracing, then run again from the start and counted
+    started = time.perf_counter()
+    for now_ms in times:
+        _now[0] = now_ms
+        tick()
+    elapsed = (time.perf_counter() - started) * 1000000
+    tick = make()
+    _now[0] = 0
+    blocks.tracemalloc.start()
+    blocks.measure(tick)   # sys.monitoring allocates the first time it instruments each function
+    for now_ms in times:
+        _now[0] = now_ms
+        used = blocks.measure(tick)
+        total += used
+        allocating += used > 0
+        if now_ms % 60000: steady += used
+    blocks.tracemalloc.stop()
+    return total, allocating, steady, elapsed / ticks
+
+
+def main():
+    options = parse_args(sys.argv[1:])
+    ticker.ticks_ms = fake_ticks_ms
+    ticks = options.minutes * 600
+    blocks = None if MICROPYTHON else Blocks()
+    method = 'gc.mem_alloc()' if MICROPYTHON else 'tracemalloc after every line' if hasattr(sys, 'monitoring') else \
+        'tracemalloc when each tick returns'
+    print('{} ticks ({} minutes at 10 Hz) on {}, counted with {}'.format(ticks, options.minutes, sys.implementation.name,
+                                                                        method))
+    print('{:>8} {:>12} {:>12} {:>13} {:>16}'.format('path', 'bytes/tick', 'alloc ticks', 'steady bytes',
+                                                     'overhead us/tick'))
+    for name, make in (('legacy', legacy), ('tick', current)):
+        total, allocating, steady, us = measure(make, ticks, blocks)
+        print('{:>8} {:>12.1f} {:>12d} {:>13d} {:>16.1f}'.format(name, total / ticks, allocating, steady, us))
+
+
+if __name__ == '__main__':
+    main()
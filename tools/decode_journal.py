@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Print the records in a journal.bin copied off the clock's CIRCUITPY drive, oldest first.
+
+Usage: python3 tools/decode_journal.py /Volumes/CIRCUITPY/journal.bin [--tail 20] [--kind exception --kind watchdog]
+"""
+
+import argparse
+import os
+import struct
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from journal import HEADER_FORMAT, HEADER_SIZE, KINDS, MAGIC, RECORD_FORMAT, RECORD_SIZE
+
+
+def read_records(path):
+    """Return the used records in the file as (sequence, time, free RAM, kind, code, text) tuples, oldest first"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, record_size, capacity = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != MAGIC:
+        raise ValueError('{} is not a journal (magic {!r})'.format(path, magic))
+    if record_size != RECORD_SIZE:
+        raise ValueError('{} has {}-byte records; this decoder reads {}-byte records'.format(path, record_size, RECORD_SIZE))
+    records = []
+    for i in range(capacity):
+        sequence, when, free, kind, code, text = struct.unpack_from(RECORD_FORMAT, data, HEADER_SIZE + i * RECORD_SIZE)
+        if sequence:
+            records.append((sequence, when, free, kind, code, text.rstrip(b'\0').decode(errors='replace')))
+    return sorted(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('path')
+    parser.add_argument('--tail', type=int, help='Only print the newest N records')
+    parser.add_argument('--kind', action='append', choices=KINDS[1:], help='Only print records of this kind')
+    args = parser.parse_args()
+
+    records = read_records(args.path)
+    if args.kind:
+        records = [record for record in records if KINDS[record[3]] in args.kind]
+    if args.tail:
+        records = records[-args.tail:]
+    for sequence, when, free, kind, code, text in records:
+        # The board's RTC holds local time, so the epoch seconds are printed as-is rather than converted from UTC
+        stamp = datetime.fromtimestamp(when, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        name = KINDS[kind] if kind < len(KINDS) else str(kind)
+        print('{:>6} {} {:>9} RAM {:>7,} {}{}'.format(sequence, stamp, name, free, text, ' [{}]'.format(code) if code else ''))
+
+
+if __name__ == '__main__':
+    main()
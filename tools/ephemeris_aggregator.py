@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+LAN ephemeris aggregator: one upstream USNO fetch per (location, date) shared by every clock on the network.
+
+Clocks request /day?date=YYYY-MM-DD&coords=LAT,LON&tz=H, the same query the USNO API takes, and get back a one-line
+payload with just the fields SolarEphemera reads:
+
+    phase,percent,sunrise,sunset,moonrise,moonset       e.g. Waxing Crescent,44,07:31,18:21,14:03,23:19
+
+Coordinates are rounded to --precision decimal places so nearby clocks share a cache entry. Concurrent requests for
+an entry that is still being fetched wait for that one fetch instead of starting their own. Responses carry an ETag
+and Cache-Control header, and If-None-Match requests get a 304. Failed upstream fetches are cached for
+--retry-after seconds so a USNO outage doesn't turn into a flood of upstream requests.
+
+Usage: python3 tools/ephemeris_aggregator.py [--port 8081] [--upstream URL]
+Point clocks at it with secrets['ephemeris_url'] = 'http://<host>:8081/day?date={}&coords={},{}&tz={}'
+/stats returns request, cache and upstream counters as JSON.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+import urllib.request
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+USNO_URL = 'https://aa.usno.navy.mil/api/rstt/oneday?date={}&coords={},{}&tz={}'
+
+
+def compact_payload(usno_json):
+    """Reduce a USNO rstt/oneday response to the one-line format SolarEphemera.parse_compact() reads"""
+    data = json.loads(usno_json)['properties']['data']
+    events = {}
+    for key, name in (('sundata', 'sun'), ('moondata', 'moon')):
+        for item in data.get(key, []):
+            if item.get('phen') in ('Rise', 'Set'):
+                events[name + item['phen'].lower()] = item.get('time', '')
+    return ','.join((
+        data.get('curphase', ''),
+        data.get('fracillum', '0%').strip('%'),
+        events.get('sunrise', ''),
+        events.get('sunset', ''),
+        events.get('moonrise', ''),
+        events.get('moonset', ''),
+    )).encode()
+
+
+class Entry:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.payload = None
+        self.etag = None
+        self.expires = 0
+
+
+class Aggregator:
+    def __init__(self, upstream=USNO_URL, precision=2, timeout=10, retry_after=60):
+        self.upstream = upstream
+        self.precision = precision
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.stats = {'requests': 0, 'hits': 0, 'coalesced': 0, 'upstream': 0, 'upstream_errors': 0, 'not_modified': 0}
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def key(self, day, coords, tz):
+        lat, lon = [round(float(c), self.precision) for c in coords.split(',')]
+        return (day.isoformat(), lat, lon, int(float(tz)))
+
+    def get(self, key):
+        """Return the cache entry for key, fetching it upstream if this is the first request for it"""
+        with self.lock:
+            self.expire()
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = Entry()
+                owner = True
+            else:
+                owner = False
+                self.stats['hits' if entry.ready.is_set() else 'coalesced'] += 1
+        if owner:
+            self.fetch(key, entry)
+        entry.ready.wait()
+        return entry
+
+    def fetch(self, key, entry):
+        day, lat, lon, tz = key
+        self.count('upstream')
+        try:
+            with urllib.request.urlopen(self.upstream.format(day, lat, lon, tz), timeout=self.timeout) as response:
+                entry.payload = compact_payload(response.read())
+            entry.etag = '"{}"'.format(hashlib.sha1(entry.payload).hexdigest()[:16])
+            entry.expires = float('inf')    # A day's ephemera never change
+        except Exception as e:
+            print('Upstream fetch for {} failed: {}'.format(key, e))
+            self.count('upstream_errors')
+            entry.expires = time.time() + self.retry_after
+        entry.ready.set()
+
+    def expire(self):
+        """Drop failed entries past their retry time and anything for dates more than a day in the past"""
+        now = time.time()
+        oldest = date.fromordinal(date.today().toordinal() - 1).isoformat()
+        for key in [k for k, e in self.entries.items() if k[0] < oldest or (e.ready.is_set() and e.expires < now)]:
+            del self.entries[key]
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256    # Room for a whole fleet of clocks waking up at once
+
+
+def make_handler(aggregator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                with aggregator.lock:
+                    stats = dict(aggregator.stats, entries=len(aggregator.entries))
+                return self.reply(200, json.dumps(stats).encode(), content_type='application/json')
+            if url.path != '/day':
+                return self.reply(404, b'not found')
+
+            aggregator.count('requests')
+            query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+            try:
+                key = aggregator.key(date.fromisoformat(query['date']), query['coords'], query.get('tz', '0'))
+            except (KeyError, ValueError) as e:
+                return self.reply(400, 'bad request: {}'.format(e).encode())
+
+            entry = aggregator.get(key)
+            if entry.payload is None:
+                return self.reply(502, b'upstream unavailable', {'Retry-After': str(aggregator.retry_after)})
+            headers = {'ETag': entry.etag, 'Cache-Control': 'public, max-age=86400, immutable'}
+            if self.headers.get('If-None-Match') == entry.etag:
+                aggregator.count('not_modified')
+                return self.reply(304, b'', headers)
+            self.reply(200, entry.payload, headers)
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # The client gave up, as the clock's Session does on a response that's too slow
+
+        def reply(self, status, body, headers=None, content_type='text/plain'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start(aggregator, host='127.0.0.1', port=0):
+    """Start the aggregator in a background thread and return the server"""
+    server = Server((host, port), make_handler(aggregator))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--upstream', default=USNO_URL, help='USNO-style URL template (date, lat, lon, tz)')
+    parser.add_argument('--precision', type=int, default=2, help='Decimal places of latitude/longitude to cache by')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--retry-after', type=int, default=60)
+    args = parser.parse_args()
+
+    aggregator = Aggregator(args.upstream, args.precision, args.timeout, args.retry_after)
+    server = Server((args.host, args.port), make_handler(aggregator))
+    print('Ephemeris aggregator listening on http://{}:{}'.format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(aggregator.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Drive the clock's ephemeris fetch path (providers.Providers) against the USNO stand-in server.
+
+Each run fetches today's and tomorrow's ephemera the way fetch_days() in code.py does: one Providers.fetch() per day
+through a shared Session, with the USNO provider pointed at the stand-in and the computed fallback behind it. With
+--aggregator, tools/ephemeris_aggregator.py runs in-process in front of the stand-in and the Aggregator provider is
+tried first, as it is when ephemeris_url is set. Each simulated clock keeps its own Providers, so its ranking carries
+over from one run to the next as it would on the board.
+
+For every failure mode this reports throughput, tail latency, how many runs got complete data from a network
+provider, how many fell back to the computed ephemera, and how many runs had a gap between watchdog feeds (Providers
+feeds before and after each attempt) of 12 s or more.
+
+Usage: python3 tools/load_usno.py [--runs 20] [--workers 4] [--modes ok,error,truncate,drip] [--latency-ms 300]
+       [--aggregator]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import ephemeris_aggregator
+import usno_stub
+from providers import Aggregator, Computed, Providers, Usno
+from session import Session
+
+WATCHDOG_TIMEOUT = 12
+LATITUDE, LONGITUDE, UTC_OFFSET = 47.6062, -122.3321, '-700'
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Feeds:
+    """Stands in for guard.feed, keeping the longest gap between calls"""
+    def __init__(self):
+        self.last = time.monotonic()
+        self.longest = 0
+
+    def __call__(self):
+        now = time.monotonic()
+        self.longest = max(self.longest, now - self.last)
+        self.last = now
+
+
+def fetch_days(http, ephemeris, feeds, day):
+    """(seconds, complete from the network, fell back to computed, longest gap between feeds)"""
+    started = feeds.last = time.monotonic()
+    feeds.longest = 0
+    days = [ephemeris.fetch(http, time.localtime(day + i * 86400), LATITUDE, LONGITUDE, UTC_OFFSET) for i in range(2)]
+    feeds()
+    complete = all(d.phase is not None and d.sunrise is not None and d.moonrise is not None for d in days)
+    fallback = any(d.percent is not None and d.moonrise is None and d.moonset is None for d in days)
+    return time.monotonic() - started, complete, fallback, feeds.longest
+
+
+def run_mode(config, runs, workers, timeout, aggregate):
+    server = usno_stub.start(config)
+    url = 'http://127.0.0.1:{}/api/rstt/oneday?date={{}}&coords={{}},{{}}&tz={{}}'.format(server.server_address[1])
+    aggregator = None
+    if aggregate:
+        aggregator = ephemeris_aggregator.start(ephemeris_aggregator.Aggregator(url, timeout=timeout))
+        aggregator_url = 'http://127.0.0.1:{}/day?date={{}}&coords={{}},{{}}&tz={{}}'.format(
+            aggregator.server_address[1])
+    results = []
+    lock = threading.Lock()
+    remaining = [runs]
+
+    def worker():
+        feeds = Feeds()
+        http = Session(socket, timeout=timeout, feed=feeds)
+        ephemeris = Providers(([Aggregator(aggregator_url)] if aggregate else []) + [Usno(url), Computed()], feed=feeds)
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+                day = time.time() + remaining[0] * 86400
+            result = fetch_days(http, ephemeris, feeds, day)
+            with lock:
+                results.append(result)
+
+    started = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.monotonic() - started
+    for running in (aggregator, server):
+        if running:
+            running.shutdown()
+            running.server_close()
+    return results, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', default=','.join(usno_stub.MODES))
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--jitter-ms', type=float, default=200)
+    parser.add_argument('--drip-bytes', type=int, default=usno_stub.DRIP_BYTES)
+    parser.add_argument('--drip-ms', type=float, default=usno_stub.DRIP_MS)
+    parser.add_argument('--timeout', type=float, default=5, help='Seconds per request, as used by the clock (HTTP_TIMEOUT)')
+    parser.add_argument('--aggregator', action='store_true', help='Put the LAN aggregator in front of the stand-in')
+    args = parser.parse_args()
+
+    print('{:>9} {:>5} {:>9} {:>9} {:>8} {:>8} {:>8} {:>8} {:>9}'.format(
+        'mode', 'runs', 'complete', 'fallback', 'runs/s', 'p50 s', 'p95 s', 'max s', 'watchdog'))
+    for mode in args.modes.split(','):
+        config = usno_stub.Config(mode, args.latency_ms, args.jitter_ms, drip_bytes=args.drip_bytes,
+                                  drip_ms=args.drip_ms, seed=1)
+        results, wall = run_mode(config, args.runs, args.workers, args.timeout, args.aggregator)
+        elapsed = [r[0] for r in results]
+        print('{:>9} {:5d} {:9d} {:9d} {:8.2f} {:8.2f} {:8.2f} {:8.2f} {:9d}'.format(
+            mode, len(results), sum(1 for r in results if r[1]), sum(1 for r in results if r[2]),
+            len(results) / wall, percentile(elapsed, 0.5), percentile(elapsed, 0.95), max(elapsed),
+            sum(1 for r in results if r[3] >= WATCHDOG_TIMEOUT)
+        ))
+
+
+if __name__ == '__main__':
+    main()
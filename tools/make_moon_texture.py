@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Build src/moon-texture.bin, the surface texture src/moonrender.py paints into the lit part of the moon, from the full
+moon frame.
+
+The source is a 32x32 24-bit BMP. Its pixels are grey, so they're bucketed by brightness into COLORS levels and each
+level's palette entry is the average colour of the pixels in it. Level 0 is kept pure black for the sky and the dark
+side. The file is the palette (COLORS x r, g, b) followed by one palette index per pixel, top row first: 1,072 bytes,
+against 3,126 for each of the 100 BMPs it replaces.
+
+Usage: python3 tools/make_moon_texture.py [src/moon/moon50.bmp] [src/moon-texture.bin]
+"""
+
+import os
+import struct
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+SIZE = 32
+COLORS = 16
+
+
+def read_bmp(path):
+    """Rows of (r, g, b) tuples, top row first"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = struct.unpack_from('<I', data, 10)[0]
+    width, height = struct.unpack_from('<ii', data, 18)
+    if struct.unpack_from('<H', data, 28)[0] != 24 or width != SIZE or abs(height) != SIZE:
+        raise ValueError('{}: expected a {}x{} 24-bit BMP'.format(path, SIZE, SIZE))
+    stride = (width * 3 + 3) & ~3
+    rows = []
+    for y in range(SIZE):
+        start = offset + (SIZE - 1 - y if height > 0 else y) * stride
+        rows.append([(data[start + 3 * x + 2], data[start + 3 * x + 1], data[start + 3 * x]) for x in range(SIZE)])
+    return rows
+
+
+def level(pixel, brightest):
+    brightness = max(pixel)
+    if brightness == 0:
+        return 0
+    return 1 + (brightness - 1) * (COLORS - 1) // brightest
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(SRC, 'moon', 'moon50.bmp')
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.join(SRC, 'moon-texture.bin')
+    rows = read_bmp(source)
+    brightest = max(max(p) for row in rows for p in row)
+    totals = [[0, 0, 0, 0] for _ in range(COLORS)]
+    indexes = bytearray()
+    for row in rows:
+        for pixel in row:
+            i = level(pixel, brightest)
+            indexes.append(i)
+            for c in range(3):
+                totals[i][c] += pixel[c]
+            totals[i][3] += 1
+    palette = bytearray()
+    for r, g, b, count in totals:
+        palette += bytes((r // count, g // count, b // count) if count else (0, 0, 0))
+    with open(target, 'wb') as f:
+        f.write(palette + indexes)
+    print('{}: {} colours, {} bytes'.format(target, COLORS, len(palette) + len(indexes)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Rewrite the clock's BMPs as the smallest indexed BMPs that look the same on the LED matrix.
+
+The matrix runs at BIT_DEPTH 6 and displayio passes colours to it as RGB565, so the panel can show at most 5 bits of
+red, 6 of green and 5 of blue. Every pixel is reduced to what the panel will actually show, and colours that reduce to
+the same value share a palette entry. The result is written as a 1, 4 or 8 bit indexed BMP, whichever is the smallest
+that holds the palette, with a plain 40-byte header that OnDiskBitmap reads. Images with more than 256 panel colours
+are left alone.
+
+The panel's brightness is linear in the PWM value, so images drawn for a monitor look washed out in the dark tones.
+--gamma 2.2 maps each channel through that curve before reducing it. The default of 1.0 keeps the images exactly as
+they look now.
+
+Reports each asset's size and colours before and after, and the time to decode it on the host.
+
+Usage: python3 tools/optimize_assets.py [--src src] [--out build] [--gamma 1.0] [--bit-depth 6] [file ...]
+File names are relative to --src. The default set is moon/*.bmp, splash-*.bmp and sleeping.bmp, skipping any that
+aren't there. With --out the same as --src, the files are rewritten in place. bin/build doesn't run this: it packs the
+images with tools/pack_assets.py, which reduces the colours the same way. This is for the BMP fallback and comparisons.
+"""
+
+import argparse
+import glob
+import os
+import struct
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_ASSETS = ('moon/*.bmp', 'splash-*.bmp', 'sleeping.bmp')
+BIT_DEPTH = 6       # As in src/code.py
+
+
+def read_bmp(path):
+    """Width, height and rows of (r, g, b), top row first, from an uncompressed or bitfield BMP of any common depth"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:2] != b'BM':
+        raise ValueError('{}: not a BMP'.format(path))
+    offset = struct.unpack_from('<I', data, 10)[0]
+    header_size = struct.unpack_from('<I', data, 14)[0]
+    width, height = struct.unpack_from('<ii', data, 18)
+    bpp, compression = struct.unpack_from('<HI', data, 28)
+    colors = struct.unpack_from('<I', data, 46)[0] or (1 << bpp if bpp <= 8 else 0)
+    palette = [(data[i + 2], data[i + 1], data[i]) for i in range(14 + header_size, 14 + header_size + 4 * colors, 4)]
+    if compression == 3:    # BI_BITFIELDS: channel masks follow the 40-byte header fields
+        masks = struct.unpack_from('<III', data, 54)
+    elif compression == 0:
+        masks = (0x7C00, 0x03E0, 0x001F) if bpp == 16 else (0xFF0000, 0x00FF00, 0x0000FF)
+    else:
+        raise ValueError('{}: compression {} not supported'.format(path, compression))
+    shifts = [(mask & -mask).bit_length() - 1 for mask in masks]
+    maxima = [mask >> shift for mask, shift in zip(masks, shifts)]
+    stride = (width * bpp + 31) // 32 * 4
+    rows = []
+    for y in range(abs(height)):
+        start = offset + (abs(height) - 1 - y if height > 0 else y) * stride
+        row = []
+        for x in range(width):
+            if bpp <= 8:
+                bit = x * bpp
+                index = (data[start + bit // 8] >> (8 - bpp - bit % 8)) & ((1 << bpp) - 1)
+                row.append(palette[index])
+            else:
+                value = int.from_bytes(data[start + x * bpp // 8:start + (x + 1) * bpp // 8], 'little')
+                row.append(tuple(((value & mask) >> shift) * 255 // maximum
+                                 for mask, shift, maximum in zip(masks, shifts, maxima)))
+        rows.append(row)
+    return width, abs(height), rows
+
+
+def panel_color(rgb, gamma, bit_depth):
+    """The colour the matrix shows for rgb, expanded back to 8 bits per channel"""
+    result = []
+    for value, bits in zip(rgb, (5, 6, 5)):
+        if gamma != 1.0:
+            value = int(round(255 * (value / 255) ** gamma))
+        bits = min(bits, bit_depth)
+        value >>= 8 - bits
+        result.append((value << (8 - bits)) | (value >> (2 * bits - 8) if bits >= 4 else 0))
+    return tuple(result)
+
+
+def write_bmp(path, width, height, palette, indexes):
+    bpp = 1 if len(palette) <= 2 else 4 if len(palette) <= 16 else 8
+    stride = (width * bpp + 31) // 32 * 4
+    pixels = bytearray()
+    for y in range(height - 1, -1, -1):     # Bottom row first
+        row = bytearray(stride)
+        for x in range(width):
+            bit = x * bpp
+            row[bit // 8] |= indexes[y * width + x] << (8 - bpp - bit % 8)
+        pixels += row
+    colors = b''.join(bytes((b, g, r, 0)) for r, g, b in palette)
+    offset = 14 + 40 + len(colors)
+    header = struct.pack('<2sIHHI', b'BM', offset + len(pixels), 0, 0, offset)
+    info = struct.pack('<IiiHHIIiiII', 40, width, height, 1, bpp, 0, len(pixels), 2835, 2835, len(palette), 0)
+    with open(path, 'wb') as f:
+        f.write(header + info + colors + pixels)
+
+
+def optimize(source, target, gamma, bit_depth):
+    """Returns (colours before, colours after, bytes before, bytes after), with after the same as before if skipped"""
+    before = os.path.getsize(source)
+    width, height, rows = read_bmp(source)
+    original = len(set(p for row in rows for p in row))
+    lookup = {}
+    palette = []
+    indexes = bytearray(width * height)
+    for y, row in enumerate(rows):
+        for x, pixel in enumerate(row):
+            color = panel_color(pixel, gamma, bit_depth)
+            if color not in lookup:
+                if len(palette) == 256:
+                    print('{}: more than 256 panel colours, left as is'.format(source))
+                    if source != target:
+                        with open(source, 'rb') as f, open(target, 'wb') as g:
+                            g.write(f.read())
+                    return original, original, before, before
+                lookup[color] = len(palette)
+                palette.append(color)
+            indexes[y * width + x] = lookup[color]
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    write_bmp(target, width, height, palette, indexes)
+    return original, len(palette), before, os.path.getsize(target)
+
+
+def decode_ms(path, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        read_bmp(path)
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('names', nargs='*', metavar='file', help='Relative to --src (default: the clock\'s images)')
+    parser.add_argument('--src', default=os.path.join(ROOT, 'src'))
+    parser.add_argument('--out', default=os.path.join(ROOT, 'build'))
+    parser.add_argument('--gamma', type=float, default=1.0)
+    parser.add_argument('--bit-depth', type=int, default=BIT_DEPTH)
+    args = parser.parse_args()
+    src, out, gamma, bit_depth = args.src, args.out, args.gamma, args.bit_depth
+
+    names = args.names
+    if not names:
+        names = sorted(os.path.relpath(path, src) for pattern in DEFAULT_ASSETS
+                       for path in glob.glob(os.path.join(src, pattern)))
+
+    print('{:<24} {:>7} {:>7} {:>8} {:>8} {:>10} {:>10}'.format(
+        'asset', 'colours', 'after', 'bytes', 'after', 'decode ms', 'after'))
+    total_before = total_after = 0
+    for name in names:
+        source = os.path.join(src, name)
+        target = os.path.join(out, name)
+        original_ms = decode_ms(source)
+        colors, palette, before, after = optimize(source, target, gamma, bit_depth)
+        total_before += before
+        total_after += after
+        print('{:<24} {:>7} {:>7} {:>8,} {:>8,} {:>10.2f} {:>10.2f}'.format(
+            name, colors, palette, before, after, original_ms, decode_ms(target)))
+    if names:
+        print('{} assets: {:,} bytes -> {:,} ({:,} saved, {:.0%})'.format(
+            len(names), total_before, total_after, total_before - total_after, 1 - total_after / total_before))
+
+
+if __name__ == '__main__':
+    main()
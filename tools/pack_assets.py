@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Pack the clock's images into one run-length encoded bundle that src/assets.py decodes on the board.
+
+Each image is first reduced to the colours the matrix can show, as tools/optimize_assets.py does, so its palette holds
+no more entries than the panel can tell apart. Rows are then encoded as runs of one palette index and stretches of
+literal indexes (the format is described at the top of src/assets.py). bin/build and bin/update write the bundle to
+build/assets.bin in place of the BMP files.
+
+Usage: python3 tools/pack_assets.py [--src src] [--out build/assets.bin] [--gamma 1.0] [--bit-depth 6] [file ...]
+File names are relative to --src and become the names passed to Assets.load(). The default set is splash-*.bmp and
+sleeping.bmp.
+"""
+
+import argparse
+import glob
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from optimize_assets import BIT_DEPTH, panel_color, read_bmp
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_ASSETS = ('splash-*.bmp', 'sleeping.bmp')
+MAGIC = b'AST1'             # As in src/assets.py
+HEADER_FORMAT = '<4sH'
+INDEX_FORMAT = '<24sHHHII'
+MAX_RUN = 128
+
+
+def encode_row(row):
+    """Runs of repeated indexes and literal stretches for one row of palette indexes"""
+    out = bytearray()
+    literal = bytearray()
+
+    def flush():
+        while literal:
+            chunk = literal[:MAX_RUN]
+            out.append(127 + len(chunk))
+            out.extend(chunk)
+            del literal[:MAX_RUN]
+
+    x = 0
+    while x < len(row):
+        run = 1
+        while x + run < len(row) and run < MAX_RUN and row[x + run] == row[x]:
+            run += 1
+        if run >= 3 or (run == 2 and not literal):
+            flush()
+            out.append(run - 1)
+            out.append(row[x])
+        else:
+            literal.extend(row[x:x + run])
+        x += run
+    flush()
+    return out
+
+
+def image(path, gamma, bit_depth):
+    """(width, height, palette rgb bytes, encoded rows) for a BMP"""
+    width, height, rows = read_bmp(path)
+    lookup = {}
+    palette = bytearray()
+    encoded = bytearray()
+    for row in rows:
+        indexes = bytearray()
+        for pixel in row:
+            color = panel_color(pixel, gamma, bit_depth)
+            if color not in lookup:
+                if len(lookup) == 256:
+                    raise ValueError('{}: more than 256 panel colours'.format(path))
+                lookup[color] = len(lookup)
+                palette.extend(color)
+            indexes.append(lookup[color])
+        encoded += encode_row(indexes)
+    return width, height, palette, encoded
+
+
+def pack(src, names, gamma=1.0, bit_depth=BIT_DEPTH):
+    """The bundle as bytes"""
+    images = [image(os.path.join(src, name), gamma, bit_depth) for name in names]
+    offset = struct.calcsize(HEADER_FORMAT) + len(names) * struct.calcsize(INDEX_FORMAT)
+    header = bytearray(struct.pack(HEADER_FORMAT, MAGIC, len(names)))
+    data = bytearray()
+    for name, (width, height, palette, encoded) in zip(names, images):
+        if len(name.encode()) > 24:
+            raise ValueError('{}: name longer than 24 bytes'.format(name))
+        header += struct.pack(INDEX_FORMAT, name.encode(), width, height, len(palette) // 3, offset + len(data),
+                              len(encoded))
+        data += palette + encoded
+    return bytes(header + data)
+
+
+def default_names(src):
+    return sorted(os.path.relpath(path, src) for pattern in DEFAULT_ASSETS for path in glob.glob(os.path.join(src, pattern)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('names', nargs='*', metavar='file', help='Relative to --src (default: splash and sleeping)')
+    parser.add_argument('--src', default=os.path.join(ROOT, 'src'))
+    parser.add_argument('--out', default=os.path.join(ROOT, 'build', 'assets.bin'))
+    parser.add_argument('--gamma', type=float, default=1.0)
+    parser.add_argument('--bit-depth', type=int, default=BIT_DEPTH)
+    args = parser.parse_args()
+    src, out = args.src, args.out
+
+    names = args.names or default_names(src)
+    bundle = pack(src, names, args.gamma, args.bit_depth)
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'wb') as f:
+        f.write(bundle)
+    before = sum(os.path.getsize(os.path.join(src, name)) for name in names)
+    print('{}: {} images, {:,} bytes (BMPs {:,})'.format(out, len(names), len(bundle), before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the USNO rstt/oneday API and the ip-api.com geolocation lookup, with latency and failure injection.
+
+Serves the recorded payloads in tools/fixtures for any date and coordinates. The date fields, moon phase and
+illumination are adjusted to the requested date and the moon rise/set times drift by about 50 minutes a day, so
+multi-day fetches look like real data.
+
+Failure modes (chosen per request, by --mode or at random by rate):
+  ok        normal response after --latency-ms
+  error     HTTP 503
+  truncate  full Content-Length header but only half the body, then the connection is closed
+  drip      body sent --drip-bytes at a time with --drip-ms between pieces
+
+Usage: python3 tools/usno_stub.py [--port 8080] [--latency-ms 200] [--error-rate 0.1] [--drip-rate 0.05] ...
+Point the clock at it with secrets['usno_url'] = 'http://<host>:8080/api/rstt/oneday?date={}&coords={},{}&tz={}'
+and secrets['geolocation_url'] = 'http://<host>:8080/json/'
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+RECORDED_DATE = date(2026, 10, 19)
+SYNODIC_DAYS = 29.530588853
+NEW_MOON = date(2000, 1, 6).toordinal() + (18 * 60 + 14) / 1440  # 2000-01-06 18:14 UTC
+MODES = ('ok', 'error', 'truncate', 'drip')
+DRIP_BYTES = 16
+DRIP_MS = 250
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+def phase_name(age):
+    """Name a moon age (fraction of the synodic month) the way USNO does"""
+    if age < 0.02 or age > 0.98:
+        return 'New Moon'
+    if 0.48 < age < 0.52:
+        return 'Full Moon'
+    if 0.23 < age < 0.27:
+        return 'First Quarter'
+    if 0.73 < age < 0.77:
+        return 'Last Quarter'
+    return ('Waxing ' if age < 0.5 else 'Waning ') + ('Crescent' if age < 0.25 or age > 0.75 else 'Gibbous')
+
+
+def shift_time(hh_mm, minutes):
+    h, m = [int(x) for x in hh_mm.split(':')]
+    total = (h * 60 + m + minutes) % 1440
+    return '{:02d}:{:02d}'.format(total // 60, total % 60)
+
+
+def oneday_payload(day, coords, tz):
+    payload = load_fixture('usno_oneday.json')
+    data = payload['properties']['data']
+    age = ((day.toordinal() + 0.5 - NEW_MOON) / SYNODIC_DAYS) % 1.0
+    drift = (day - RECORDED_DATE).days * 50
+    data.update({
+        'year': day.year, 'month': day.month, 'day': day.day,
+        'day_of_week': DAY_NAMES[day.weekday()],
+        'curphase': phase_name(age),
+        'fracillum': '{:.0f}%'.format((1 - math.cos(age * 2 * math.pi)) * 50),
+        'tz': float(tz),
+    })
+    for item in data['moondata']:
+        item['time'] = shift_time(item['time'], drift)
+    payload['geometry']['coordinates'] = [float(c) for c in reversed(coords.split(','))]
+    return json.dumps(payload).encode()
+
+
+class Config:
+    def __init__(self, mode=None, latency_ms=0, jitter_ms=0, error_rate=0.0, truncate_rate=0.0, drip_rate=0.0,
+                 drip_bytes=DRIP_BYTES, drip_ms=DRIP_MS, seed=None):
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rates = (('error', error_rate), ('truncate', truncate_rate), ('drip', drip_rate))
+        self.drip_bytes = drip_bytes
+        self.drip_ms = drip_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = dict((mode, 0) for mode in MODES)
+
+    def choose(self):
+        with self.lock:
+            mode = self.mode
+            if mode is None:
+                roll = self.random.random()
+                mode = 'ok'
+                for name, rate in self.rates:
+                    if roll < rate:
+                        mode = name
+                        break
+                    roll -= rate
+            self.counts[mode] += 1
+            return mode, self.latency_ms + self.random.uniform(0, self.jitter_ms)
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+            if url.path == '/json/':
+                body = json.dumps(load_fixture('ip_api.json')).encode()
+            elif url.path == '/api/rstt/oneday':
+                try:
+                    body = oneday_payload(date.fromisoformat(query['date']), query['coords'], query.get('tz', '0'))
+                except (KeyError, ValueError) as e:
+                    return self.reply(400, json.dumps({'error': str(e)}).encode())
+            else:
+                return self.reply(404, b'{"error": "not found"}')
+
+            mode, latency_ms = config.choose()
+            time.sleep(latency_ms / 1000)
+            if mode == 'error':
+                self.reply(503, b'{"error": "service unavailable"}')
+            elif mode == 'truncate':
+                self.reply(200, body, len(body) // 2)
+                self.close_connection = True
+            elif mode == 'drip':
+                self.reply(200, body, drip=True)
+            else:
+                self.reply(200, body)
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # The client gave up, as the clock's Session does on a response that's too slow
+
+        def reply(self, status, body, send=None, drip=False):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if drip:
+                for i in range(0, len(body), config.drip_bytes):
+                    self.wfile.write(body[i:i + config.drip_bytes])
+                    self.wfile.flush()
+                    time.sleep(config.drip_ms / 1000)
+            else:
+                self.wfile.write(body if send is None else body[:send])
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start(config, host='127.0.0.1', port=0):
+    """Start the stub in a background thread and return the server"""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--mode', choices=MODES, help='Use this failure mode for every request')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--truncate-rate', type=float, default=0)
+    parser.add_argument('--drip-rate', type=float, default=0)
+    parser.add_argument('--drip-bytes', type=int, default=DRIP_BYTES)
+    parser.add_argument('--drip-ms', type=float, default=DRIP_MS)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    config = Config(args.mode, args.latency_ms, args.jitter_ms, args.error_rate, args.truncate_rate, args.drip_rate,
+                    args.drip_bytes, args.drip_ms, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print('USNO stand-in listening on http://{}:{}'.format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(' '.join('{}={}'.format(mode, count) for mode, count in config.counts.items()))
+
+
+if __name__ == '__main__':
+    main()